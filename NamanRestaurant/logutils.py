@@ -0,0 +1,138 @@
+"""Logging plumbing referenced from ``LOGGING`` in settings.
+
+Request threads only put records on a queue (``queue_handler``); a single
+``QueueListener`` thread formats them and does the file and console I/O.
+File output is one JSON object per line, rotated by size and at midnight.
+Rotation renames the file under whoever else has it open, so each log file
+must have a single writing process: run one process, or give every worker
+its own file with ``{pid}`` in ``LOG_FILE``.
+``SamplingFilter`` keeps a fraction of known high-volume INFO events.
+
+Python 3.11's ``dictConfig`` has no ``queue``/``listener`` keys, so the
+queue handler is built by a factory that receives the target handlers via
+``cfg://handlers.<name>``.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+
+# Attributes every LogRecord has; anything else came from ``extra=``.
+RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep ``rates[event]`` of the records logged with ``extra={"event": ...}``.
+
+    Only records at INFO or below are sampled; kept ones carry their
+    ``sample_rate`` so counts can be scaled back up.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = dict(rates or {})
+
+    def filter(self, record):
+        rate = self.rates.get(getattr(record, "event", None))
+        if rate is None or record.levelno > logging.INFO:
+            return True
+        if random.random() >= rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotate at ``when`` like the parent, and also once the file has reached ``max_bytes``.
+
+    ``{pid}`` in ``filename`` is replaced with the process id. Rotations
+    within one interval get ``.001``, ``.002``... after the date; the padding
+    keeps them in order for the parent's ``backupCount`` clean-up, which
+    sorts names as strings.
+    """
+
+    def __init__(self, filename, max_bytes=0, **kwargs):
+        super().__init__(filename.replace("{pid}", str(os.getpid())), **kwargs)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if not self.max_bytes:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        # Checked before the record is written, so a file can end up one
+        # record past the limit; sizing the record would mean formatting it twice.
+        self.stream.seek(0, 2)
+        return self.stream.tell() >= self.max_bytes
+
+    def rotation_filename(self, default_name):
+        dirname, prefix = os.path.split(default_name)
+        taken = [
+            name[len(prefix):].lstrip(".")
+            for name in os.listdir(dirname)
+            if name == prefix or name.startswith(prefix + ".")
+        ]
+        if not taken:
+            return default_name
+        # Count past the newest, even if older ones were already pruned.
+        last = max((int(n) for n in taken if n.isdigit()), default=0)
+        return f"{default_name}.{last + 1:03d}"
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record):
+        # Merge args on the caller's thread (they may be mutable) but leave
+        # formatting to the listener's handlers.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _QueueListener(QueueListener):
+    def stop(self):
+        # Also registered with atexit; stopping twice is harmless.
+        if self._thread is not None:
+            super().stop()
+
+
+def queue_handler(handlers):
+    """Build a handler that hands records to ``handlers`` on a background thread."""
+    # ``handlers`` is dictConfig's ConvertingList; indexing resolves cfg:// references.
+    targets = [handlers[i] for i in range(len(handlers))]
+    records = queue.SimpleQueue()
+    listener = _QueueListener(records, *targets, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    handler = _QueueHandler(records)
+    handler.listener = listener
+    return handler
@@ -0,0 +1,141 @@
+"""Opt-in per-request profiling that works with ``DEBUG`` off.
+
+Set ``PROFILE_SAMPLE_RATE`` (0-1) to profile that fraction of requests; at
+0 the middleware removes itself. For a sampled request it records:
+
+* the number of SQL queries and their total time (via
+  ``connection.execute_wrapper``, so ``DEBUG`` is not needed);
+* repeated query shapes, i.e. the same SQL with different parameters,
+  which is what an N+1 loop looks like;
+* time spent rendering templates and the response size.
+
+The numbers go out as a ``Server-Timing`` header (visible in the browser's
+network panel) and as one structured ``request.profile`` log line.
+"""
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template
+
+
+logger = logging.getLogger(__name__)
+
+# Placeholder lists such as "IN (%s, %s, %s)" vary with the data, not the query.
+PLACEHOLDER_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+MAX_LOGGED_DUPLICATES = 5
+
+_current = contextvars.ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.shapes = Counter()
+        self._rendering = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+            self.shapes[PLACEHOLDER_LIST.sub("(...)", sql)] += 1
+
+    def duplicates(self):
+        return [(sql, n) for sql, n in self.shapes.most_common() if n > 1]
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None or profile._rendering:
+            return render(self, *args, **kwargs)
+        profile._rendering += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            profile.template_time += time.perf_counter() - start
+            profile._rendering -= 1
+    wrapper._profiled = True
+    return wrapper
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.rate = getattr(settings, "PROFILE_SAMPLE_RATE", 0)
+        if not self.rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if not getattr(Template.render, "_profiled", False):
+            Template.render = _timed_render(Template.render)
+
+    def __call__(self, request):
+        if random.random() >= self.rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        duplicates = profile.duplicates()
+        if response.streaming:
+            size = int(response["Content-Length"]) if response.has_header("Content-Length") else None
+        else:
+            size = len(response.content)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={_ms(profile.sql_time)};desc="{profile.queries} queries"',
+            f'dup;desc="{sum(n for _, n in duplicates)} repeated"',
+            f"tpl;dur={_ms(profile.template_time)}",
+            f"total;dur={_ms(total)}",
+        ])
+        match = getattr(request, "resolver_match", None)
+        logger.info(
+            "%s %s %s: %d queries in %.1fms, %.1fms total",
+            request.method, request.path, response.status_code,
+            profile.queries, _ms(profile.sql_time), _ms(total),
+            extra={
+                "event": "request.profile",
+                "method": request.method,
+                "path": request.path,
+                "view": match.view_name if match else None,
+                "status": response.status_code,
+                "duration_ms": _ms(total),
+                "queries": profile.queries,
+                "sql_ms": _ms(profile.sql_time),
+                "template_ms": _ms(profile.template_time),
+                "response_bytes": size,
+                "duplicate_queries": [
+                    {"sql": sql, "count": n} for sql, n in duplicates[:MAX_LOGGED_DUPLICATES]
+                ],
+                "sample_rate": self.rate,
+            },
+        )
+        return response
@@ -5,6 +5,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Uploads get content-hashed names and are served by customer.media.serve.
+# Set MEDIA_ACCEL_REDIRECT to an nginx ``internal`` location (e.g.
+# "/protected-media/") to let the proxy send the bytes.
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -28,6 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost so its timings cover the rest of the stack; off unless
+    # PROFILE_SAMPLE_RATE is set.
+    'NamanRestaurant.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -41,7 +48,17 @@ MIDDLEWARE = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Fraction of requests (0-1) that get query counts, SQL/template timings and
+# repeated-query detection as a Server-Timing header and a log line.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+
+STORAGES = {
+    "default": {"BACKEND": "customer.media.HashedMediaStorage"},
+    # collectstatic writes gzip/brotli copies for whitenoise to serve. The
+    # manifest variant would make {% static %} fail until collectstatic has
+    # run, which breaks tests and fresh checkouts.
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedStaticFilesStorage"},
+}
 ROOT_URLCONF = 'NamanRestaurant.urls'
 
 TEMPLATES = [
@@ -62,12 +79,104 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'NamanRestaurant.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# --- Database ---
+# PostgreSQL when POSTGRES_DB is set, otherwise the local SQLite file (local
+# runs and tests). With DB_POOL_MAX_SIZE set, each worker keeps a psycopg 3
+# connection pool; Django requires CONN_MAX_AGE = 0 alongside a pool, so the
+# pool replaces persistent connections rather than stacking with them.
+POSTGRES_DB = os.environ.get('POSTGRES_DB', '')
+if POSTGRES_DB:
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '0'))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': POSTGRES_DB,
+            'USER': os.environ.get('POSTGRES_USER', ''),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX_SIZE else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': 5,
+            },
+        }
     }
-}
+    if DB_POOL_MAX_SIZE:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': 10,
+        }
+else:
+    # SQLITE_WAL=1 switches the file to WAL so readers carry on while a
+    # write commits. It is opt-in: the mode is stored in the file itself,
+    # so it would rewrite the checked-in db.sqlite3 on the first connection.
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', '0') == '1'
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Writers take the lock when the transaction begins
+                # (IMMEDIATE) and queue for up to `timeout` seconds, instead
+                # of failing with "database is locked" when a read is
+                # upgraded to a write.
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+        }
+    }
+    if SQLITE_WAL:
+        DATABASES['default']['OPTIONS']['init_command'] = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL'
+
+# --- Cache ---
+# memcached when MEMCACHED_LOCATION is set (comma-separated host:port list),
+# otherwise a per-process local-memory cache (local runs and tests).
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION', '')
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'no_delay': True,
+                'ignore_exc': True,
+                'use_pooling': True,
+                'max_pool_size': 8,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'naman-restaurant',
+        }
+    }
+
+# Seconds an anonymous restaurant list / menu page stays cached
+PAGE_CACHE_TIMEOUT = 300
+
+# Carts live in memcached when it is configured (shared by every worker),
+# otherwise in the CartLine table. A local-memory cache is per process, so
+# it is never used for carts.
+CART_STORE = 'cache' if MEMCACHED_LOCATION else 'db'
+# Seconds a cached cart line survives
+CART_TIMEOUT = 60 * 60 * 24 * 14
+
+# Threads that generate resized copies of uploaded images after the upload
+# request commits (customer.images); 0 generates them inline.
+IMAGE_RENDITION_WORKERS = int(os.environ.get('IMAGE_RENDITION_WORKERS', '2'))
+
+# Refresh a user's recommendations on a background thread after the request
+# commits (customer.recommendations); False refreshes inline.
+RECOMMENDATION_REFRESH_ASYNC = os.environ.get('RECOMMENDATION_REFRESH_ASYNC', '1') == '1'
+
+# Bulk menu imports (customer.menu_import): rows per file, bytes per zipped image.
+MENU_IMPORT_MAX_ROWS = 10000
+MENU_IMPORT_MAX_IMAGE_BYTES = 5 * 1024 * 1024
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',},
@@ -87,6 +196,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ensure logs directory exists
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 os.makedirs(LOG_DIR, exist_ok=True)
+# Request threads only enqueue log records; NamanRestaurant.logutils writes
+# them from a background thread (JSON lines in logs/app.log).
+# Each process rotates the file it writes, so a file must have one writer.
+# With several worker processes (gunicorn -w N) either put {pid} in the
+# name, e.g. LOG_FILE=logs/app.{pid}.log, or set LOG_FILE to '' and log
+# to stderr only.
+LOG_FILE = os.environ.get('LOG_FILE', os.path.join(LOG_DIR, 'app.log'))
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 14
+# Fraction of these high-volume INFO events that is kept.
+LOG_SAMPLE_RATES = {
+    'restaurant_list.view': 0.1,
+    'restaurant_list.search': 0.5,
+    'restaurant_list.filter': 0.25,
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -99,6 +224,15 @@ LOGGING = {
             'format': '{levelname}: {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'NamanRestaurant.logutils.JsonFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'NamanRestaurant.logutils.SamplingFilter',
+            'rates': LOG_SAMPLE_RATES,
+        },
     },
     'handlers': {
         'console': {
@@ -106,25 +240,44 @@ LOGGING = {
             'formatter': 'verbose',
         },
         'file': {
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(LOG_DIR, 'app.log'),
-            'formatter': 'verbose',
+            '()': 'NamanRestaurant.logutils.SizedTimedRotatingFileHandler',
+            'filename': LOG_FILE,
+            'when': 'midnight',
+            'max_bytes': LOG_FILE_MAX_BYTES,
+            'backupCount': LOG_FILE_BACKUP_COUNT,
+            'encoding': 'utf-8',
+            'delay': True,
+            'formatter': 'json',
+        },
+        'queue': {
+            '()': 'NamanRestaurant.logutils.queue_handler',
+            'handlers': ['cfg://handlers.console', 'cfg://handlers.file'],
+            'filters': ['sampling'],
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
         },
         'customer': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
         'system': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'NamanRestaurant': {
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': False,
         },
     }
 }
+
+if not LOG_FILE:
+    del LOGGING['handlers']['file']
+    LOGGING['handlers']['queue']['handlers'].remove('cfg://handlers.file')
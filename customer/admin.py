@@ -1,8 +1,6 @@
-import csv
-
 from django.contrib import admin
-from django.http import HttpResponse
 
+from . import exports
 from .models import (
     Restaurant,
     FoodItem,
@@ -20,22 +18,22 @@ admin.site.index_title = "Welcome to the Dashboard"
 
 def download_csv(modeladmin, request, queryset):
     """Custom admin action to download selected food items as CSV."""
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = (
-        'attachment; filename="food_items.csv"'
-    )
-    writer = csv.writer(response)
-    writer.writerow(["ID", "Name", "Description", "Price", "Restaurant"])
+    return exports.food_items_csv(queryset)
+
+
+def download_orders_csv(modeladmin, request, queryset):
+    """Admin action: selected orders as CSV, one row per order line."""
+    return exports.orders_csv(queryset)
+
+
+download_orders_csv.short_description = "Download selected orders as CSV"
+
+
+def download_feedback_csv(modeladmin, request, queryset):
+    return exports.feedback_csv(queryset)
+
 
-    for item in queryset:
-        writer.writerow([
-            item.id,
-            item.name,
-            item.description,
-            item.price,
-            getattr(item.restaurant, "name", ""),
-        ])
-    return response
+download_feedback_csv.short_description = "Download selected feedback as CSV"
 
 
 class RestaurantAdmin(admin.ModelAdmin):
@@ -66,8 +64,8 @@ class FoodItemAdmin(admin.ModelAdmin):
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    fields = ("food_item", "quantity")
-    readonly_fields = ("food_item",)
+    fields = ("food_item", "quantity", "unit_price")
+    readonly_fields = ("food_item", "unit_price")
 
 
 class OrderAdmin(admin.ModelAdmin):
@@ -84,7 +82,9 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ("customer__username", "status", "restaurant__name")
     ordering = ("-created_at",)
     list_editable = ("status",)
+    list_select_related = ("customer", "restaurant")
     inlines = [OrderItemInline]
+    actions = [download_orders_csv]
 
     def ordered_items(self, obj):
         items = obj.orderitem_set.all()
@@ -94,6 +94,21 @@ class OrderAdmin(admin.ModelAdmin):
 
     ordered_items.short_description = "Ordered Items"
 
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).prefetch_related(
+            "orderitem_set__food_item"
+        )
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(restaurant__owner=request.user)
+
+
+class FeedbackAdmin(admin.ModelAdmin):
+    list_display = ("id", "restaurant", "user", "feedback_type", "priority", "seen", "created_at")
+    list_filter = ("feedback_type", "priority", "seen")
+    list_select_related = ("restaurant", "user")
+    actions = [download_feedback_csv]
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
@@ -105,5 +120,5 @@ admin.site.register(Restaurant, RestaurantAdmin)
 admin.site.register(FoodItem, FoodItemAdmin)
 admin.site.register(Order, OrderAdmin)
 admin.site.register(Review)
-admin.site.register(Feedback)
+admin.site.register(Feedback, FeedbackAdmin)
 admin.site.register(UserProfile)
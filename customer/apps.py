@@ -5,5 +5,11 @@ class CustomerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer'
 
-def ready(self):
-    import customer.signals
+    def ready(self):
+        # The profile receivers in customer.signals stay unregistered:
+        # SignupView creates the UserProfile itself.
+        import customer.ratings  # noqa: F401
+        import customer.search  # noqa: F401
+        import customer.caching  # noqa: F401
+        import customer.recommendations  # noqa: F401
+        import customer.images  # noqa: F401
@@ -0,0 +1,329 @@
+"""Latency, query and memory benchmarks for the main customer and owner pages.
+
+Each scenario is one kind of request repeated against a dataset from
+``customer.synthetic``. Requests go through one of two transports:
+
+* ``client``: the Django test ``Client``, i.e. middleware, views and
+  templates without any HTTP;
+* ``wsgi``: a ``wsgiref`` server on a background thread, so HTTP parsing
+  and the WSGI handler are included.
+
+Per scenario the report has latency percentiles, throughput of a single
+sequential client, SQL queries per request and the peak Python memory
+allocated while serving one request. Memory is traced in a separate, short
+pass because ``tracemalloc`` slows everything down.
+
+``compare`` checks a report against a saved baseline, which is how the
+``benchmark`` command gates performance changes.
+"""
+import http.client
+import math
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from contextlib import ExitStack
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.middleware.csrf import CSRF_ALLOWED_CHARS, CSRF_SECRET_LENGTH
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from NamanRestaurant.profiling import RequestProfile
+
+from .cart import get_cart_store
+from .models import Restaurant
+
+
+DEFAULT_MAX_REGRESSION = 0.2
+# Differences below these are noise, whatever the ratio.
+LATENCY_SLACK_MS = 1.0
+MEMORY_SLACK_KIB = 64
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+Fixture = namedtuple("Fixture", ["customer", "owner", "restaurant", "restaurant_ids", "food_ids", "search_term"])
+
+
+def load_fixture():
+    """Pick the users and objects the scenarios use from a ``customer.synthetic`` dataset."""
+    try:
+        customer = User.objects.get(username="customer0")
+        owner = User.objects.get(username="owner0")
+    except User.DoesNotExist:
+        raise BenchmarkError("No synthetic dataset found; run customer.synthetic.generate() first.")
+    restaurant = owner.restaurants.order_by("id").first()
+    return Fixture(
+        customer=customer,
+        owner=owner,
+        restaurant=restaurant,
+        restaurant_ids=list(
+            Restaurant.objects.filter(owner__username__startswith="owner")
+            .order_by("id").values_list("id", flat=True)
+        ),
+        food_ids=list(restaurant.menu_items.order_by("id").values_list("id", flat=True)),
+        search_term=restaurant.cuisine.split()[0],
+    )
+
+
+# ---------- Scenarios ----------
+class Scenario:
+    """``request(fixture, i)`` returns ``(method, path, data)`` for the i-th request.
+
+    ``prepare(fixture, i)`` runs untimed before it, e.g. to fill a cart.
+    """
+
+    def __init__(self, name, role, request, status=200, prepare=None):
+        self.name = name
+        self.role = role
+        self.request = request
+        self.status = status
+        self.prepare = prepare
+
+
+def _fill_cart(fixture, i):
+    store = get_cart_store(fixture.customer, fixture.restaurant.id)
+    store.clear()
+    store.add(fixture.food_ids[i % len(fixture.food_ids)], 2)
+
+
+SCENARIOS = [
+    Scenario("restaurant_list_anonymous", None,
+             lambda f, i: ("GET", reverse("restaurant_list"), None)),
+    Scenario("restaurant_list", "customer",
+             lambda f, i: ("GET", reverse("restaurant_list"), None)),
+    Scenario("restaurant_search", "customer",
+             lambda f, i: ("GET", reverse("restaurant_list"), {"q": f.search_term})),
+    Scenario("menu", "customer",
+             lambda f, i: ("GET", reverse("menu", args=[f.restaurant_ids[i % len(f.restaurant_ids)]]), None)),
+    Scenario("cart_add", "customer",
+             lambda f, i: (
+                 "POST",
+                 reverse("cart_api_add", args=[f.restaurant.id, f.food_ids[i % len(f.food_ids)]]),
+                 {"quantity": 1},
+             )),
+    Scenario("place_order", "customer",
+             lambda f, i: ("POST", reverse("place_order", args=[f.restaurant.id]), {}),
+             status=302, prepare=_fill_cart),
+    Scenario("orders", "customer",
+             lambda f, i: ("GET", reverse("orders"), None)),
+    Scenario("owner_dashboard", "owner",
+             lambda f, i: ("GET", reverse("owner_dashboard", args=[f.restaurant.id]), None)),
+]
+
+
+# ---------- Transports ----------
+def _profiled(connection_aliases):
+    profile = RequestProfile()
+    stack = ExitStack()
+    for alias in connection_aliases:
+        stack.enter_context(connections[alias].execute_wrapper(profile))
+    return profile, stack
+
+
+class ClientTransport:
+    name = "client"
+
+    def __enter__(self):
+        self.clients = {None: Client()}
+        return self
+
+    def __exit__(self, *exc_info):
+        self.clients.clear()
+
+    def login(self, role, user):
+        client = Client()
+        client.force_login(user)
+        self.clients[role] = client
+
+    def send(self, role, method, path, data):
+        profile, stack = _profiled(connections)
+        with stack:
+            response = getattr(self.clients[role], method.lower())(path, data or {})
+        return response.status_code, profile
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGITransport:
+    """A single-threaded ``wsgiref`` server, so requests never overlap."""
+
+    name = "wsgi"
+
+    def __enter__(self):
+        application = get_wsgi_application()
+        self.profile = None
+
+        def profiled_application(environ, start_response):
+            self.profile, stack = _profiled(connections)
+            with stack:
+                return application(environ, start_response)
+
+        self.server = make_server(
+            "127.0.0.1", 0, profiled_application, server_class=WSGIServer, handler_class=_QuietHandler
+        )
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.cookies = {None: ""}
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def login(self, role, user):
+        client = Client()
+        client.force_login(user)
+        self.cookies[role] = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+    def send(self, role, method, path, data):
+        # A bare secret is accepted as both the cookie and the header token.
+        csrf = get_random_string(CSRF_SECRET_LENGTH, allowed_chars=CSRF_ALLOWED_CHARS)
+        headers = {
+            "Cookie": "; ".join(filter(None, [self.cookies[role], f"{settings.CSRF_COOKIE_NAME}={csrf}"])),
+            "X-CSRFToken": csrf,
+        }
+        body = None
+        if method == "GET":
+            if data:
+                path = f"{path}?{urlencode(data)}"
+        else:
+            body = urlencode(data or {})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        host, port = self.server.server_address[:2]
+        conn = http.client.HTTPConnection(host, port)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        finally:
+            conn.close()
+        return response.status, self.profile
+
+
+TRANSPORTS = {transport.name: transport for transport in (ClientTransport, WSGITransport)}
+
+
+# ---------- Measuring ----------
+def _percentile(ordered, pct):
+    # Nearest rank, so every reported value is an observed one.
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def _send(transport, scenario, fixture, i):
+    if scenario.prepare:
+        scenario.prepare(fixture, i)
+    method, path, data = scenario.request(fixture, i)
+    start = time.perf_counter()
+    status, profile = transport.send(scenario.role, method, path, data)
+    elapsed = time.perf_counter() - start
+    if status != scenario.status:
+        raise BenchmarkError(
+            f"{transport.name}/{scenario.name}: {method} {path} returned {status}, expected {scenario.status}"
+        )
+    return elapsed, profile
+
+
+def run_scenario(transport, scenario, fixture, iterations=50, warmup=5, memory_samples=10):
+    """Time ``iterations`` requests after ``warmup`` untimed ones and summarise them."""
+    latencies, queries, sql_times = [], [], []
+    for i in range(warmup + iterations):
+        elapsed, profile = _send(transport, scenario, fixture, i)
+        if i >= warmup:
+            latencies.append(elapsed)
+            queries.append(profile.queries)
+            sql_times.append(profile.sql_time)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(memory_samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            _send(transport, scenario, fixture, warmup + iterations + i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "throughput_rps": round(len(latencies) / sum(latencies), 1),
+        "queries": int(statistics.median_low(queries)),
+        "queries_max": max(queries),
+        "sql_p50_ms": round(statistics.median(sql_times) * 1000, 2),
+        "peak_kib": round(max(peaks) / 1024, 1) if peaks else None,
+    }
+
+
+def run(transports=("client", "wsgi"), scenarios=None, iterations=50, warmup=5, memory_samples=10):
+    """Run the selected scenarios over each transport; returns ``{transport: {scenario: stats}}``."""
+    selected = [s for s in SCENARIOS if not scenarios or s.name in scenarios]
+    unknown = set(scenarios or ()) - {s.name for s in SCENARIOS}
+    if unknown:
+        raise BenchmarkError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    fixture = load_fixture()
+    results = {}
+    with override_settings(
+        DEBUG=False,
+        PROFILE_SAMPLE_RATE=0,
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver", "127.0.0.1"],
+    ):
+        for name in transports:
+            cache.clear()
+            with TRANSPORTS[name]() as transport:
+                transport.login("customer", fixture.customer)
+                transport.login("owner", fixture.owner)
+                results[name] = {
+                    scenario.name: run_scenario(transport, scenario, fixture, iterations, warmup, memory_samples)
+                    for scenario in selected
+                }
+    return results
+
+
+def compare(baseline, current, max_regression=DEFAULT_MAX_REGRESSION):
+    """List the ways ``current`` is worse than ``baseline`` (both full reports)."""
+    for key in ("scale", "seed"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            raise BenchmarkError(
+                f"Baseline was run with {key}={baseline['meta'].get(key)!r}, "
+                f"this run with {current['meta'].get(key)!r}; results are not comparable."
+            )
+
+    problems = []
+    for transport, scenarios in current["results"].items():
+        for name, stats in scenarios.items():
+            before = baseline["results"].get(transport, {}).get(name)
+            if before is None:
+                continue
+            label = f"{transport}/{name}"
+            for key in ("p50_ms", "p95_ms"):
+                if stats[key] - before[key] > max(LATENCY_SLACK_MS, before[key] * max_regression):
+                    problems.append(f"{label}: {key} {before[key]} -> {stats[key]}")
+            if stats["queries"] > before["queries"]:
+                problems.append(f"{label}: queries {before['queries']} -> {stats['queries']}")
+            if before["peak_kib"] is not None and stats["peak_kib"] is not None and (
+                stats["peak_kib"] - before["peak_kib"] > max(MEMORY_SLACK_KIB, before["peak_kib"] * max_regression)
+            ):
+                problems.append(f"{label}: peak_kib {before['peak_kib']} -> {stats['peak_kib']}")
+    return problems
@@ -0,0 +1,105 @@
+"""Rendered-page caching for the anonymous catalogue.
+
+Anonymous GETs of ``restaurant_list`` and ``menu`` are cached per path and
+query string. Rather than deleting page keys, every cached page embeds the
+current value of one or more *version* keys; saving or deleting a
+``Restaurant``, ``FoodItem`` or ``Review`` replaces the relevant version so
+stale pages are simply never looked up again and age out by TTL.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from .models import FoodItem, Restaurant, Review
+
+
+CATALOGUE_VERSION_KEY = "catalogue:version"
+
+
+def menu_version_key(restaurant_id):
+    return f"menu:{restaurant_id}:version"
+
+
+def _new_version():
+    # Time-based so a version evicted from the cache never reuses an old value.
+    return time.time_ns()
+
+
+def current_versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*keys):
+    cache.set_many({key: _new_version() for key in keys}, timeout=None)
+
+
+def _page_key(request, versions):
+    query = sorted(request.GET.lists())
+    digest = hashlib.md5(repr((request.path, query, versions)).encode()).hexdigest()
+    return f"page:{digest}"
+
+
+def cache_anonymous_page(version_keys):
+    """Cache a ``View.get`` for anonymous users.
+
+    ``version_keys(request, **kwargs)`` returns the version keys the page
+    depends on. Responses are only stored when they are plain 200s that
+    don't set cookies or rely on a CSRF token, and nothing is served from
+    cache while the visitor has pending flash messages.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != "GET" or request.user.is_authenticated or len(get_messages(request)):
+                return view_func(request, *args, **kwargs)
+
+            key = _page_key(request, current_versions(version_keys(request, **kwargs)))
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            ):
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    timeout=settings.PAGE_CACHE_TIMEOUT,
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------- Invalidation ----------
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_restaurant_pages(sender, instance, **kwargs):
+    bump_versions(CATALOGUE_VERSION_KEY, menu_version_key(instance.id))
+
+
+@receiver([post_save, post_delete], sender=FoodItem)
+def invalidate_menu_pages(sender, instance, **kwargs):
+    bump_versions(menu_version_key(instance.restaurant_id))
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_pages(sender, instance, **kwargs):
+    # Ratings show on the list, review text on the menu.
+    bump_versions(CATALOGUE_VERSION_KEY, menu_version_key(instance.restaurant_id))
@@ -0,0 +1,220 @@
+"""Cart storage, and cart resolution shared by the menu page and checkout.
+
+A customer has one cart per restaurant. Carts are kept outside the session,
+so changing a line never rewrites the session row. With memcached
+configured (``CART_STORE = "cache"``) each line is its own counter that is
+bumped atomically with ``incr``. Otherwise lines are ``CartLine`` rows
+updated with ``F()`` expressions. Both stores expose ``add``, ``set_qty``,
+``remove``, ``clear`` and ``snapshot``.
+
+A raw cart (a snapshot) maps food item ids to quantities. ``resolve_cart``
+turns it into priced lines with a single ``in_bulk`` query, however many
+lines the cart has.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CartLine, FoodItem
+
+
+ResolvedCart = namedtuple("ResolvedCart", ["items", "total", "missing"])
+
+
+class CacheCartStore:
+    """One cache counter per line plus an append-only index of the line ids.
+
+    Quantities change with atomic ``incr``/``decr``. The request whose
+    ``cache.add`` creates a line takes the next index slot with ``incr``
+    and writes the food id under that slot's own key, so concurrent
+    requests never rewrite each other's index entries. Removed lines keep
+    their slot and are skipped by ``snapshot``; a line added again takes a
+    new one. A line expires ``CART_TIMEOUT`` seconds after it was first
+    added.
+    """
+
+    def __init__(self, user_id, restaurant_id):
+        self.prefix = f"cart:{user_id}:{restaurant_id}"
+        self.slots_key = f"{self.prefix}:slots"
+
+    def _line_key(self, food_id):
+        return f"{self.prefix}:line:{int(food_id)}"
+
+    def _slot_key(self, slot):
+        return f"{self.prefix}:slot:{slot}"
+
+    def _append(self, food_id):
+        cache.add(self.slots_key, 0, settings.CART_TIMEOUT)
+        try:
+            slot = cache.incr(self.slots_key)
+        except ValueError:
+            # The counter expired in between; start it again.
+            cache.add(self.slots_key, 0, settings.CART_TIMEOUT)
+            slot = cache.incr(self.slots_key)
+        # Outlive every slot, or a restarted counter would reuse live slots.
+        cache.touch(self.slots_key, settings.CART_TIMEOUT)
+        cache.set(self._slot_key(slot), int(food_id), settings.CART_TIMEOUT)
+
+    def _index(self):
+        slots = cache.get(self.slots_key) or 0
+        if not slots:
+            return []
+        keys = [self._slot_key(n) for n in range(1, slots + 1)]
+        food_ids = cache.get_many(keys)
+        # dict.fromkeys keeps first-added order and drops re-added lines.
+        return list(dict.fromkeys(food_ids[key] for key in keys if key in food_ids))
+
+    def add(self, food_id, quantity=1):
+        """Change a line by ``quantity`` (which may be negative)."""
+        key = self._line_key(food_id)
+        if quantity > 0 and cache.add(key, quantity, settings.CART_TIMEOUT):
+            self._append(food_id)
+            return
+        try:
+            remaining = cache.incr(key, quantity)
+        except ValueError:
+            # The line expired between add() and incr(), or never existed.
+            if quantity > 0:
+                self.set_qty(food_id, quantity)
+            return
+        if remaining <= 0:
+            self.remove(food_id)
+
+    def set_qty(self, food_id, quantity):
+        if quantity <= 0:
+            self.remove(food_id)
+            return
+        key = self._line_key(food_id)
+        if cache.add(key, quantity, settings.CART_TIMEOUT):
+            self._append(food_id)
+        else:
+            cache.set(key, quantity, settings.CART_TIMEOUT)
+
+    def remove(self, food_id):
+        cache.delete(self._line_key(food_id))
+
+    def clear(self):
+        slots = cache.get(self.slots_key) or 0
+        cache.delete_many(
+            [self._line_key(fid) for fid in self._index()]
+            + [self._slot_key(n) for n in range(1, slots + 1)]
+            + [self.slots_key]
+        )
+
+    def snapshot(self):
+        index = self._index()
+        if not index:
+            return {}
+        quantities = cache.get_many([self._line_key(fid) for fid in index])
+        cart = {}
+        for fid in index:
+            quantity = quantities.get(self._line_key(fid))
+            if quantity and quantity > 0:
+                cart[fid] = quantity
+        return cart
+
+
+class DatabaseCartStore:
+    """Cart lines as ``CartLine`` rows; each change is a single-row write."""
+
+    def __init__(self, user_id, restaurant_id):
+        self.lines = CartLine.objects.filter(user_id=user_id, restaurant_id=restaurant_id)
+        self.user_id = user_id
+        self.restaurant_id = restaurant_id
+
+    def add(self, food_id, quantity=1):
+        """Change a line by ``quantity`` (which may be negative)."""
+        line = self.lines.filter(food_item_id=food_id)
+        if quantity <= 0:
+            if not line.filter(quantity__gt=-quantity).update(quantity=F("quantity") + quantity):
+                line.delete()
+            return
+        if line.update(quantity=F("quantity") + quantity):
+            return
+        try:
+            with transaction.atomic():
+                CartLine.objects.create(
+                    user_id=self.user_id,
+                    restaurant_id=self.restaurant_id,
+                    food_item_id=food_id,
+                    quantity=quantity,
+                )
+        except IntegrityError:
+            # A concurrent request created the line first.
+            line.update(quantity=F("quantity") + quantity)
+
+    def set_qty(self, food_id, quantity):
+        if quantity <= 0:
+            self.remove(food_id)
+            return
+        CartLine.objects.update_or_create(
+            user_id=self.user_id,
+            restaurant_id=self.restaurant_id,
+            food_item_id=food_id,
+            defaults={"quantity": quantity},
+        )
+
+    def remove(self, food_id):
+        self.lines.filter(food_item_id=food_id).delete()
+
+    def clear(self):
+        self.lines.delete()
+
+    def snapshot(self):
+        return dict(self.lines.order_by("id").values_list("food_item_id", "quantity"))
+
+
+def apply_cart_action(store, food_id, action):
+    """Apply an ``update_cart`` action; returns False for an unknown action."""
+    if action == "increase":
+        store.add(food_id, 1)
+    elif action == "decrease":
+        store.add(food_id, -1)
+    elif action == "remove":
+        store.remove(food_id)
+    else:
+        return False
+    return True
+
+
+def get_cart_store(user, restaurant_id):
+    """Return ``user``'s cart for a restaurant, backed by ``settings.CART_STORE``."""
+    store = CacheCartStore if settings.CART_STORE == "cache" else DatabaseCartStore
+    return store(user.id, restaurant_id)
+
+
+def resolve_cart(cart, restaurant):
+    """Price a raw cart against ``restaurant``'s menu.
+
+    Returns ``(items, total, missing)`` where ``items`` is a list of
+    ``{'food', 'quantity', 'subtotal'}`` dicts in cart order and ``missing``
+    lists the ids that are no longer on this restaurant's menu.
+    """
+    quantities = {}
+    for fid, qty in cart.items():
+        try:
+            quantities[int(fid)] = int(qty)
+        except (TypeError, ValueError):
+            continue
+
+    foods = FoodItem.objects.filter(restaurant=restaurant).in_bulk(list(quantities))
+    items = []
+    missing = []
+    total = Decimal("0")
+    for fid, qty in quantities.items():
+        food = foods.get(fid)
+        if food is None:
+            missing.append(fid)
+            continue
+        subtotal = food.get_display_price() * qty
+        items.append({
+            "food": food,
+            "quantity": qty,
+            "subtotal": subtotal,
+        })
+        total += subtotal
+    return ResolvedCart(items, total, missing)
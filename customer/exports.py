@@ -0,0 +1,120 @@
+"""Streaming CSV exports of menus, orders and feedback.
+
+Each export is a ``StreamingHttpResponse`` fed by ``QuerySet.iterator``,
+so rows are fetched ``CHUNK_SIZE`` at a time and written out in blocks of
+about ``FLUSH_BYTES``. Memory stays flat however many rows there are.
+Rows are ``values_list`` tuples, with related names joined in by the same
+query; model instances would cost more than the CSV writing.
+
+Cells that a spreadsheet would read as a formula are prefixed with ``'``.
+"""
+import csv
+from datetime import datetime
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Feedback
+
+
+CHUNK_SIZE = 2000
+FLUSH_BYTES = 64 * 1024
+FORMULA_PREFIXES = frozenset("=+-@\t\r")
+# Written as they are; everything else goes through _cell().
+PLAIN_TYPES = frozenset([int, bool, Decimal])
+
+
+class _Echo:
+    """csv.writer target that hands back what it was given instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value, tz):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return "'" + value if value[:1] in FORMULA_PREFIXES else value
+    if isinstance(value, datetime):
+        return value.astimezone(tz).strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+def _encode(header, rows):
+    writer = csv.writer(_Echo())
+    tz = timezone.get_current_timezone()
+    buffer = [writer.writerow(header)]
+    size = 0
+    for row in rows:
+        line = writer.writerow([
+            value if value.__class__ in PLAIN_TYPES else _cell(value, tz) for value in row
+        ])
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    yield "".join(buffer)
+
+
+def stream_csv(filename, header, rows):
+    response = StreamingHttpResponse(_encode(header, rows), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ---------- Exports ----------
+FOOD_ITEM_HEADER = ["ID", "Name", "Description", "Price", "Deal price", "Deal active", "Veg", "Special", "Restaurant"]
+ORDER_HEADER = [
+    "Order ID", "Placed at", "Status", "Customer", "Restaurant", "Order total",
+    "Item ID", "Item", "Quantity", "Unit price", "Line total",
+]
+FEEDBACK_HEADER = [
+    "ID", "Created at", "Restaurant", "Customer", "Type", "Priority", "Seen",
+    "Message", "Response", "Responded by", "Responded at",
+]
+
+
+def food_item_rows(food_items):
+    return food_items.order_by("id").values_list(
+        "id", "name", "description", "price", "deal_price", "deal_active", "is_veg", "is_special",
+        "restaurant__name",
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+def order_rows(orders):
+    """One row per order line in order id order; an order without lines gets one row with empty item columns."""
+    # Following the reverse relation LEFT JOINs the lines, so line-less orders
+    # stay in. The admin's queryset prefetches lines, which value rows can't use.
+    lines = orders.prefetch_related(None).order_by("id", "orderitem__id").values_list(
+        "id", "created_at", "status", "customer__username", "restaurant__name", "total_price",
+        "orderitem__food_item_id", "orderitem__food_item__name", "orderitem__quantity", "orderitem__unit_price",
+    )
+    for row in lines.iterator(chunk_size=CHUNK_SIZE):
+        quantity, unit_price = row[-2:]
+        # Lines from before prices were recorded have no unit price.
+        yield row + (unit_price * quantity if unit_price is not None else None,)
+
+
+def feedback_rows(feedbacks):
+    types, priorities = dict(Feedback.FEEDBACK_TYPES), dict(Feedback.PRIORITY)
+    rows = feedbacks.order_by("created_at", "id").values_list(
+        "id", "created_at", "restaurant__name", "user__username", "feedback_type", "priority", "seen",
+        "message", "response", "responded_by__username", "responded_at",
+    )
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield row[:4] + (types.get(row[4], row[4]), priorities.get(row[5], row[5])) + row[6:]
+
+
+def food_items_csv(food_items, filename="food_items.csv"):
+    return stream_csv(filename, FOOD_ITEM_HEADER, food_item_rows(food_items))
+
+
+def orders_csv(orders, filename="orders.csv"):
+    return stream_csv(filename, ORDER_HEADER, order_rows(orders))
+
+
+def feedback_csv(feedbacks, filename="feedback.csv"):
+    return stream_csv(filename, FEEDBACK_HEADER, feedback_rows(feedbacks))
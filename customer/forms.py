@@ -1,3 +1,5 @@
+import zipfile
+
 from django import forms
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import PasswordChangeForm
@@ -21,10 +23,9 @@ class UserProfileForm(forms.ModelForm):
             "favorite_restaurants",
         ]
         widgets = {
-            # Switch to a searchable multi-select dropdown
-            "favorite_restaurants": forms.SelectMultiple(
-                attrs={"class": "form-select"}
-            ),
+            # Picked through the typeahead on the profile page; rendering
+            # a <select> would list every restaurant.
+            "favorite_restaurants": forms.MultipleHiddenInput(),
         }
 
 
@@ -127,6 +128,83 @@ class FoodItemForm(forms.ModelForm):
             ),
         }
 
+    def clean_name(self):
+        # The (restaurant, name) constraint isn't checked by ModelForm
+        # because restaurant isn't one of the form's fields.
+        name = self.cleaned_data["name"]
+        restaurant_id = self.instance.restaurant_id
+        if restaurant_id and (
+            FoodItem.objects.filter(restaurant_id=restaurant_id, name=name)
+            .exclude(pk=self.instance.pk)
+            .exists()
+        ):
+            raise forms.ValidationError("This menu already has an item with this name.")
+        return name
+
+
+class ImportBooleanField(forms.Field):
+    """Yes/no cell from a CSV or JSON import; a blank cell means ``default``."""
+
+    TRUE = frozenset(["1", "true", "t", "yes", "y"])
+    FALSE = frozenset(["0", "false", "f", "no", "n"])
+
+    def __init__(self, *, default, **kwargs):
+        self.default = default
+        super().__init__(required=False, **kwargs)
+
+    def to_python(self, value):
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower() if value is not None else ""
+        if not text:
+            return self.default
+        if text in self.TRUE:
+            return True
+        if text in self.FALSE:
+            return False
+        raise forms.ValidationError("Enter yes or no.", code="invalid")
+
+
+class MenuImportRowForm(forms.Form):
+    """The columns of a bulk menu import (see customer.menu_import).
+
+    The importer cleans rows with these fields directly, so per-row rules
+    belong in the fields rather than in ``clean()``.
+    """
+
+    name = forms.CharField(max_length=255)
+    description = forms.CharField(required=False)
+    price = forms.DecimalField(max_digits=8, decimal_places=2, min_value=0)
+    deal_price = forms.DecimalField(max_digits=8, decimal_places=2, min_value=0, required=False)
+    deal_active = ImportBooleanField(default=False)
+    is_veg = ImportBooleanField(default=True)
+    is_special = ImportBooleanField(default=False)
+    # File name inside the images zip.
+    image = forms.CharField(max_length=255, required=False)
+
+
+class MenuImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV with a header row, a JSON array of objects, or JSON lines.",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,.json,.jsonl"}),
+    )
+    images = forms.FileField(
+        required=False,
+        help_text="Optional zip of the images named in the image column.",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".zip"}),
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        help_text="Check the file without saving anything.",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+    def clean_images(self):
+        images = self.cleaned_data["images"]
+        if images and not zipfile.is_zipfile(images):
+            raise forms.ValidationError("Images must be a zip file.")
+        return images
+
 class CustomPasswordChangeForm(PasswordChangeForm):
     old_password = forms.CharField(widget=forms.PasswordInput(attrs={'class':'form-control'}))
     new_password1 = forms.CharField(widget=forms.PasswordInput(attrs={'class':'form-control'}))
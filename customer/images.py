@@ -0,0 +1,178 @@
+"""Resized WebP/JPEG renditions of uploaded restaurant photos and food images.
+
+Each rendition is stored next to its original, e.g. ``food_images/dal.jpg``
+gets ``food_images/dal.480w.webp`` and ``food_images/dal.480w.jpg``. The
+model records what exists in a JSON field (``{"source": name, "widths":
+[...]}``) so templates never touch the filesystem, and the
+``responsive_image`` template tag falls back to the original until the
+renditions are ready.
+
+Renditions are generated off the request path: saving a new upload queues
+a job on a small thread pool once the transaction commits. Set
+``IMAGE_RENDITION_WORKERS = 0`` to generate inline instead (tests, the
+backfill command). ``generate_image_renditions`` backfills existing media.
+
+Identical uploads share one stored file (see ``customer.media``), so files
+and renditions are only deleted once no row refers to them.
+"""
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .caching import CATALOGUE_VERSION_KEY, bump_versions, menu_version_key
+from .models import FoodItem, Restaurant
+
+
+logger = logging.getLogger(__name__)
+
+RENDITION_WIDTHS = (160, 480, 960)
+FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+QUALITY = 80
+
+# model -> (image field, renditions field)
+IMAGE_FIELDS = {
+    Restaurant: ("photo", "photo_renditions"),
+    FoodItem: ("image", "image_renditions"),
+}
+
+_executor = None
+
+
+def rendition_name(name, width, ext):
+    root, _ = posixpath.splitext(name)
+    return f"{root}.{width}w.{ext}"
+
+
+def rendition_urls(renditions, ext):
+    """``[(url, width), ...]`` for the stored renditions in one format."""
+    source = renditions.get("source") if renditions else None
+    if not source:
+        return []
+    return [
+        (default_storage.url(rendition_name(source, width, ext)), width)
+        for width in renditions.get("widths", [])
+    ]
+
+
+def _encode(image, width, fmt):
+    copy = image.copy()
+    if copy.width > width:
+        copy.thumbnail((width, round(copy.height * width / copy.width)), Image.LANCZOS)
+    if fmt == "JPEG" and copy.mode != "RGB":
+        copy = copy.convert("RGB")
+    elif fmt == "WEBP" and copy.mode not in ("RGB", "RGBA"):
+        copy = copy.convert("RGBA" if "A" in copy.getbands() else "RGB")
+    buffer = io.BytesIO()
+    copy.save(buffer, format=fmt, quality=QUALITY, optimize=fmt == "JPEG")
+    return ContentFile(buffer.getvalue())
+
+
+def generate_renditions(name):
+    """Write every rendition of ``name`` and return the widths produced."""
+    with default_storage.open(name, "rb") as original:
+        image = Image.open(original)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    # Never upscale; an image narrower than the smallest width gets one rendition at its own size.
+    widths = [w for w in RENDITION_WIDTHS if w < image.width] or [image.width]
+    for width in widths:
+        for ext, fmt in FORMATS.items():
+            target = rendition_name(name, width, ext)
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            # Keep the name rendition_urls() derives, even for an unhashed source.
+            save = getattr(default_storage, "save_unhashed", default_storage.save)
+            save(target, _encode(image, width, fmt))
+    return widths
+
+
+def in_use(name):
+    """Whether any restaurant photo or food image still points at the stored ``name``."""
+    return any(
+        model.objects.filter(**{field: name}).exists()
+        for model, (field, _) in IMAGE_FIELDS.items()
+    )
+
+
+def delete_renditions(renditions):
+    """Delete a source's renditions unless another row still shows that source."""
+    source = renditions.get("source") if renditions else None
+    if not source or in_use(source):
+        return
+    for width in renditions.get("widths", []):
+        for ext in FORMATS:
+            default_storage.delete(rendition_name(source, width, ext))
+
+
+def process(model, pk, name):
+    """Generate renditions for one object's current upload and record them."""
+    field, renditions_field = IMAGE_FIELDS[model]
+    try:
+        widths = generate_renditions(name)
+    except (OSError, UnidentifiedImageError):
+        logger.warning("Could not create renditions for %s", name, exc_info=True)
+        return False
+    previous = model.objects.filter(pk=pk).values_list(renditions_field, flat=True).first()
+    # Skip if the object was deleted or got a newer upload meanwhile.
+    updated = model.objects.filter(pk=pk, **{field: name}).update(
+        **{renditions_field: {"source": name, "widths": widths}}
+    )
+    if not updated:
+        delete_renditions({"source": name, "widths": widths})
+        return False
+    if previous and previous.get("source") != name:
+        delete_renditions(previous)
+    # ``update()`` skips post_save, so expire cached pages here.
+    if model is Restaurant:
+        bump_versions(CATALOGUE_VERSION_KEY, menu_version_key(pk))
+    else:
+        restaurant_id = FoodItem.objects.filter(pk=pk).values_list("restaurant_id", flat=True).first()
+        bump_versions(menu_version_key(restaurant_id))
+    return True
+
+
+def _run_in_worker(model, pk, name):
+    close_old_connections()
+    try:
+        process(model, pk, name)
+    except Exception:
+        logger.exception("Rendition job failed for %s", name)
+    finally:
+        close_old_connections()
+
+
+def submit(model, pk, name):
+    global _executor
+    workers = getattr(settings, "IMAGE_RENDITION_WORKERS", 2)
+    if not workers:
+        process(model, pk, name)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="renditions")
+    _executor.submit(_run_in_worker, model, pk, name)
+
+
+# ---------- Signal receivers ----------
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=FoodItem)
+def queue_renditions(sender, instance, raw=False, update_fields=None, **kwargs):
+    field, renditions_field = IMAGE_FIELDS[sender]
+    if raw or field in instance.get_deferred_fields():
+        return
+    if update_fields is not None and field not in update_fields:
+        return
+    name = getattr(instance, field).name
+    renditions = getattr(instance, renditions_field) or {}
+    if not name or renditions.get("source") == name:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: submit(sender, pk, name))
@@ -0,0 +1,120 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from customer import benchmarks
+from customer.synthetic import SCALES, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a synthetic dataset in a throwaway test database, time the main "
+        "customer and owner pages and optionally gate the result against a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Dataset size (default: small).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the dataset (default: 0).")
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per scenario (default: 50).")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per scenario first (default: 5).")
+        parser.add_argument(
+            "--memory-samples", type=int, default=10,
+            help="Requests per scenario traced with tracemalloc (default: 10, 0 to skip).",
+        )
+        parser.add_argument(
+            "--transport",
+            action="append",
+            dest="transports",
+            choices=sorted(benchmarks.TRANSPORTS),
+            help="Only use the given transport (may be repeated; default: all).",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Only run the given scenario (may be repeated; default: all).",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this file.")
+        parser.add_argument("--baseline", help="JSON report from an earlier run to compare against.")
+        parser.add_argument(
+            "--max-regression", type=float, default=benchmarks.DEFAULT_MAX_REGRESSION,
+            help="Allowed relative slowdown of p50/p95 and peak memory against the baseline (default: 0.2).",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            ran_with = (baseline["meta"].get("scale"), baseline["meta"].get("seed"))
+            if ran_with != (options["scale"], options["seed"]):
+                raise CommandError(
+                    f"{options['baseline']} was run with --scale {ran_with[0]} --seed {ran_with[1]}; "
+                    "use the same to compare."
+                )
+
+        connection = connections[DEFAULT_DB_ALIAS]
+        old_name = connection.settings_dict["NAME"]
+        # The scenarios place orders; never run them against real data.
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            counts = generate(SCALES[options["scale"]], seed=options["seed"])
+            results = benchmarks.run(
+                transports=options["transports"] or list(benchmarks.TRANSPORTS),
+                scenarios=options["scenarios"],
+                iterations=options["iterations"],
+                warmup=options["warmup"],
+                memory_samples=options["memory_samples"],
+            )
+        except benchmarks.BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report = {
+            "meta": {
+                "scale": options["scale"],
+                "seed": options["seed"],
+                "rows": counts,
+                "iterations": options["iterations"],
+                "warmup": options["warmup"],
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "created_at": timezone.now().isoformat(),
+            },
+            "results": results,
+        }
+
+        self.stdout.write(
+            f"{'transport':<10}{'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'req/s':>9}{'queries':>9}{'peak KiB':>10}"
+        )
+        for transport, scenarios in results.items():
+            for name, stats in scenarios.items():
+                self.stdout.write(
+                    f"{transport:<10}{name:<28}{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+                    f"{stats['throughput_rps']:>9}{stats['queries']:>9}{str(stats['peak_kib']):>10}"
+                )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            try:
+                problems = benchmarks.compare(baseline, report, options["max_regression"])
+            except benchmarks.BenchmarkError as e:
+                raise CommandError(str(e))
+            if problems:
+                for problem in problems:
+                    self.stderr.write(problem)
+                raise CommandError(f"{len(problems)} regression(s) against {options['baseline']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Benchmarked {sum(map(len, results.values()))} scenario run(s)."))
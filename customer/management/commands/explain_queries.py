@@ -0,0 +1,133 @@
+import re
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from customer.models import Restaurant
+
+
+# A plan line that reads every row of a real table. Index scans
+# ("SCAN t USING INDEX i"), FTS5 lookups and constant rows are fine.
+SQLITE_TABLE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+POSTGRES_TABLE_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+NO_CACHE = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+
+
+def explain(sql):
+    """Return the plan lines for ``sql`` on the current backend."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN {sql}")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def table_scans(plan):
+    pattern = SQLITE_TABLE_SCAN if connection.vendor == "sqlite" else POSTGRES_TABLE_SCAN
+    scans = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            scans.append(match.group(1))
+    return scans
+
+
+class Command(BaseCommand):
+    help = (
+        "Request the main customer and owner pages, EXPLAIN every SELECT they "
+        "issue and report the ones that still scan a whole table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--restaurant", type=int, help="Restaurant id to explain (default: first with an owner).")
+        parser.add_argument("--customer", help="Username to browse as (default: the user with most orders).")
+        parser.add_argument("--verbose-plans", action="store_true", help="Print the plan of every query.")
+        parser.add_argument("--fail-on-scan", action="store_true", help="Exit non-zero if any table scan is found.")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("sqlite", "postgresql"):
+            raise CommandError(f"EXPLAIN parsing is not supported on {connection.vendor}.")
+
+        restaurants = Restaurant.objects.filter(owner__isnull=False)
+        if options["restaurant"]:
+            restaurants = restaurants.filter(id=options["restaurant"])
+        restaurant = restaurants.select_related("owner").first()
+        if restaurant is None:
+            raise CommandError("No restaurant with an owner to explain.")
+
+        customers = User.objects.exclude(id=restaurant.owner_id)
+        if options["customer"]:
+            customers = customers.filter(username=options["customer"])
+        customer = customers.annotate(n=Count("orders")).order_by("-n", "id").first()
+        if customer is None:
+            raise CommandError("No customer to browse as.")
+
+        rid = restaurant.id
+        pages = [
+            (None, reverse("restaurant_list")),
+            (None, reverse("restaurant_list") + "?q=a&cuisine=a"),
+            (None, reverse("menu", args=[rid])),
+            (customer, reverse("restaurant_list")),
+            (customer, reverse("menu", args=[rid])),
+            (customer, reverse("orders")),
+            (customer, reverse("profile")),
+            (customer, reverse("customer_feedback")),
+            (restaurant.owner, reverse("owner_dashboard", args=[rid])),
+            (restaurant.owner, reverse("dashboard_orders", args=[rid])),
+            (restaurant.owner, reverse("dashboard_feedback", args=[rid])),
+            (restaurant.owner, reverse("dashboard_menu", args=[rid])),
+            (restaurant.owner, reverse("dashboard_charts", args=[rid])),
+            (restaurant.owner, reverse("feedback_management", args=[rid])),
+        ]
+
+        total_scans = 0
+        # Logging in writes sessions; roll everything back afterwards.
+        with transaction.atomic(), override_settings(CACHES=NO_CACHE):
+            for user, url in pages:
+                total_scans += self.explain_page(user, url, options["verbose_plans"])
+            transaction.set_rollback(True)
+
+        if total_scans:
+            message = f"Found {total_scans} table scan(s)."
+            if options["fail_on_scan"]:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("No table scans found."))
+
+    def explain_page(self, user, url, verbose):
+        client = Client(HTTP_HOST="localhost")
+        if user is not None:
+            client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+
+        statements = []
+        for query in ctx.captured_queries:
+            sql = query["sql"]
+            if sql.lstrip().upper().startswith("SELECT") and sql not in statements:
+                statements.append(sql)
+
+        who = user.username if user is not None else "anonymous"
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{url} as {who}: HTTP {response.status_code}, {len(ctx.captured_queries)} queries"
+        ))
+        found = 0
+        for sql in statements:
+            plan = explain(sql)
+            scans = table_scans(plan)
+            if verbose or scans:
+                self.stdout.write(f"  {sql[:200]}")
+                for line in plan:
+                    self.stdout.write(f"    {line}")
+            for table in scans:
+                found += 1
+                self.stdout.write(self.style.WARNING(f"  table scan on {table}"))
+        return found
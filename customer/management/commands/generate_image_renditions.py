@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from customer.images import IMAGE_FIELDS, process
+
+
+class Command(BaseCommand):
+    help = "Create resized WebP/JPEG renditions for restaurant photos and food images that lack them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate renditions even where they are already up to date.",
+        )
+
+    def handle(self, *args, **options):
+        for model, (field, renditions_field) in IMAGE_FIELDS.items():
+            done = failed = 0
+            rows = (
+                model.objects.exclude(**{field: ""})
+                .exclude(**{f"{field}__isnull": True})
+                .values_list("pk", field, renditions_field)
+                .iterator()
+            )
+            for pk, name, renditions in rows:
+                if not options["force"] and (renditions or {}).get("source") == name:
+                    continue
+                if process(model, pk, name):
+                    done += 1
+                else:
+                    failed += 1
+            label = model._meta.verbose_name_plural
+            self.stdout.write(self.style.SUCCESS(f"Created renditions for {done} {label}."))
+            if failed:
+                self.stdout.write(self.style.WARNING(f"Skipped {failed} {label} with missing or unreadable files."))
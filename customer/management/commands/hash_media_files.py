@@ -0,0 +1,40 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from customer.images import IMAGE_FIELDS, delete_renditions, in_use, process
+from customer.media import HASHED_NAME
+
+
+class Command(BaseCommand):
+    help = (
+        "Give uploads stored before content hashing a hashed name, so they can be "
+        "served as immutable, and regenerate their renditions."
+    )
+
+    def handle(self, *args, **options):
+        for model, (field, renditions_field) in IMAGE_FIELDS.items():
+            renamed = missing = 0
+            rows = (
+                model.objects.exclude(**{field: ""})
+                .exclude(**{f"{field}__isnull": True})
+                .values_list("pk", field, renditions_field)
+            )
+            for pk, name, renditions in list(rows):
+                if HASHED_NAME.search(name):
+                    continue
+                if not default_storage.exists(name):
+                    missing += 1
+                    continue
+                with default_storage.open(name, "rb") as original:
+                    new_name = default_storage.save(name, original)
+                model.objects.filter(pk=pk, **{field: name}).update(**{field: new_name, renditions_field: {}})
+                # Several rows may share an upload; only drop it once none refer to it.
+                delete_renditions(renditions)
+                if not in_use(name):
+                    default_storage.delete(name)
+                process(model, pk, new_name)
+                renamed += 1
+            label = model._meta.verbose_name_plural
+            self.stdout.write(self.style.SUCCESS(f"Renamed {renamed} {label}."))
+            if missing:
+                self.stdout.write(self.style.WARNING(f"Skipped {missing} {label} whose files are missing."))
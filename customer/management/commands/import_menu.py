@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.menu_import import FORMATS, MenuImportError, import_menu
+from customer.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or update a restaurant's menu items from a CSV or JSON file, "
+        "optionally with a zip of the images it names."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("restaurant_id", type=int)
+        parser.add_argument("path", help="CSV with a header row, a JSON array of objects, or JSON lines.")
+        parser.add_argument("--images", help="Zip of the files named in the image column.")
+        parser.add_argument("--format", choices=FORMATS, help="Default: from the file name or contents.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and report without saving.")
+
+    def handle(self, *args, **options):
+        try:
+            restaurant = Restaurant.objects.get(id=options["restaurant_id"])
+        except Restaurant.DoesNotExist:
+            raise CommandError(f"No restaurant with id {options['restaurant_id']}.")
+
+        started = time.perf_counter()
+        try:
+            with open(options["path"], "rb") as upload:
+                image_zip = open(options["images"], "rb") if options["images"] else None
+                try:
+                    report = import_menu(
+                        restaurant, upload, image_zip, fmt=options["format"], dry_run=options["dry_run"]
+                    )
+                finally:
+                    if image_zip:
+                        image_zip.close()
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except MenuImportError as exc:
+            raise CommandError(f"Nothing imported: {exc}")
+        elapsed = time.perf_counter() - started
+
+        for error in report.errors:
+            problems = "; ".join(
+                f"{field}: {' '.join(messages)}" if field != "__all__" else " ".join(messages)
+                for field, messages in error["errors"].items()
+            )
+            self.stderr.write(f"Row {error['row']} {error['name']!r}: {problems}")
+        verb = "Would import" if report.dry_run else "Imported"
+        summary = (
+            f"{verb} {report.created} new and {report.updated} existing item(s) for {restaurant.name} "
+            f"in {elapsed:.1f}s; {len(report.errors)} row(s) rejected."
+        )
+        self.stdout.write(self.style.SUCCESS(summary) if not report.errors else self.style.WARNING(summary))
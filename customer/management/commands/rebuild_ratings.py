@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from customer.models import Restaurant
+from customer.ratings import rebuild_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalised avg_rating/review_count/rating_histogram on restaurants."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restaurant",
+            type=int,
+            action="append",
+            dest="restaurant_ids",
+            help="Only rebuild the given restaurant id (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.all()
+        if options["restaurant_ids"]:
+            restaurants = restaurants.filter(id__in=options["restaurant_ids"])
+        updated = rebuild_ratings(restaurants)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ratings for {updated} restaurant(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from customer.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Repopulate the SQLite FTS5 search tables for restaurants, menu items and orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        restaurants, food_items, orders = rebuild_search_index(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {restaurants} restaurant(s), {food_items} food item(s) and {orders} order(s)."
+        ))
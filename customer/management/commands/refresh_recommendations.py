@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from customer.recommendations import rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed \"Recommended for you\" restaurants for every user."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            action="append",
+            dest="usernames",
+            help="Only refresh the given username (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        written = rebuild_recommendations(users)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} recommendation(s)."))
@@ -0,0 +1,67 @@
+import dataclasses
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer.synthetic import SCALES, WRITERS, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a deterministic synthetic dataset (owners, customers, "
+        "restaurants, menus, orders, reviews, feedback) using chunked bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=list(SCALES), default="medium", help="Preset sizes (default: medium).")
+        for field in dataclasses.fields(SCALES["medium"]):
+            parser.add_argument(
+                f"--{field.name.replace('_', '-')}", type=int, dest=field.name,
+                help=f"Override the preset's {field.name.replace('_', ' ')}.",
+            )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+        parser.add_argument(
+            "--method", choices=list(WRITERS), default="orm",
+            help="orm: bulk_create; raw: COPY on PostgreSQL, executemany elsewhere (default: orm).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Orders per transaction (default: 5000).")
+        parser.add_argument(
+            "--skip-rebuild", action="store_true",
+            help="Leave the search index, ratings, recommendations and sales rollups for their own commands.",
+        )
+
+    def handle(self, *args, **options):
+        scale = dataclasses.replace(SCALES[options["scale"]], **{
+            field.name: options[field.name]
+            for field in dataclasses.fields(SCALES["medium"])
+            if options[field.name] is not None
+        })
+        if scale.restaurants < 1 or scale.items_per_restaurant < 1 or scale.users < 1 or scale.days < 1:
+            raise CommandError("Restaurants, items per restaurant, users and days must be at least 1.")
+
+        started = time.perf_counter()
+        report_every = max(scale.orders // 20, options["chunk_size"])
+        last_report = [0]
+
+        def progress(orders, lines):
+            if orders - last_report[0] >= report_every or orders == scale.orders:
+                last_report[0] = orders
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {orders}/{scale.orders} orders, {lines} lines ({lines / elapsed:,.0f} lines/s)")
+
+        counts = generate(
+            scale,
+            seed=options["seed"],
+            method=options["method"],
+            chunk_size=options["chunk_size"],
+            rebuild=not options["skip_rebuild"],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        if options["skip_rebuild"]:
+            self.stdout.write(
+                "Run rebuild_search_index, rebuild_ratings, refresh_recommendations and "
+                "backfill_sales_rollup before using the data."
+            )
+        summary = ", ".join(f"{n} {name.replace('_', ' ')}" for name, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {elapsed:.1f}s."))
@@ -0,0 +1,171 @@
+"""Content-hashed media storage and a cache-friendly view to serve it.
+
+``HashedMediaStorage`` adds the first 12 hex digits of a file's SHA-256 to
+its name (``food_images/dal.jpg`` -> ``food_images/dal.3f9c2a7b01de.jpg``),
+so a stored name always means the same bytes. Renditions from
+``customer.images`` are named after their source, hashed or not, and are
+written with ``save_unhashed`` so they keep that name.
+
+``serve`` replaces ``django.views.static.serve`` for ``MEDIA_URL``. It
+answers conditional requests from ``ETag``/``Last-Modified``, honours
+single byte ranges, and marks hashed names ``immutable`` for a year. With
+``MEDIA_ACCEL_REDIRECT`` set, it sends only headers plus an
+``X-Accel-Redirect`` and leaves the bytes (and ranges) to nginx.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+
+HASH_LENGTH = 12
+# "<root>.<hash>.<ext>" or a rendition "<root>.<hash>.<width>w.<ext>"
+HASHED_NAME = re.compile(r"\.[0-9a-f]{%d}(?:\.\d+w)?\.[^./]+$" % HASH_LENGTH)
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Names from before hashing can still be replaced in place.
+MUTABLE_CACHE_CONTROL = "public, max-age=3600"
+CHUNK_SIZE = 64 * 1024
+
+
+class HashedMediaStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        root, ext = posixpath.splitext(name)
+        return f"{root}.{digest.hexdigest()[:HASH_LENGTH]}{ext}"
+
+    def get_available_name(self, name, max_length=None):
+        if HASHED_NAME.search(name):
+            return super().get_available_name(name, max_length)
+        # _save() inserts the hash, which is what makes the name unique;
+        # only leave room for it under ``max_length``.
+        if max_length is not None:
+            overflow = len(name) + HASH_LENGTH + 1 - max_length
+            if overflow > 0:
+                dirname, basename = posixpath.split(name)
+                root, ext = posixpath.splitext(basename)
+                if overflow >= len(root):
+                    raise SuspiciousFileOperation(f'Storage can not find an available filename for "{name}".')
+                name = posixpath.join(dirname, root[:-overflow] + ext)
+        return name
+
+    def _save(self, name, content):
+        if not HASHED_NAME.search(name):
+            name = self.hashed_name(name, content)
+            if self.exists(name):
+                # Same name and bytes: the stored file already is this upload.
+                return name
+        return super()._save(name, content)
+
+    def save_unhashed(self, name, content, max_length=None):
+        """Save ``content`` under ``name`` as given, without inserting a hash."""
+        name = FileSystemStorage.get_available_name(self, name, max_length)
+        return FileSystemStorage._save(self, name, content)
+
+
+def _etag(path, stat):
+    name = os.path.basename(path)
+    match = HASHED_NAME.search(name)
+    if match:
+        return f'"{name[match.start() + 1:match.start() + 1 + HASH_LENGTH]}-{stat.st_size:x}"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _byte_range(request, size, etag, last_modified):
+    """``(start, end)`` of a satisfiable single range, ``None`` for the whole file, or ``False``."""
+    header = request.headers.get("Range", "")
+    match = RANGE.match(header.strip())
+    if not match or size == 0:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # "bytes=-N" is the last N bytes.
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve(request, path):
+    # safe_join raises SuspiciousFileOperation (a 400) for paths outside MEDIA_ROOT.
+    fullpath = safe_join(settings.MEDIA_ROOT, path)
+    if not os.path.isfile(fullpath):
+        raise Http404("Media file not found")
+
+    stat = os.stat(fullpath)
+    etag = _etag(fullpath, stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(path) else MUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+
+    accel_prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT", "")
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + path.lstrip("/")
+    else:
+        byte_range = _byte_range(request, stat.st_size, etag, last_modified)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            return response
+        if byte_range is None:
+            response = FileResponse(open(fullpath, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _read_range(fullpath, start, length), status=206, content_type=content_type
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response["Content-Length"] = str(length)
+    for header, value in headers.items():
+        response[header] = value
+    return response
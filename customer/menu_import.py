@@ -0,0 +1,420 @@
+"""Bulk menu imports from CSV or JSON, with an optional zip of images.
+
+Rows are read one at a time (``csv.DictReader``, or ``JSONDecoder.raw_decode``
+over a JSON array or JSON lines). A first pass only checks that the whole
+file can be read and is within ``MENU_IMPORT_MAX_ROWS``; the second reads it
+again, checks each row with ``MenuImportRowForm`` (zipped images are read
+and verified but not yet stored) and upserts valid rows ``BATCH_SIZE`` at a
+time with ``bulk_create(update_conflicts=True)`` on the (restaurant, name)
+constraint. Only one batch is held in memory, and a file of thousands of
+items costs a few queries per batch rather than one request per item.
+
+Each batch stores its images and then writes in its own short transaction,
+so imports can be partial: if a batch fails to save, its rows are reported
+as errors, the image files it stored are deleted again unless something
+else uses them, and the batches before and after it stay saved.
+
+Columns match the menu export (``ID`` and ``Restaurant`` are ignored), so an
+exported menu can be edited and imported back. A column missing from the
+file leaves that field alone on items that already exist. Rows that fail
+validation are reported and skipped. A file that can't be read imports
+nothing.
+
+``bulk_create`` sends no signals, so the search index, renditions and cached
+menu pages are updated here.
+"""
+import csv
+import io
+import json
+import logging
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, transaction
+from PIL import Image
+
+from . import images, search
+from .caching import bump_versions, menu_version_key
+from .forms import MenuImportRowForm
+from .models import FoodItem
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+READ_SIZE = 64 * 1024
+FORMATS = ("csv", "json")
+# Header spellings used by the export -> form field.
+ALIASES = {"veg": "is_veg", "special": "is_special"}
+ROW_FIELDS = MenuImportRowForm.base_fields
+# Form field -> model fields it writes on an existing item.
+UPDATE_FIELDS = {
+    "description": ("description",),
+    "price": ("price",),
+    "deal_price": ("deal_price",),
+    "deal_active": ("deal_active",),
+    "is_veg": ("is_veg",),
+    "is_special": ("is_special",),
+    "image": ("image", "image_renditions"),
+}
+
+
+class MenuImportError(Exception):
+    """The file as a whole can't be read; nothing was imported."""
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    dry_run: bool = False
+    # [{"row": n, "name": ..., "errors": {field: [message, ...]}}, ...]
+    errors: list = field(default_factory=list)
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "dry_run": self.dry_run,
+            "errors": self.errors,
+        }
+
+
+# ---------- Reading ----------
+def _column(key):
+    key = str(key).strip().lower().replace(" ", "_")
+    return ALIASES.get(key, key)
+
+
+def detect_format(name, stream):
+    """``csv`` or ``json`` from the file name, else from the first character."""
+    ext = posixpath.splitext(name or "")[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".json", ".jsonl", ".ndjson"):
+        return "json"
+    start = stream.read(READ_SIZE).lstrip()
+    stream.seek(0)
+    return "json" if start[:1] in (b"[", b"{", "[", "{") else "csv"
+
+
+def csv_records(text):
+    """``(line number, {column: value})`` for each data row of a CSV file."""
+    reader = csv.DictReader(text)
+    try:
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if k is not None}
+    except csv.Error as exc:
+        raise MenuImportError(f"Line {reader.line_num}: {exc}") from exc
+
+
+def json_records(text):
+    """``(position, value)`` for each element of a JSON array, or each value of a JSON lines file."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    array = None
+    count = 0
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = text.read(READ_SIZE)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+    def skip_space():
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                advance()
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def advance():
+        nonlocal pos
+        pos += 1
+
+    skip_space()
+    if buffer[pos:pos + 1] == "[":
+        array = True
+        advance()
+        skip_space()
+        if buffer[pos:pos + 1] == "]":
+            return
+    while True:
+        skip_space()
+        if pos >= len(buffer):
+            if array:
+                raise MenuImportError("The JSON array is not closed.")
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise MenuImportError(f"Invalid JSON after item {count}: {exc.msg}.") from exc
+                fill()
+        count += 1
+        pos = end
+        yield count, value
+        if array:
+            skip_space()
+            separator = buffer[pos:pos + 1]
+            advance()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise MenuImportError(f"Expected ',' or ']' after item {count}.")
+
+
+def records(upload, fmt=None):
+    """Stream ``(row, data)`` pairs from a binary file of either format."""
+    fmt = fmt or detect_format(getattr(upload, "name", ""), upload)
+    if fmt not in FORMATS:
+        raise MenuImportError(f"Unknown format {fmt!r}.")
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    try:
+        rows = csv_records(text) if fmt == "csv" else json_records(text)
+        for row, data in rows:
+            if not isinstance(data, dict):
+                yield row, None
+            else:
+                yield row, {_column(k): v for k, v in data.items()}
+    except UnicodeDecodeError as exc:
+        raise MenuImportError("The file must be UTF-8 text.") from exc
+    finally:
+        # Leave the upload open for the caller.
+        text.detach()
+
+
+# ---------- Images ----------
+class ImageArchive:
+    """Images referenced by the ``image`` column, looked up by path or bare file name.
+
+    ``check`` verifies an image without writing anything; ``store`` saves a
+    checked image, once per zip member.
+    """
+
+    def __init__(self, file):
+        try:
+            self.zip = zipfile.ZipFile(file)
+        except zipfile.BadZipFile as exc:
+            raise MenuImportError("The images file is not a zip.") from exc
+        self.max_bytes = getattr(settings, "MENU_IMPORT_MAX_IMAGE_BYTES", 5 * 1024 * 1024)
+        self.members = {}
+        for info in self.zip.infolist():
+            if not info.is_dir():
+                self.members.setdefault(info.filename, info)
+                self.members.setdefault(posixpath.basename(info.filename), info)
+        self.checked = {}
+        self.stored = {}
+
+    def _read(self, info, name):
+        try:
+            # Read at most one byte past the limit; the size in the zip's directory can lie.
+            with self.zip.open(info) as member:
+                data = member.read(self.max_bytes + 1)
+        except (zipfile.BadZipFile, RuntimeError, NotImplementedError) as exc:
+            raise ValueError(f"{name} could not be read from the zip.") from exc
+        if len(data) > self.max_bytes:
+            raise ValueError(f"{name} is larger than {self.max_bytes // (1024 * 1024)} MB.")
+        return data
+
+    def check(self, name):
+        """The zip member for ``name`` once it has been verified; raises ValueError if unusable."""
+        if name in self.checked:
+            return self.checked[name]
+        info = self.members.get(name) or self.members.get(posixpath.basename(name))
+        if info is None:
+            raise ValueError(f"{name} is not in the images zip.")
+        data = self._read(info, name)
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+            raise ValueError(f"{name} is not an image.") from exc
+        self.checked[name] = info
+        return info
+
+    def store(self, info):
+        """Storage name for a checked member, saving it on first use."""
+        if info not in self.stored:
+            data = self._read(info, info.filename)
+            upload_name = FoodItem._meta.get_field("image").generate_filename(None, posixpath.basename(info.filename))
+            self.stored[info] = default_storage.save(upload_name, ContentFile(data), max_length=100)
+        return self.stored[info]
+
+
+# ---------- Importing ----------
+def _validate(row, data, seen, archive):
+    """``(cleaned_data, present fields)`` or ``(None, errors)``."""
+    if data is None:
+        return None, {"__all__": ["Expected an object with the item's fields."]}
+    # Clean each cell with the form's (stateless) fields: binding a form per
+    # row deep-copies them all, which was most of the validation time.
+    cleaned, errors = {}, {}
+    for name, form_field in ROW_FIELDS.items():
+        try:
+            cleaned[name] = form_field.clean(data.get(name))
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    if errors:
+        return None, errors
+    name = cleaned["name"]
+    if name in seen:
+        return None, {"name": [f"Duplicate of row {seen[name]}."]}
+    seen[name] = row
+    present = [f for f in UPDATE_FIELDS if f in data and f != "image"]
+    if cleaned["image"]:
+        if archive is None:
+            return None, {"image": ["Upload a zip of images to set images."]}
+        try:
+            cleaned["image"] = archive.check(cleaned["image"])
+        except ValueError as exc:
+            return None, {"image": [str(exc)]}
+        present.append("image")
+    return cleaned, present
+
+
+def _store_images(batch, archive, saved):
+    """Store the batch's images in place of their zip members, adding new files to ``saved``."""
+    for _, cleaned, present in batch:
+        if "image" in present:
+            new = cleaned["image"] not in archive.stored
+            cleaned["image"] = archive.store(cleaned["image"])
+            if new:
+                saved.append(cleaned["image"])
+
+
+def _write_batch(restaurant, batch, archive, report):
+    """Save ``batch`` in its own transaction; if that fails, report its rows and delete its new image files."""
+    saved = []
+    try:
+        if archive and not report.dry_run:
+            # Files are written before the transaction so it holds no lock while they are.
+            _store_images(batch, archive, saved)
+        with transaction.atomic():
+            created, updated = _save_batch(restaurant, batch, report.dry_run)
+    except BaseException as exc:
+        for name in saved:
+            if not images.in_use(name):
+                default_storage.delete(name)
+        if not isinstance(exc, (DatabaseError, OSError)):
+            raise
+        logger.warning("Menu import batch for restaurant %s failed", restaurant.id, exc_info=True)
+        report.errors.extend(
+            {"row": row, "name": cleaned["name"], "errors": {"__all__": [f"Not saved: {exc}"]}}
+            for row, cleaned, _ in batch
+        )
+        return
+    report.created += created
+    report.updated += updated
+
+
+def _save_batch(restaurant, batch, dry_run):
+    """Upsert ``batch`` and return ``(created, updated)``; a dry run only counts."""
+    existing = {
+        name: (image, description)
+        for name, image, description in FoodItem.objects.filter(
+            restaurant=restaurant, name__in=[c["name"] for _, c, _ in batch]
+        ).values_list("name", "image", "description")
+    }
+    counts = len(batch) - len(existing), len(existing)
+    if dry_run:
+        return counts
+
+    groups = {}
+    new_images = []
+    for _, cleaned, present in batch:
+        item = FoodItem(
+            restaurant=restaurant,
+            name=cleaned["name"],
+            description=cleaned["description"],
+            price=cleaned["price"],
+            deal_price=cleaned["deal_price"],
+            deal_active=cleaned["deal_active"],
+            is_veg=cleaned["is_veg"],
+            is_special=cleaned["is_special"],
+        )
+        stored = existing.get(item.name)
+        if stored and "description" not in present:
+            # Not written by the upsert; index what the row keeps.
+            item.description = stored[1]
+        if "image" in present:
+            if stored and stored[0] == cleaned["image"]:
+                # Same bytes as now (names carry a content hash): keep the renditions.
+                present = [f for f in present if f != "image"]
+            else:
+                item.image = cleaned["image"]
+                new_images.append(item)
+        update_fields = tuple(model_field for f in present for model_field in UPDATE_FIELDS[f])
+        groups.setdefault(update_fields, []).append(item)
+
+    items = []
+    for update_fields, group in groups.items():
+        items += FoodItem.objects.bulk_create(
+            group,
+            update_conflicts=True,
+            unique_fields=["restaurant", "name"],
+            update_fields=update_fields,
+        )
+    if any(item.pk is None for item in items):
+        # Backends that can't return ids from an upsert (MySQL).
+        ids = dict(restaurant.menu_items.filter(name__in=[i.name for i in items]).values_list("name", "id"))
+        for item in items:
+            item.pk = ids[item.name]
+
+    search.index_food_items(items)
+    for item in new_images:
+        pk, name = item.pk, item.image.name
+        transaction.on_commit(lambda pk=pk, name=name: images.submit(FoodItem, pk, name))
+    return counts
+
+
+def import_menu(restaurant, upload, image_zip=None, fmt=None, dry_run=False):
+    """Create or update ``restaurant``'s items from ``upload`` and return an ``ImportReport``.
+
+    ``upload`` (and ``image_zip``) are seekable binary files. Raises
+    MenuImportError, before anything is written, if the file can't be read
+    at all or has more than MENU_IMPORT_MAX_ROWS rows. Batches that fail to
+    save are reported row by row in ``report.errors``; the others are kept.
+    """
+    max_rows = getattr(settings, "MENU_IMPORT_MAX_ROWS", 10000)
+    report = ImportReport(dry_run=dry_run)
+    archive = ImageArchive(image_zip) if image_zip else None
+    # Read the file through once so a broken one imports nothing.
+    for count, _ in enumerate(records(upload, fmt), 1):
+        if count > max_rows:
+            raise MenuImportError(f"Imports are limited to {max_rows} rows.")
+    upload.seek(0)
+
+    seen = {}
+    batch = []
+    try:
+        for row, data in records(upload, fmt):
+            cleaned, result = _validate(row, data, seen, archive)
+            if cleaned is None:
+                name = data.get("name") if isinstance(data, dict) else None
+                report.errors.append({"row": row, "name": str(name or ""), "errors": result})
+                continue
+            batch.append((row, cleaned, result))
+            if len(batch) >= BATCH_SIZE:
+                _write_batch(restaurant, batch, archive, report)
+                batch = []
+        if batch:
+            _write_batch(restaurant, batch, archive, report)
+    finally:
+        # Batches already committed stay, so drop cached menus even if a later one failed.
+        if report.imported and not dry_run:
+            bump_versions(menu_version_key(restaurant.id))
+    report.errors.sort(key=lambda error: error["row"])
+    return report
@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-17 12:56
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import customer.models
+from django.db import migrations, models
+
+
+# A copy of customer.ratings.summarize as of this migration, so later
+# changes there can't change what it writes.
+def summarize(histogram):
+    count = sum(histogram)
+    if not count:
+        return 0, None
+    total = sum((i + 1) * n for i, n in enumerate(histogram))
+    avg = (Decimal(total) / count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return count, avg
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Restaurant = apps.get_model('customer', 'Restaurant')
+    Review = apps.get_model('customer', 'Review')
+    histograms = {}
+    rows = (
+        Review.objects.filter(visible=True)
+        .values('restaurant_id', 'rating')
+        .annotate(n=models.Count('id'))
+    )
+    for row in rows:
+        histogram = histograms.setdefault(row['restaurant_id'], [0, 0, 0, 0, 0])
+        histogram[min(max(row['rating'], 1), 5) - 1] += row['n']
+    for restaurant_id, histogram in histograms.items():
+        review_count, avg_rating = summarize(histogram)
+        Restaurant.objects.filter(id=restaurant_id).update(
+            rating_histogram=histogram,
+            review_count=review_count,
+            avg_rating=avg_rating,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0016_feedback_feedback_type_feedback_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='avg_rating',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='rating_histogram',
+            field=models.JSONField(default=customer.models.empty_rating_histogram, editable=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+from django.db import migrations
+
+
+RESTAURANT_DOCUMENT = (
+    "to_tsvector('simple', coalesce(customer_restaurant.name, '') || ' ' "
+    "|| coalesce(customer_restaurant.description, ''))"
+)
+FOODITEM_DOCUMENT = (
+    "to_tsvector('simple', coalesce(customer_fooditem.name, '') || ' ' "
+    "|| coalesce(customer_fooditem.description, ''))"
+)
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS customer_restaurant_fts USING fts5("
+    "name, description, cuisine, location, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS customer_fooditem_fts USING fts5("
+    "name, description, restaurant, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO customer_restaurant_fts (rowid, name, description, cuisine, location) "
+    "SELECT id, coalesce(name, ''), coalesce(description, ''), coalesce(cuisine, ''), "
+    "coalesce(location, '') FROM customer_restaurant",
+    "INSERT INTO customer_fooditem_fts (rowid, name, description, restaurant) "
+    "SELECT id, coalesce(name, ''), coalesce(description, ''), 'r' || restaurant_id "
+    "FROM customer_fooditem",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS customer_restaurant_fts",
+    "DROP TABLE IF EXISTS customer_fooditem_fts",
+]
+
+POSTGRES_FORWARD = [
+    f"CREATE INDEX IF NOT EXISTS customer_restaurant_search_gin "
+    f"ON customer_restaurant USING gin ({RESTAURANT_DOCUMENT})",
+    "CREATE INDEX IF NOT EXISTS customer_restaurant_cuisine_gin ON customer_restaurant "
+    "USING gin (to_tsvector('simple', coalesce(customer_restaurant.cuisine, '')))",
+    "CREATE INDEX IF NOT EXISTS customer_restaurant_location_gin ON customer_restaurant "
+    "USING gin (to_tsvector('simple', coalesce(customer_restaurant.location, '')))",
+    f"CREATE INDEX IF NOT EXISTS customer_fooditem_search_gin "
+    f"ON customer_fooditem USING gin ({FOODITEM_DOCUMENT})",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS customer_restaurant_search_gin",
+    "DROP INDEX IF EXISTS customer_restaurant_cuisine_gin",
+    "DROP INDEX IF EXISTS customer_restaurant_location_gin",
+    "DROP INDEX IF EXISTS customer_fooditem_search_gin",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0017_restaurant_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
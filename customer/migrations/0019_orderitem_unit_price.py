@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-17 13:02
+
+from django.db import migrations, models
+
+
+def backfill_unit_price(apps, schema_editor):
+    # Historic orders were charged the menu price, so snapshot that.
+    OrderItem = apps.get_model('customer', 'OrderItem')
+    FoodItem = apps.get_model('customer', 'FoodItem')
+    OrderItem.objects.filter(unit_price__isnull=True).update(
+        unit_price=models.Subquery(
+            FoodItem.objects.filter(id=models.OuterRef('food_item_id')).values('price')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0018_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.RunPython(backfill_unit_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-17 13:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0020_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.fooditem')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.restaurant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_lines', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'restaurant', 'food_item'), name='unique_cart_line')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 13:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_popularity(apps, schema_editor):
+    OrderItem = apps.get_model('customer', 'OrderItem')
+    DailyItemPopularity = apps.get_model('customer', 'DailyItemPopularity')
+    rows = (
+        OrderItem.objects.annotate(day=TruncDate('order__created_at'))
+        .values('food_item__restaurant_id', 'food_item_id', 'day')
+        .annotate(quantity=models.Sum('quantity'))
+    )
+    DailyItemPopularity.objects.bulk_create(
+        [
+            DailyItemPopularity(
+                restaurant_id=row['food_item__restaurant_id'],
+                food_item_id=row['food_item_id'],
+                date=row['day'],
+                quantity=row['quantity'],
+            )
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0021_cartline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyItemPopularity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.fooditem')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='customer.restaurant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['restaurant', 'date', 'quantity'], name='popularity_rest_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('food_item', 'date'), name='unique_item_popularity_day')],
+            },
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
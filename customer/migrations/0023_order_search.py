@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-17 13:38
+
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS customer_order_fts USING fts5("
+    "document, customer, tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO customer_order_fts (rowid, document, customer) "
+    "SELECT id, search_document, 'u' || customer_id FROM customer_order",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS customer_order_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS customer_order_search_gin ON customer_order "
+    "USING gin (to_tsvector('simple', customer_order.search_document))",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS customer_order_search_gin",
+]
+
+
+def backfill_search_documents(apps, schema_editor, batch_size=500):
+    Order = apps.get_model('customer', 'Order')
+    OrderItem = apps.get_model('customer', 'OrderItem')
+    Restaurant = apps.get_model('customer', 'Restaurant')
+
+    def save(names):
+        orders = list(Order.objects.filter(pk__in=names).select_related('restaurant').only('id', 'restaurant__name'))
+        for order in orders:
+            order.search_document = ' '.join([order.restaurant.name, *names[order.id]])
+        Order.objects.bulk_update(orders, ['search_document'])
+
+    # Lines arrive grouped by order, so only one batch of orders is held at a time.
+    lines = OrderItem.objects.order_by('order_id', 'id').values_list('order_id', 'food_item__name')
+    names = {}
+    for order_id, group in groupby(lines.iterator(chunk_size=2000), key=itemgetter(0)):
+        names[order_id] = [name for _, name in group]
+        if len(names) >= batch_size:
+            save(names)
+            names = {}
+    save(names)
+    # Orders without lines are found by their restaurant name alone.
+    Order.objects.filter(search_document='').update(
+        search_document=Subquery(Restaurant.objects.filter(pk=OuterRef('restaurant_id')).values('name')[:1])
+    )
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for sql in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0022_daily_item_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
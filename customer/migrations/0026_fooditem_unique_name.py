@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 15:12
+
+from django.db import migrations, models
+
+
+def rename_duplicate_names(apps, schema_editor):
+    # Keep the oldest item's name and number the rest, so existing order
+    # lines and carts still point at every item.
+    FoodItem = apps.get_model('customer', 'FoodItem')
+    duplicates = (
+        FoodItem.objects.values('restaurant_id', 'name')
+        .annotate(n=models.Count('id')).filter(n__gt=1)
+    )
+    for group in duplicates:
+        items = FoodItem.objects.filter(restaurant_id=group['restaurant_id'], name=group['name'])
+        taken = set(FoodItem.objects.filter(restaurant_id=group['restaurant_id']).values_list('name', flat=True))
+        number = 1
+        for item in items.order_by('id')[1:]:
+            while True:
+                number += 1
+                suffix = f' ({number})'
+                name = item.name[:255 - len(suffix)] + suffix
+                if name not in taken:
+                    break
+            taken.add(name)
+            FoodItem.objects.filter(pk=item.pk).update(name=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0025_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_names, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='fooditem',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='unique_food_item_name'),
+        ),
+    ]
@@ -3,6 +3,11 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 
 
+def empty_rating_histogram():
+    """Per-star review counts; index 0 holds 1-star reviews, index 4 holds 5-star."""
+    return [0, 0, 0, 0, 0]
+
+
 class Restaurant(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
@@ -16,6 +21,8 @@ class Restaurant(models.Model):
     photo = models.ImageField(
         upload_to="restaurant_photos/", blank=True, null=True
     )
+    # Resized copies of ``photo``, maintained by customer.images
+    photo_renditions = models.JSONField(default=dict, blank=True, editable=False)
     location = models.CharField(max_length=150, blank=True, null=True)
     cuisine = models.CharField(max_length=150, blank=True, null=True)
     avg_price = models.DecimalField(
@@ -23,6 +30,21 @@ class Restaurant(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalised from visible reviews, maintained by customer.ratings
+    avg_rating = models.DecimalField(
+        max_digits=3, decimal_places=2, null=True, blank=True, editable=False
+    )
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_histogram = models.JSONField(
+        default=empty_rating_histogram, editable=False
+    )
+
+    class Meta:
+        indexes = [
+            # The catalogue is listed alphabetically.
+            models.Index(fields=["name", "id"], name="restaurant_name_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -39,6 +61,8 @@ class FoodItem(models.Model):
     image = models.ImageField(
         upload_to="food_images/", blank=True, null=True
     )
+    # Resized copies of ``image``, maintained by customer.images
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
     is_veg = models.BooleanField(default=True)
 
     # New fields
@@ -50,6 +74,26 @@ class FoodItem(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # Bulk imports upsert on this pair.
+            models.UniqueConstraint(
+                fields=["restaurant", "name"], name="unique_food_item_name"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["restaurant", "is_special", "deal_active"],
+                name="fooditem_rest_featured_idx",
+            ),
+            # Specials and deals sort first on the menu; most items are neither.
+            models.Index(
+                fields=["restaurant", "id"],
+                name="fooditem_featured_partial_idx",
+                condition=models.Q(is_special=True) | models.Q(deal_active=True),
+            ),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.restaurant.name})"
 
@@ -80,6 +124,30 @@ class Order(models.Model):
     status = models.CharField(
         max_length=20, choices=STATUS_CHOICES, default="Pending"
     )
+    # Restaurant and item names as ordered; indexed by customer.search
+    search_document = models.TextField(blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            # Dashboard order list and status counts per restaurant
+            models.Index(
+                fields=["restaurant", "status", "-created_at"],
+                name="order_rest_status_created_idx",
+            ),
+            models.Index(
+                fields=["restaurant", "-created_at"], name="order_rest_created_idx"
+            ),
+            # Customer order history
+            models.Index(
+                fields=["customer", "-created_at"], name="order_cust_created_idx"
+            ),
+            # "Has this customer completed an order here?" checks for reviews
+            models.Index(
+                fields=["customer", "restaurant"],
+                name="order_cust_completed_idx",
+                condition=models.Q(status="Completed"),
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -92,11 +160,62 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+    # Price charged per unit when the order was placed
+    unit_price = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True
+    )
 
     def __str__(self):
         return f"{self.quantity} x {self.food_item.name}"
 
 
+class CartLine(models.Model):
+    """One line of a customer's cart when carts are kept in the database.
+
+    See ``customer.cart.DatabaseCartStore``; with memcached configured the
+    cart lives in the cache instead.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="cart_lines")
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "restaurant", "food_item"], name="unique_cart_line"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.food_item.name} for {self.user.username}"
+
+
+class DailyItemPopularity(models.Model):
+    """Units of a menu item ordered on one local day (see customer.popularity)."""
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE)
+    date = models.DateField()
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["food_item", "date"], name="unique_item_popularity_day"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["restaurant", "date", "quantity"],
+                name="popularity_rest_date_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.food_item.name} on {self.date}"
+
+
 class UserProfile(models.Model):
     DIET_CHOICES = [
         ("any", "Any"),
@@ -121,6 +240,29 @@ class UserProfile(models.Model):
         return f"Profile: {self.user.username}"
 
 
+class Recommendation(models.Model):
+    """One of a user's precomputed "Recommended for you" restaurants (see customer.recommendations)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="recommendations")
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "restaurant"], name="unique_recommendation"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "rank"], name="recommendation_user_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.rank} {self.restaurant.name} for {self.user.username}"
+
+
 class Review(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     restaurant = models.ForeignKey(
@@ -131,6 +273,17 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     visible = models.BooleanField(default=True)  # Owner can hide if necessary
 
+    class Meta:
+        indexes = [
+            # Reviews are only ever read visible, newest first (menu page,
+            # rating summaries), so one partial index covers them.
+            models.Index(
+                fields=["restaurant", "-created_at"],
+                name="review_visible_partial_idx",
+                condition=models.Q(visible=True),
+            ),
+        ]
+
     def __str__(self):
         return (
             f"{self.rating} - {self.restaurant.name} "
@@ -178,6 +331,24 @@ class Feedback(models.Model):
         max_length=10, choices=PRIORITY, default="medium"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["restaurant", "-created_at"], name="feedback_rest_created_idx"
+            ),
+            # The owner's inbox of unseen feedback stays small; every query
+            # on ``seen`` asks for unseen feedback.
+            models.Index(
+                fields=["restaurant", "-created_at"],
+                name="feedback_unseen_partial_idx",
+                condition=models.Q(seen=False),
+            ),
+            # Customer's own feedback history on the profile page
+            models.Index(
+                fields=["user", "-created_at"], name="feedback_user_created_idx"
+            ),
+        ]
+
     def add_response(self, user, response_text):
         """Owner adds a response to the feedback."""
         self.response = response_text
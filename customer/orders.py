@@ -0,0 +1,42 @@
+"""Checkout: turn a priced cart into an ``Order`` with its lines."""
+from django.db import transaction
+from django.utils import timezone
+
+from . import popularity, search
+from .models import Order, OrderItem
+
+
+def place_order(customer, restaurant, cart):
+    """Create an order from a resolved cart (see ``customer.cart.resolve_cart``).
+
+    The menu was already read while resolving the cart, so the write
+    transaction is just the order insert plus one ``bulk_create`` of its
+    lines, each carrying the unit price the customer saw, and one upsert of
+    the day's popularity counters. The lines are bulk-created without
+    signals, so the order's ``search_document`` is written with the order
+    and indexed by its ``post_save`` receiver.
+    """
+    with transaction.atomic():
+        order = Order.objects.create(
+            customer=customer,
+            restaurant=restaurant,
+            total_price=cart.total,
+            search_document=search.order_search_document(
+                restaurant.name, [line["food"].name for line in cart.items]
+            ),
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                food_item=line["food"],
+                quantity=line["quantity"],
+                unit_price=line["food"].get_display_price(),
+            )
+            for line in cart.items
+        ])
+        popularity.record_order(
+            restaurant.id,
+            [(line["food"].id, line["quantity"]) for line in cart.items],
+            day=timezone.localdate(order.created_at),
+        )
+    return order
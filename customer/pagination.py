@@ -0,0 +1,124 @@
+"""Keyset ("seek") pagination with opaque cursors.
+
+``Paginator`` pages with ``COUNT(*)`` plus ``OFFSET``, which gets slower
+the deeper you go. ``KeysetPaginator`` instead remembers the sort key of
+the last (or first) row on a page and asks for rows strictly after (or
+before) it, so every page costs the same as the first one.
+
+The ordering must be a unique, non-null key, e.g. ``("-created_at", "-id")``.
+Fields may be model fields or annotations on the queryset.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip("-") for name in self.ordering]
+
+    # ---------- cursors ----------
+    def _output_field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return self.queryset.model._meta.get_field(name)
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def encode_cursor(self, direction, obj):
+        values = [
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in self._key(obj)
+        ]
+        payload = json.dumps({"d": direction, "k": values}, separators=(",", ":"), default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Return ``(direction, values)`` or ``None`` for a missing/garbled cursor."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, raw = payload["d"], payload["k"]
+            if direction not in ("n", "p") or len(raw) != len(self.fields):
+                return None
+            values = [
+                self._output_field(name).to_python(value)
+                for name, value in zip(self.fields, raw)
+            ]
+        except (ValueError, KeyError, TypeError, binascii.Error, ValidationError):
+            return None
+        return direction, values
+
+    # ---------- paging ----------
+    def _seek(self, values, forward):
+        """Q for rows strictly after ``values`` in the (possibly reversed) ordering."""
+        clauses = []
+        for i, name in enumerate(self.ordering):
+            field = name.lstrip("-")
+            descending = name.startswith("-") == forward
+            lookup = "lt" if descending else "gt"
+            equal = {f: v for f, v in zip(self.fields[:i], values[:i])}
+            clauses.append(Q(**equal, **{f"{field}__{lookup}": values[i]}))
+        return reduce(or_, clauses)
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering]
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor)
+        direction, values = decoded if decoded else ("n", None)
+        forward = direction == "n"
+
+        qs = self.queryset.order_by(*(self.ordering if forward else self._reversed_ordering()))
+        if values is not None:
+            qs = qs.filter(self._seek(values, forward))
+        rows = list(qs[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+        next_cursor = self.encode_cursor("n", rows[-1]) if rows and has_next else None
+        previous_cursor = self.encode_cursor("p", rows[0]) if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,71 @@
+"""Popular-today counters for menu items.
+
+``place_order`` adds each line's quantity to a ``DailyItemPopularity`` row
+for the local day (``TIME_ZONE``) it was placed, with one upsert. The menu
+reads the ids of items past ``POPULAR_THRESHOLD`` from a cache key that
+embeds the local date. That key rolls over at midnight by itself, and
+otherwise it lives for ``POPULAR_CACHE_TIMEOUT`` seconds.
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DailyItemPopularity
+
+
+# An item is "popular today" once more than this many units were ordered.
+POPULAR_THRESHOLD = 10
+POPULAR_CACHE_TIMEOUT = 60
+
+
+def popular_cache_key(restaurant_id, day):
+    return f"popular:{restaurant_id}:{day.isoformat()}"
+
+
+def add_counts(rows):
+    """Upsert ``(restaurant_id, food_item_id, day, quantity)`` rows onto the counters."""
+    if connection.vendor in ("sqlite", "postgresql"):
+        table = DailyItemPopularity._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} (restaurant_id, food_item_id, date, quantity) "
+                f"VALUES (%s, %s, %s, %s) "
+                f"ON CONFLICT (food_item_id, date) "
+                f"DO UPDATE SET quantity = {table}.quantity + excluded.quantity",
+                rows,
+            )
+        return
+    for restaurant_id, food_item_id, day, quantity in rows:
+        counter, created = DailyItemPopularity.objects.get_or_create(
+            food_item_id=food_item_id, date=day,
+            defaults={"restaurant_id": restaurant_id, "quantity": quantity},
+        )
+        if not created:
+            DailyItemPopularity.objects.filter(pk=counter.pk).update(quantity=F("quantity") + quantity)
+
+
+def record_order(restaurant_id, lines, day=None):
+    """Count ``lines`` (``(food_item_id, quantity)`` pairs) towards ``day``."""
+    day = day or timezone.localdate()
+    rows = [(restaurant_id, food_item_id, day, quantity) for food_item_id, quantity in lines if quantity > 0]
+    if not rows:
+        return
+    add_counts(rows)
+    key = popular_cache_key(restaurant_id, day)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def popular_item_ids(restaurant_id):
+    """Ids of the restaurant's items ordered more than POPULAR_THRESHOLD times today."""
+    today = timezone.localdate()
+    key = popular_cache_key(restaurant_id, today)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            DailyItemPopularity.objects.filter(
+                restaurant_id=restaurant_id, date=today, quantity__gt=POPULAR_THRESHOLD
+            ).values_list("food_item_id", flat=True)
+        )
+        cache.set(key, ids, POPULAR_CACHE_TIMEOUT)
+    return ids
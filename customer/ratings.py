@@ -0,0 +1,135 @@
+"""Denormalised rating aggregates stored on ``Restaurant``.
+
+Each restaurant carries a five-bucket histogram of its visible review
+ratings; ``review_count`` and ``avg_rating`` are derived from it. Review
+saves and deletes apply a delta to the histogram instead of re-aggregating
+the whole ``Review`` table, and ``rebuild_ratings`` recomputes everything
+from scratch (see the ``rebuild_ratings`` management command).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Restaurant, Review, empty_rating_histogram as empty_histogram
+
+
+MAX_RATING = 5
+
+
+def _bucket(rating):
+    return min(max(int(rating), 1), MAX_RATING) - 1
+
+
+def summarize(histogram):
+    """Return ``(review_count, avg_rating)`` for a rating histogram."""
+    count = sum(histogram)
+    if not count:
+        return 0, None
+    total = sum((i + 1) * n for i, n in enumerate(histogram))
+    avg = (Decimal(total) / count).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return count, avg
+
+
+def apply_rating_change(restaurant_id, removed=None, added=None):
+    """Move one review out of the ``removed`` bucket and into the ``added`` one.
+
+    Either rating may be ``None``. The restaurant row is locked for the
+    duration so concurrent reviews don't lose updates.
+    """
+    if removed is None and added is None:
+        return
+    with transaction.atomic():
+        restaurant = (
+            Restaurant.objects.select_for_update()
+            .only("id", "rating_histogram")
+            .filter(id=restaurant_id)
+            .first()
+        )
+        if restaurant is None:
+            # Restaurant is being deleted along with its reviews.
+            return
+        histogram = list(restaurant.rating_histogram or empty_histogram())
+        if removed is not None:
+            histogram[_bucket(removed)] = max(histogram[_bucket(removed)] - 1, 0)
+        if added is not None:
+            histogram[_bucket(added)] += 1
+        review_count, avg_rating = summarize(histogram)
+        Restaurant.objects.filter(id=restaurant_id).update(
+            rating_histogram=histogram,
+            review_count=review_count,
+            avg_rating=avg_rating,
+        )
+
+
+def rebuild_ratings(restaurants=None):
+    """Recompute the aggregates from ``Review`` and return the number of restaurants updated."""
+    if restaurants is None:
+        restaurants = Restaurant.objects.all()
+    restaurant_ids = list(restaurants.values_list("id", flat=True))
+
+    histograms = {rid: empty_histogram() for rid in restaurant_ids}
+    rows = (
+        Review.objects.filter(restaurant_id__in=restaurant_ids, visible=True)
+        .values("restaurant_id", "rating")
+        .annotate(n=Count("id"))
+    )
+    for row in rows:
+        histograms[row["restaurant_id"]][_bucket(row["rating"])] += row["n"]
+
+    updated = []
+    for rid, histogram in histograms.items():
+        review_count, avg_rating = summarize(histogram)
+        updated.append(Restaurant(
+            id=rid,
+            rating_histogram=histogram,
+            review_count=review_count,
+            avg_rating=avg_rating,
+        ))
+    Restaurant.objects.bulk_update(
+        updated,
+        ["rating_histogram", "review_count", "avg_rating"],
+        batch_size=500,
+    )
+    return len(updated)
+
+
+# ---------- Signal receivers ----------
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, raw=False, **kwargs):
+    """Stash the stored rating/visibility so post_save can compute the delta."""
+    instance._rating_before = None
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Review.objects.filter(pk=instance.pk)
+        .values("restaurant_id", "rating", "visible")
+        .first()
+    )
+    if previous and previous["visible"]:
+        instance._rating_before = (previous["restaurant_id"], previous["rating"])
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_rating_before", None)
+    after = (instance.restaurant_id, instance.rating) if instance.visible else None
+    if before == after:
+        return
+    if before and after and before[0] == after[0]:
+        apply_rating_change(after[0], removed=before[1], added=after[1])
+        return
+    if before:
+        apply_rating_change(before[0], removed=before[1])
+    if after:
+        apply_rating_change(after[0], added=after[1])
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    if instance.visible:
+        apply_rating_change(instance.restaurant_id, removed=instance.rating)
@@ -0,0 +1,349 @@
+"""Precomputed "Recommended for you" restaurants.
+
+Restaurants are scored by how many customers they share with the ones a
+user already orders from or has favourited: co-occurrence of restaurants
+(not individual dishes) in customers' completed orders, normalised to
+cosine similarity. A dish belongs to one restaurant, so dish pairs would
+only add up to these restaurant pairs, from far more rows. A matching
+``cuisine_preference`` adds a boost, a vegetarian or vegan diet drops
+restaurants without vegetarian dishes, and popular restaurants fill any
+remaining slots. Restaurants the user has already ordered from are left
+out.
+
+The top ``TOP_N`` per user are stored as ``Recommendation`` rows, so the
+list page reads them with a single indexed query. Completing an order or
+changing a profile queues that user for a refresh after commit. A single
+background thread drains the queue, so a burst of changes costs one
+refresh cycle. The per-restaurant inputs (customer counts, popularity,
+vegetarian menus) are cached for ``INPUTS_CACHE_TIMEOUT`` seconds rather
+than aggregated over every order per cycle; a restaurant missing from the
+cached counts is counted on the spot.
+A refresh looks at the customers behind each restaurant's most recent
+orders (``MAX_NEIGHBOURS`` in all) rather than every customer. Set
+``RECOMMENDATION_REFRESH_ASYNC = False`` to refresh inline instead. The
+``refresh_recommendations`` command rebuilds everyone.
+"""
+import logging
+import math
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+
+from .models import FoodItem, Order, Recommendation, Restaurant, UserProfile
+
+
+COMPLETED = "Completed"
+TOP_N = 8
+FAVORITE_WEIGHT = 2.0
+CUISINE_BOOST = 0.5
+# Popularity only breaks ties and fills empty slots.
+POPULARITY_WEIGHT = 0.1
+VEGETARIAN_DIETS = ("veg", "vegan")
+# Recent orders per refresh used to find customers with similar tastes.
+MAX_NEIGHBOURS = 5000
+INPUTS_CACHE_KEY = "recommendations:inputs"
+INPUTS_CACHE_TIMEOUT = 300
+
+logger = logging.getLogger(__name__)
+
+# Users waiting for the background refresh; see schedule_refresh().
+_pending = set()
+_lock = threading.Lock()
+_executor = None
+
+
+# ---------- Inputs ----------
+def _baskets(customer_ids=None):
+    """Map customer id -> set of restaurants they completed orders at."""
+    qs = Order.objects.filter(status=COMPLETED)
+    if customer_ids is not None:
+        qs = qs.filter(customer_id__in=customer_ids)
+    baskets = defaultdict(set)
+    for customer_id, restaurant_id in qs.values_list("customer_id", "restaurant_id").distinct():
+        baskets[customer_id].add(restaurant_id)
+    return baskets
+
+
+def _cooccurrence(baskets, rows=None):
+    """Customers shared by each pair of restaurants, limited to ``rows`` if given."""
+    co = defaultdict(Counter)
+    for basket in baskets.values():
+        for a in basket if rows is None else basket & rows:
+            for b in basket:
+                if a != b:
+                    co[a][b] += 1
+    return co
+
+
+def _customer_counts(restaurant_ids=None):
+    """Map restaurant id -> distinct customers with a completed order there."""
+    qs = Order.objects.filter(status=COMPLETED)
+    if restaurant_ids is not None:
+        qs = qs.filter(restaurant_id__in=restaurant_ids)
+    return dict(
+        qs.values("restaurant_id")
+        .annotate(n=Count("customer_id", distinct=True))
+        .values_list("restaurant_id", "n")
+    )
+
+
+def _vegetarian_restaurants():
+    return set(FoodItem.objects.filter(is_veg=True).values_list("restaurant_id", flat=True).distinct())
+
+
+def _seeds(history, favorites):
+    """Weight of each restaurant the user has shown interest in."""
+    seeds = Counter()
+    for restaurant_id, orders in history.items():
+        seeds[restaurant_id] += 1 + math.log(orders)
+    for restaurant_id in favorites:
+        seeds[restaurant_id] += FAVORITE_WEIGHT
+    return seeds
+
+
+# ---------- Scoring ----------
+def rank_restaurants(*, history, favorites, preference, vegetarian, co, counts,
+                     cuisine_of, popular, veg_ids):
+    """Return ``[(restaurant_id, score), ...]`` best first, at most ``TOP_N``.
+
+    ``history`` maps restaurants to the user's completed orders there and
+    ``cuisine_of`` must cover every candidate restaurant.
+    """
+    scores = Counter()
+    for seed, weight in _seeds(history, favorites).items():
+        for other, shared in co.get(seed, {}).items():
+            scores[other] += weight * shared / math.sqrt(counts[seed] * counts[other])
+    for restaurant_id in favorites:
+        scores[restaurant_id] += FAVORITE_WEIGHT
+    if popular:
+        most = max(popular.values())
+        for restaurant_id, n in popular.items():
+            scores[restaurant_id] += POPULARITY_WEIGHT * n / most
+
+    preference = preference.strip().lower()
+    if preference:
+        for restaurant_id, cuisine in cuisine_of.items():
+            if preference in (cuisine or "").lower():
+                scores[restaurant_id] += CUISINE_BOOST
+
+    ranked = [
+        (restaurant_id, score)
+        for restaurant_id, score in scores.items()
+        if restaurant_id not in history
+        and restaurant_id in cuisine_of
+        and (not vegetarian or restaurant_id in veg_ids)
+    ]
+    ranked.sort(key=lambda pair: (-pair[1], pair[0]))
+    return ranked[:TOP_N]
+
+
+def _rows(user_id, ranked):
+    return [
+        Recommendation(user_id=user_id, restaurant_id=restaurant_id, rank=rank, score=score)
+        for rank, (restaurant_id, score) in enumerate(ranked, start=1)
+    ]
+
+
+# ---------- Refresh ----------
+def _global_inputs():
+    """Customer counts, popular restaurants and vegetarian restaurant ids, cached for a few minutes."""
+    inputs = cache.get(INPUTS_CACHE_KEY)
+    if inputs is None:
+        counts = _customer_counts()
+        popular = dict(sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))[: TOP_N * 2])
+        inputs = (counts, popular, _vegetarian_restaurants())
+        cache.set(INPUTS_CACHE_KEY, inputs, INPUTS_CACHE_TIMEOUT)
+    return inputs
+
+
+def _neighbours(seeds):
+    """Recent customers of each seed restaurant, at most ``MAX_NEIGHBOURS`` orders' worth."""
+    if not seeds:
+        return set()
+    per_seed = max(MAX_NEIGHBOURS // len(seeds), 1)
+    neighbours = set()
+    for restaurant_id in seeds:
+        neighbours.update(
+            Order.objects.filter(status=COMPLETED, restaurant_id=restaurant_id)
+            .order_by("-created_at")
+            .values_list("customer_id", flat=True)[:per_seed]
+        )
+    return neighbours
+
+
+def _replace(user_id, rows):
+    with transaction.atomic():
+        # Overlapping refreshes of one user queue here instead of
+        # interleaving their deletes and inserts.
+        User.objects.select_for_update().filter(pk=user_id).exists()
+        Recommendation.objects.filter(user_id=user_id).delete()
+        Recommendation.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["user", "restaurant"], update_fields=["rank", "score"]
+        )
+
+
+def refresh_user(user_id, inputs=None):
+    """Recompute one user's recommendations from their neighbourhood only.
+
+    ``inputs`` is a ``_global_inputs()`` result to reuse across users.
+    """
+    counts, popular, veg_ids = inputs or _global_inputs()
+    profile = UserProfile.objects.filter(user_id=user_id).first()
+    favorites = set(profile.favorite_restaurants.values_list("id", flat=True)) if profile else set()
+    history = Counter(dict(
+        Order.objects.filter(customer_id=user_id, status=COMPLETED)
+        .values("restaurant_id")
+        .annotate(n=Count("id"))
+        .values_list("restaurant_id", "n")
+    ))
+    seeds = set(history) | favorites
+
+    # Customers who share a restaurant with this user, and where else they eat.
+    co = _cooccurrence(_baskets(_neighbours(seeds)), rows=seeds)
+    missing = (co.keys() | {other for row in co.values() for other in row}) - counts.keys()
+    if missing:
+        # Completed their first orders since the counts were cached.
+        counts = {**counts, **_customer_counts(missing)}
+
+    candidates = seeds | popular.keys() | {other for row in co.values() for other in row}
+    cuisine_of = dict(Restaurant.objects.filter(id__in=candidates).values_list("id", "cuisine"))
+    preference = profile.cuisine_preference.strip() if profile else ""
+    if preference:
+        cuisine_of.update(
+            Restaurant.objects.filter(cuisine__icontains=preference)
+            .order_by("-review_count", "id")
+            .values_list("id", "cuisine")[: TOP_N * 2]
+        )
+    vegetarian = bool(profile) and profile.diet_preference in VEGETARIAN_DIETS
+
+    ranked = rank_restaurants(
+        history=history,
+        favorites=favorites,
+        preference=preference,
+        vegetarian=vegetarian,
+        co=co,
+        counts=counts,
+        cuisine_of=cuisine_of,
+        popular=popular,
+        veg_ids=veg_ids,
+    )
+    _replace(user_id, _rows(user_id, ranked))
+    return len(ranked)
+
+
+def refresh_users(user_ids):
+    """Refresh several users, computing the global inputs once."""
+    inputs = _global_inputs()
+    return sum(refresh_user(user_id, inputs) for user_id in user_ids)
+
+
+def rebuild_recommendations(users=None, batch_size=500):
+    """Recompute recommendations for ``users`` (default: everyone) and return the rows written."""
+    if users is None:
+        users = User.objects.all()
+    user_ids = list(users.values_list("id", flat=True))
+
+    baskets = _baskets()
+    co = _cooccurrence(baskets)
+    counts = Counter(restaurant_id for basket in baskets.values() for restaurant_id in basket)
+    popular = dict(sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))[: TOP_N * 2])
+    cuisine_of = dict(Restaurant.objects.values_list("id", "cuisine"))
+    veg_ids = _vegetarian_restaurants()
+
+    profiles = {
+        profile.user_id: profile
+        for profile in UserProfile.objects.filter(user_id__in=user_ids).prefetch_related("favorite_restaurants")
+    }
+    histories = defaultdict(Counter)
+    for customer_id, restaurant_id, n in (
+        Order.objects.filter(status=COMPLETED, customer_id__in=user_ids)
+        .values("customer_id", "restaurant_id")
+        .annotate(n=Count("id"))
+        .values_list("customer_id", "restaurant_id", "n")
+    ):
+        histories[customer_id][restaurant_id] = n
+
+    rows = []
+    for user_id in user_ids:
+        profile = profiles.get(user_id)
+        rows.extend(_rows(user_id, rank_restaurants(
+            history=histories[user_id],
+            favorites={r.id for r in profile.favorite_restaurants.all()} if profile else set(),
+            preference=profile.cuisine_preference if profile else "",
+            vegetarian=bool(profile) and profile.diet_preference in VEGETARIAN_DIETS,
+            co=co,
+            counts=counts,
+            cuisine_of=cuisine_of,
+            popular=popular,
+            veg_ids=veg_ids,
+        )))
+
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        # A per-user refresh may have written rows since the delete.
+        Recommendation.objects.bulk_create(
+            rows, batch_size=batch_size, update_conflicts=True,
+            unique_fields=["user", "restaurant"], update_fields=["rank", "score"],
+        )
+    return len(rows)
+
+
+def _drain():
+    user_ids = []
+    try:
+        close_old_connections()
+        with _lock:
+            user_ids = sorted(_pending)
+            _pending.clear()
+        refresh_users(user_ids)
+    except Exception:
+        logger.exception("Recommendation refresh failed for users %s", user_ids)
+    finally:
+        close_old_connections()
+
+
+def _enqueue(user_id):
+    global _executor
+    if not getattr(settings, "RECOMMENDATION_REFRESH_ASYNC", True):
+        refresh_users([user_id])
+        return
+    with _lock:
+        queued = bool(_pending)
+        _pending.add(user_id)
+        if queued:
+            # The job already queued will pick this user up.
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommendations")
+    _executor.submit(_drain)
+
+
+def schedule_refresh(user_id):
+    transaction.on_commit(lambda: _enqueue(user_id))
+
+
+# ---------- Signal receivers ----------
+@receiver(post_save, sender=Order)
+def refresh_on_order_completed(sender, instance, raw=False, **kwargs):
+    if not raw and instance.status == COMPLETED:
+        schedule_refresh(instance.customer_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def refresh_on_profile_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh(instance.user_id)
+
+
+@receiver(m2m_changed, sender=UserProfile.favorite_restaurants.through)
+def refresh_on_favorites_change(sender, instance, action, reverse=False, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and not reverse:
+        schedule_refresh(instance.user_id)
@@ -0,0 +1,337 @@
+"""Full-text search over restaurants, menu items and order history.
+
+On SQLite the searchable text is mirrored into FTS5 virtual tables (created
+by migrations 0018 and 0023) whose rowid is the model's primary key; the
+receivers at the bottom of this module keep them in sync. An order's
+``search_document`` is rebuilt from its lines whenever a line is saved or
+deleted on its own; ``place_order`` writes it up front because its lines
+are bulk-created. On PostgreSQL the same
+queries run against ``to_tsvector`` expressions backed by GIN indexes, so
+there is nothing to sync. Any other backend falls back to ``icontains``.
+
+Every search term is treated as a prefix, so "pan" matches "Paneer".
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import FoodItem, Order, OrderItem, Restaurant
+
+
+RESTAURANT_FTS_TABLE = "customer_restaurant_fts"
+FOODITEM_FTS_TABLE = "customer_fooditem_fts"
+ORDER_FTS_TABLE = "customer_order_fts"
+
+# PostgreSQL document expressions; must match the GIN indexes in migration 0018.
+PG_RESTAURANT_DOCUMENT = (
+    "to_tsvector('simple', coalesce(customer_restaurant.name, '') || ' ' "
+    "|| coalesce(customer_restaurant.description, ''))"
+)
+PG_RESTAURANT_CUISINE = "to_tsvector('simple', coalesce(customer_restaurant.cuisine, ''))"
+PG_RESTAURANT_LOCATION = "to_tsvector('simple', coalesce(customer_restaurant.location, ''))"
+PG_FOODITEM_DOCUMENT = (
+    "to_tsvector('simple', coalesce(customer_fooditem.name, '') || ' ' "
+    "|| coalesce(customer_fooditem.description, ''))"
+)
+PG_ORDER_DOCUMENT = "to_tsvector('simple', customer_order.search_document)"
+
+
+def tokenize(text):
+    return re.findall(r"\w+", text or "")
+
+
+def _fts5_terms(text):
+    """Build an FTS5 prefix expression, e.g. ``("thai"* AND "cur"*)``."""
+    return "(" + " AND ".join(f'"{t}"*' for t in tokenize(text)) + ")"
+
+
+def _tsquery(text):
+    """Build a ``to_tsquery`` prefix expression, e.g. ``thai:* & cur:*``."""
+    return " & ".join(f"{t.lower()}:*" for t in tokenize(text))
+
+
+def _vendor():
+    return connection.vendor
+
+
+# ---------- Querying ----------
+def filter_restaurants(qs, q="", cuisine="", location=""):
+    """Narrow a Restaurant queryset by keyword, cuisine and location.
+
+    When ``q`` is given the result is annotated with ``search_rank``;
+    ascending order puts the best match first.
+    """
+    terms = [(q, "name description"), (cuisine, "cuisine"), (location, "location")]
+    terms = [(text, columns) for text, columns in terms if text]
+    if not terms:
+        return qs
+    if any(not tokenize(text) for text, _ in terms):
+        return qs.none()
+
+    vendor = _vendor()
+    if vendor == "sqlite":
+        match = " AND ".join(
+            f"{{{columns}}} : {_fts5_terms(text)}" for text, columns in terms
+        )
+        qs = qs.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {RESTAURANT_FTS_TABLE} "
+            f"WHERE {RESTAURANT_FTS_TABLE} MATCH %s",
+            [match],
+        ))
+        if q:
+            qs = qs.annotate(search_rank=RawSQL(
+                f"SELECT rank FROM {RESTAURANT_FTS_TABLE} "
+                f"WHERE {RESTAURANT_FTS_TABLE} MATCH %s "
+                f"AND rowid = customer_restaurant.id",
+                [match],
+                output_field=FloatField(),
+            ))
+        return qs
+
+    if vendor == "postgresql":
+        documents = {
+            "name description": PG_RESTAURANT_DOCUMENT,
+            "cuisine": PG_RESTAURANT_CUISINE,
+            "location": PG_RESTAURANT_LOCATION,
+        }
+        for text, columns in terms:
+            qs = qs.filter(id__in=RawSQL(
+                f"SELECT id FROM customer_restaurant "
+                f"WHERE {documents[columns]} @@ to_tsquery('simple', %s)",
+                [_tsquery(text)],
+            ))
+        if q:
+            qs = qs.annotate(search_rank=RawSQL(
+                f"-ts_rank({PG_RESTAURANT_DOCUMENT}, to_tsquery('simple', %s))",
+                [_tsquery(q)],
+                output_field=FloatField(),
+            ))
+        return qs
+
+    if q:
+        qs = qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
+        qs = qs.annotate(search_rank=Value(0.0, output_field=FloatField()))
+    if cuisine:
+        qs = qs.filter(cuisine__icontains=cuisine)
+    if location:
+        qs = qs.filter(location__icontains=location)
+    return qs
+
+
+def filter_food_items(qs, q, restaurant_id):
+    """Narrow a FoodItem queryset for one restaurant's menu by keyword."""
+    if not q:
+        return qs
+    if not tokenize(q):
+        return qs.none()
+
+    vendor = _vendor()
+    if vendor == "sqlite":
+        match = f'restaurant : "r{int(restaurant_id)}" AND {{name description}} : {_fts5_terms(q)}'
+        return qs.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FOODITEM_FTS_TABLE} "
+            f"WHERE {FOODITEM_FTS_TABLE} MATCH %s",
+            [match],
+        ))
+    if vendor == "postgresql":
+        return qs.filter(id__in=RawSQL(
+            f"SELECT id FROM customer_fooditem WHERE restaurant_id = %s "
+            f"AND {PG_FOODITEM_DOCUMENT} @@ to_tsquery('simple', %s)",
+            [restaurant_id, _tsquery(q)],
+        ))
+    return qs.filter(name__icontains=q)
+
+
+def order_search_document(restaurant_name, item_names):
+    """Text an order is found by: its restaurant and item names as ordered."""
+    return " ".join([restaurant_name or "", *item_names]).strip()
+
+
+def refresh_order_documents(order_ids):
+    """Rebuild ``search_document`` for ``order_ids`` from their lines and reindex them."""
+    names = {}
+    lines = OrderItem.objects.filter(order_id__in=order_ids).order_by("id")
+    for order_id, name in lines.values_list("order_id", "food_item__name"):
+        names.setdefault(order_id, []).append(name)
+    orders = list(
+        Order.objects.filter(pk__in=order_ids)
+        .select_related("restaurant")
+        .only("id", "customer_id", "restaurant__name")
+    )
+    for order in orders:
+        order.search_document = order_search_document(order.restaurant.name, names.get(order.id, []))
+    # bulk_update sends no post_save, so this doesn't re-enter the receivers.
+    Order.objects.bulk_update(orders, ["search_document"])
+    index_orders(orders)
+    return orders
+
+
+def filter_orders(qs, q, customer_id):
+    """Narrow one customer's orders by order number or keyword.
+
+    A plain number, optionally prefixed with "#", is an order number and
+    becomes a primary-key lookup; anything else searches the order's
+    ``search_document``.
+    """
+    if not q:
+        return qs
+    number = q.strip().lstrip("#")
+    if number.isdigit():
+        return qs.filter(pk=int(number))
+    if not tokenize(q):
+        return qs.none()
+
+    vendor = _vendor()
+    if vendor == "sqlite":
+        match = f'customer : "u{int(customer_id)}" AND document : {_fts5_terms(q)}'
+        return qs.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {ORDER_FTS_TABLE} "
+            f"WHERE {ORDER_FTS_TABLE} MATCH %s",
+            [match],
+        ))
+    if vendor == "postgresql":
+        return qs.filter(id__in=RawSQL(
+            f"SELECT id FROM customer_order WHERE customer_id = %s "
+            f"AND {PG_ORDER_DOCUMENT} @@ to_tsquery('simple', %s)",
+            [customer_id, _tsquery(q)],
+        ))
+    return qs.filter(search_document__icontains=q)
+
+
+# ---------- Index maintenance (SQLite FTS5 only) ----------
+def _uses_fts5():
+    return _vendor() == "sqlite"
+
+
+def index_restaurants(restaurants):
+    if not _uses_fts5():
+        return
+    rows = [
+        (r.id, r.name or "", r.description or "", r.cuisine or "", r.location or "")
+        for r in restaurants
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {RESTAURANT_FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {RESTAURANT_FTS_TABLE} (rowid, name, description, cuisine, location) "
+            f"VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+def index_food_items(food_items):
+    if not _uses_fts5():
+        return
+    rows = [
+        (f.id, f.name or "", f.description or "", f"r{f.restaurant_id}")
+        for f in food_items
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FOODITEM_FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {FOODITEM_FTS_TABLE} (rowid, name, description, restaurant) "
+            f"VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+
+
+def index_orders(orders):
+    if not _uses_fts5():
+        return
+    rows = [(o.id, o.search_document or "", f"u{o.customer_id}") for o in orders]
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {ORDER_FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {ORDER_FTS_TABLE} (rowid, document, customer) VALUES (%s, %s, %s)",
+            rows,
+        )
+
+
+def unindex(table, ids):
+    if not _uses_fts5():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(pk,) for pk in ids])
+
+
+def rebuild_search_index(batch_size=2000):
+    """Repopulate the FTS5 tables from scratch; returns (restaurants, food_items, orders) indexed."""
+    if not _uses_fts5():
+        return 0, 0, 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {RESTAURANT_FTS_TABLE}")
+        cursor.execute(f"DELETE FROM {FOODITEM_FTS_TABLE}")
+        cursor.execute(f"DELETE FROM {ORDER_FTS_TABLE}")
+
+    restaurants = Restaurant.objects.only("id", "name", "description", "cuisine", "location")
+    food_items = FoodItem.objects.only("id", "name", "description", "restaurant_id")
+    orders = Order.objects.only("id", "search_document", "customer_id")
+    counts = []
+    for qs, index in (
+        (restaurants, index_restaurants),
+        (food_items, index_food_items),
+        (orders, index_orders),
+    ):
+        batch, total = [], 0
+        for obj in qs.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                index(batch)
+                total += len(batch)
+                batch = []
+        index(batch)
+        counts.append(total + len(batch))
+    return tuple(counts)
+
+
+# ---------- Signal receivers ----------
+@receiver(post_save, sender=Restaurant)
+def index_restaurant_on_save(sender, instance, **kwargs):
+    index_restaurants([instance])
+
+
+@receiver(post_delete, sender=Restaurant)
+def unindex_restaurant_on_delete(sender, instance, **kwargs):
+    unindex(RESTAURANT_FTS_TABLE, [instance.id])
+
+
+@receiver(post_save, sender=FoodItem)
+def index_food_item_on_save(sender, instance, **kwargs):
+    index_food_items([instance])
+
+
+@receiver(post_delete, sender=FoodItem)
+def unindex_food_item_on_delete(sender, instance, **kwargs):
+    unindex(FOODITEM_FTS_TABLE, [instance.id])
+
+
+@receiver(post_save, sender=Order)
+def index_order_on_save(sender, instance, created, **kwargs):
+    if created and not instance.search_document:
+        # Created without a document (the ORM, the admin): start from the
+        # restaurant name; lines saved afterwards extend it.
+        (order,) = refresh_order_documents([instance.id])
+        instance.search_document = order.search_document
+    else:
+        index_orders([instance])
+
+
+@receiver(post_delete, sender=Order)
+def unindex_order_on_delete(sender, instance, **kwargs):
+    unindex(ORDER_FTS_TABLE, [instance.id])
+
+
+@receiver(post_save, sender=OrderItem)
+def reindex_order_on_item_save(sender, instance, **kwargs):
+    refresh_order_documents([instance.order_id])
+
+
+@receiver(post_delete, sender=OrderItem)
+def reindex_order_on_item_delete(sender, instance, origin=None, **kwargs):
+    # Lines deleted along with their order need no new document.
+    if getattr(origin, "model", type(origin)) is OrderItem:
+        refresh_order_documents([instance.order_id])
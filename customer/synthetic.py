@@ -0,0 +1,427 @@
+"""Deterministic synthetic data for benchmarks, load tests and local seeding.
+
+``generate(scale, seed)`` fills the database with owners, customers,
+restaurants, menus, orders, reviews and feedback. The same scale and seed
+always produce the same rows (names, prices, baskets, ratings); only
+timestamps move with the clock. Benchmark runs against them are therefore
+comparable.
+
+The shape follows production rather than a uniform spread. Restaurants,
+dishes within a menu and customers are drawn from Zipf distributions, so a
+few are very popular and most are not. Orders land on lunch and dinner
+peaks over the last ``Scale.days`` days. Orders still in progress are from
+the last two hours.
+
+Orders are produced and written in chunks of ``chunk_size``, each chunk in
+its own transaction, so memory stays flat however many rows are asked for.
+Two writers exist:
+
+* ``"orm"`` uses ``bulk_create``;
+* ``"raw"`` skips model instances and uses ``COPY`` on PostgreSQL with
+  psycopg 3, and ``executemany`` elsewhere.
+
+Both skip signals, so the data those signals maintain is filled in here:
+popularity counters are upserted with each chunk, and the search index,
+ratings, recommendations and daily sales rollups are rebuilt once at the
+end.
+"""
+import itertools
+import random
+from bisect import bisect
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.functions import Length
+from django.utils import timezone
+from system.rollups import rebuild_sales_rollups
+
+from . import popularity, search
+from .models import Feedback, FoodItem, Order, OrderItem, Restaurant, Review, UserProfile
+from .ratings import rebuild_ratings
+from .recommendations import rebuild_recommendations
+
+
+PASSWORD = "benchmark-pass"
+
+CUISINES = [
+    "North Indian", "South Indian", "Chinese", "Italian", "Mughlai",
+    "Street Food", "Bengali", "Gujarati", "Continental", "Desserts",
+]
+LOCATIONS = ["Koramangala", "Indiranagar", "Bandra", "Andheri", "Salt Lake", "Banjara Hills", "Connaught Place"]
+ADJECTIVES = ["Royal", "Spicy", "Golden", "Urban", "Classic", "Little", "Grand", "Green"]
+DISHES = [
+    "Paneer Tikka", "Dal Makhani", "Masala Dosa", "Idli Sambar", "Hakka Noodles",
+    "Veg Biryani", "Chicken Biryani", "Butter Chicken", "Margherita Pizza", "Pasta Arrabbiata",
+    "Chole Bhature", "Pav Bhaji", "Fish Curry", "Mutton Rogan Josh", "Dhokla",
+    "Gulab Jamun", "Rasgulla", "Spring Rolls", "Veg Thali", "Egg Curry",
+]
+NON_VEG_WORDS = ("Chicken", "Fish", "Mutton", "Egg")
+RATING_WEIGHTS = {5: 35, 4: 35, 3: 15, 2: 8, 1: 7}
+DIETS = [choice for choice, _ in UserProfile.DIET_CHOICES]
+FEEDBACK_TYPES = [choice for choice, _ in Feedback.FEEDBACK_TYPES]
+
+# Share of orders in each status; in-progress ones are placed in the last two hours.
+STATUS_WEIGHTS = {"Completed": 84, "Cancelled": 10, "Pending": 3, "Preparing": 3}
+IN_PROGRESS = ("Pending", "Preparing")
+IN_PROGRESS_WINDOW = 2 * 3600
+# Relative order volume per local hour: a lunch and a bigger dinner peak.
+HOUR_WEIGHTS = [
+    2, 1, 1, 0.5, 0.5, 1, 2, 4, 6, 6, 5, 8,
+    14, 15, 10, 5, 4, 6, 10, 16, 18, 15, 9, 4,
+]
+# Zipf exponents: how steeply popularity falls from the top.
+RESTAURANT_SKEW = 1.0
+DISH_SKEW = 1.1
+CUSTOMER_SKEW = 0.6
+MAX_LINES = 4
+SQLITE_CACHE_KIB = 256 * 1024
+
+
+@dataclass(frozen=True)
+class Scale:
+    restaurants: int = 20
+    items_per_restaurant: int = 25
+    users: int = 200
+    orders: int = 2000
+    reviews: int = 400
+    feedback: int = 100
+    days: int = 30
+
+
+SCALES = {
+    "small": Scale(restaurants=5, items_per_restaurant=10, users=20, orders=100, reviews=20, feedback=10),
+    "medium": Scale(),
+    "large": Scale(restaurants=200, items_per_restaurant=40, users=5000, orders=100000, reviews=10000, feedback=2000),
+    # About ten million order lines.
+    "production": Scale(
+        restaurants=2000, items_per_restaurant=60, users=200000, orders=4000000,
+        reviews=200000, feedback=20000, days=365,
+    ),
+}
+
+
+class WeightedSampler:
+    """Draw from ``values`` in proportion to ``weights`` with one ``rng.random()`` call."""
+
+    def __init__(self, values, weights):
+        self.values = list(values)
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.total = self.cum_weights[-1]
+        self.last = len(self.values) - 1
+
+    def draw(self, rng):
+        return self.values[bisect(self.cum_weights, rng.random() * self.total, 0, self.last)]
+
+
+class ZipfSampler(WeightedSampler):
+    """Weight the k-th most popular of ``values`` ``1 / k**skew``.
+
+    Which value gets which rank is shuffled with ``rng``, so popularity is
+    not tied to creation order.
+    """
+
+    def __init__(self, rng, values, skew):
+        values = list(values)
+        rng.shuffle(values)
+        super().__init__(values, (1 / rank ** skew for rank in range(1, len(values) + 1)))
+
+
+@contextmanager
+def _explicit_created_at(*models):
+    # bulk_create runs pre_save, which would stamp every row with now().
+    fields = [model._meta.get_field("created_at") for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def _bulk_load_cache():
+    # SQLite's default 2 MiB page cache thrashes once the order indexes outgrow it.
+    if connection.vendor != "sqlite":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA cache_size")
+        previous = cursor.fetchone()[0]
+        cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA cache_size = {int(previous)}")
+
+
+# ---------- Catalogue ----------
+def _next_number(prefix):
+    """One past the highest ``<prefix><n>`` username, or 0 if there is none."""
+    last = (
+        User.objects.filter(username__regex=rf"^{prefix}[0-9]+$")
+        .order_by(Length("username").desc(), "-username")
+        .values_list("username", flat=True)
+        .first()
+    )
+    return int(last[len(prefix):]) + 1 if last else 0
+
+
+def _create_catalogue(rng, scale, batch_size):
+    # Hashing is deliberately slow; one hash serves every account.
+    password = make_password(PASSWORD)
+    # Number after any earlier run's accounts so seeding again adds to them.
+    first_owner, first_customer = _next_number("owner"), _next_number("customer")
+    owners = User.objects.bulk_create(
+        [User(username=f"owner{n}", password=password) for n in range(first_owner, first_owner + scale.restaurants)],
+        batch_size=batch_size,
+    )
+    customers = User.objects.bulk_create(
+        [
+            User(username=f"customer{n}", password=password)
+            for n in range(first_customer, first_customer + scale.users)
+        ],
+        batch_size=batch_size,
+    )
+    UserProfile.objects.bulk_create(
+        [
+            UserProfile(
+                user=user,
+                diet_preference=rng.choice(DIETS),
+                cuisine_preference=rng.choice(CUISINES),
+            )
+            for user in customers
+        ],
+        batch_size=batch_size,
+    )
+
+    restaurants = []
+    for n, owner in enumerate(owners, first_owner):
+        cuisine = rng.choice(CUISINES)
+        restaurants.append(Restaurant(
+            owner=owner,
+            name=f"{rng.choice(ADJECTIVES)} {cuisine} House {n}",
+            description=f"{cuisine} favourites in {rng.choice(LOCATIONS)}",
+            cuisine=cuisine,
+            location=rng.choice(LOCATIONS),
+            avg_price=Decimal(rng.randrange(150, 900, 50)),
+        ))
+    restaurants = Restaurant.objects.bulk_create(restaurants, batch_size=batch_size)
+
+    food_items = []
+    for position, restaurant in enumerate(restaurants):
+        for n in range(scale.items_per_restaurant):
+            dish = DISHES[(n + position) % len(DISHES)]
+            price = Decimal(rng.randrange(80, 600, 10))
+            deal = rng.random() < 0.1
+            food_items.append(FoodItem(
+                restaurant=restaurant,
+                name=f"{dish} {n}" if n >= len(DISHES) else dish,
+                description=f"House {dish.lower()}",
+                price=price,
+                is_veg=not any(word in dish for word in NON_VEG_WORDS),
+                is_special=rng.random() < 0.05,
+                deal_active=deal,
+                deal_price=(price * Decimal("0.8")).quantize(Decimal("1.00")) if deal else None,
+            ))
+    food_items = FoodItem.objects.bulk_create(food_items, batch_size=batch_size)
+    return customers, restaurants, food_items
+
+
+# ---------- Orders ----------
+def _order_chunks(rng, scale, restaurants, food_items, customer_ids, first_id, chunk_size):
+    """Yield ``(order_rows, line_rows)`` chunks of plain tuples.
+
+    Order rows are ``(id, customer_id, restaurant_id, total_price,
+    created_at, status, search_document)``; line rows are ``(order_id,
+    food_item_id, quantity, unit_price)``.
+    """
+    menus = {}
+    for food in food_items:
+        menus.setdefault(food.restaurant_id, []).append((food.id, food.name, food.get_display_price()))
+    restaurant_sampler = ZipfSampler(rng, [(r.id, r.name) for r in restaurants], RESTAURANT_SKEW)
+    dish_samplers = {rid: ZipfSampler(rng, menu, DISH_SKEW) for rid, menu in menus.items()}
+    customer_sampler = ZipfSampler(rng, customer_ids, CUSTOMER_SKEW)
+    hour_sampler = WeightedSampler(range(24), HOUR_WEIGHTS)
+    status_sampler = WeightedSampler(STATUS_WEIGHTS, STATUS_WEIGHTS.values())
+    random_ = rng.random
+
+    now = timezone.localtime()
+    midnight = timezone.make_aware(datetime.combine(now.date(), time.min))
+    one_day = timedelta(days=1)
+
+    order_id = first_id
+    remaining = scale.orders
+    while remaining:
+        orders, lines = [], []
+        for _ in range(min(chunk_size, remaining)):
+            restaurant_id, restaurant_name = restaurant_sampler.draw(rng)
+            dishes = dish_samplers[restaurant_id]
+            basket = {}
+            # Plain random() arithmetic: randint/choices cost several calls each.
+            for _ in range(1 + int(random_() * MAX_LINES)):
+                dish = dishes.draw(rng)
+                basket[dish] = basket.get(dish, 0) + 1 + int(random_() * 2)
+
+            status = status_sampler.draw(rng)
+            if status in IN_PROGRESS:
+                created_at = now - timedelta(seconds=int(random_() * IN_PROGRESS_WINDOW))
+            else:
+                created_at = midnight + timedelta(
+                    days=-int(random_() * scale.days),
+                    seconds=hour_sampler.draw(rng) * 3600 + int(random_() * 3600),
+                )
+                if created_at > now:
+                    created_at -= one_day
+
+            orders.append((
+                order_id,
+                customer_sampler.draw(rng),
+                restaurant_id,
+                sum(price * qty for (_, _, price), qty in basket.items()),
+                created_at,
+                status,
+                search.order_search_document(restaurant_name, [name for _, name, _ in basket]),
+            ))
+            lines.extend((order_id, food_id, qty, price) for (food_id, _, price), qty in basket.items())
+            order_id += 1
+        remaining -= len(orders)
+        yield orders, lines
+
+
+ORDER_COLUMNS = ("id", "customer_id", "restaurant_id", "total_price", "created_at", "status", "search_document")
+LINE_COLUMNS = ("order_id", "food_item_id", "quantity", "unit_price")
+
+
+def _write_orm(orders, lines, batch_size):
+    Order.objects.bulk_create(
+        [Order(**dict(zip(ORDER_COLUMNS, row))) for row in orders], batch_size=batch_size
+    )
+    OrderItem.objects.bulk_create(
+        [OrderItem(**dict(zip(LINE_COLUMNS, row))) for row in lines], batch_size=batch_size
+    )
+
+
+def _insert_rows(cursor, model, columns, rows):
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ", ".join(connection.ops.quote_name(model._meta.get_field(c).column) for c in columns)
+    raw = cursor.cursor
+    if connection.vendor == "postgresql" and hasattr(raw, "copy"):
+        with raw.copy(f"COPY {table} ({names}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        placeholders = ", ".join(["%s"] * len(columns))
+        cursor.executemany(f"INSERT INTO {table} ({names}) VALUES ({placeholders})", rows)
+
+
+def _write_raw(orders, lines, batch_size):
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        _insert_rows(cursor, Order, ORDER_COLUMNS, [row[:4] + (adapt(row[4]),) + row[5:] for row in orders])
+        _insert_rows(cursor, OrderItem, LINE_COLUMNS, lines)
+
+
+WRITERS = {"orm": _write_orm, "raw": _write_raw}
+
+
+def _create_orders(rng, scale, customers, restaurants, food_items, method, chunk_size, progress):
+    write = WRITERS[method]
+    # Ids are assigned here so lines can point at their order without a round trip.
+    first_id = (Order.objects.aggregate(last=Max("id"))["last"] or 0) + 1
+    written_orders = written_lines = 0
+    chunks = _order_chunks(
+        rng, scale, restaurants, food_items, [c.id for c in customers], first_id, chunk_size
+    )
+    with _explicit_created_at(Order), _bulk_load_cache():
+        for orders, lines in chunks:
+            # created_at is already in local time.
+            placed = {row[0]: (row[2], row[4].date()) for row in orders}
+            sold = Counter()
+            for order_id, food_id, qty, _ in lines:
+                restaurant_id, day = placed[order_id]
+                sold[restaurant_id, food_id, day] += qty
+            with transaction.atomic():
+                write(orders, lines, chunk_size)
+                popularity.add_counts([key + (qty,) for key, qty in sorted(sold.items())])
+            written_orders += len(orders)
+            written_lines += len(lines)
+            if progress:
+                progress(written_orders, written_lines)
+
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Order]):
+            cursor.execute(sql)
+    return written_orders, written_lines
+
+
+def generate(scale, seed=0, method="orm", chunk_size=5000, rebuild=True, progress=None):
+    """Create one dataset of the given ``Scale`` and return the row counts.
+
+    Owners are ``owner0``..., each owning the restaurant with the same
+    number; customers are ``customer0``...; everyone's password is
+    ``PASSWORD``. On a database that already has seeded accounts the
+    numbers continue after the highest ones, so runs can be repeated. ``progress(orders, lines)`` is called after each chunk.
+    With ``rebuild=False`` the search index, ratings, recommendations and
+    sales rollups are left for their own commands.
+    """
+    if method not in WRITERS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {', '.join(WRITERS)}")
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        customers, restaurants, food_items = _create_catalogue(rng, scale, chunk_size)
+
+    orders, lines = _create_orders(rng, scale, customers, restaurants, food_items, method, chunk_size, progress)
+
+    restaurant_sampler = ZipfSampler(rng, restaurants, RESTAURANT_SKEW)
+    rating_sampler = WeightedSampler(RATING_WEIGHTS, RATING_WEIGHTS.values())
+    with transaction.atomic():
+        Review.objects.bulk_create(
+            [
+                Review(
+                    user=rng.choice(customers),
+                    restaurant=restaurant_sampler.draw(rng),
+                    rating=rating_sampler.draw(rng),
+                    comment=rng.choice(["Great food", "Quick delivery", "Too spicy", "Will order again", ""]),
+                )
+                for _ in range(scale.reviews)
+            ],
+            batch_size=chunk_size,
+        )
+        Feedback.objects.bulk_create(
+            [
+                Feedback(
+                    user=rng.choice(customers),
+                    restaurant=restaurant_sampler.draw(rng),
+                    feedback_type=rng.choice(FEEDBACK_TYPES),
+                    message=f"Synthetic feedback {n}",
+                )
+                for n in range(scale.feedback)
+            ],
+            batch_size=chunk_size,
+        )
+
+    if rebuild:
+        search.rebuild_search_index()
+        rebuild_ratings()
+        rebuild_recommendations()
+        rebuild_sales_rollups()
+    return {
+        "users": len(customers) + scale.restaurants,
+        "restaurants": len(restaurants),
+        "food_items": len(food_items),
+        "orders": orders,
+        "order_lines": lines,
+        "reviews": scale.reviews,
+        "feedback": scale.feedback,
+    }
@@ -1,4 +1,9 @@
 from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from customer.images import rendition_urls
+
 register = template.Library()
 
 @register.filter
@@ -6,3 +11,39 @@ def dict_get(d, key):
     if d is None:
         return None
     return d.get(key, None)
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """The current query string with ``cursor`` swapped in (and ``page`` dropped)."""
+    query = context["request"].GET.copy()
+    query.pop("page", None)
+    query["cursor"] = cursor
+    return f"?{query.urlencode()}"
+
+
+@register.simple_tag
+def responsive_image(image, renditions, sizes="100vw", **attrs):
+    """``<picture>`` with WebP and JPEG ``srcset``s built by customer.images.
+
+    Until the renditions of the current upload exist this is a plain
+    ``<img>`` of the original. Extra keyword arguments become attributes of
+    the ``<img>``.
+    """
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    extra = flatatt(attrs)
+    if not renditions or renditions.get("source") != image.name:
+        return format_html('<img src="{}"{}>', image.url, extra)
+    webp = rendition_urls(renditions, "webp")
+    jpeg = rendition_urls(renditions, "jpg")
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        ", ".join(f"{url} {width}w" for url, width in webp),
+        sizes,
+        jpeg[-1][0],
+        ", ".join(f"{url} {width}w" for url, width in jpeg),
+        sizes,
+        extra,
+    )
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin for asserting an upper bound on queries per page.
+
+    Unlike ``assertNumQueries`` the budget is a ceiling, so tests only fail
+    when a page regresses (e.g. an N+1 loop sneaks back into a template).
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, limit, using="default"):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > limit:
+            queries = "\n".join(
+                f"{i}. {query['sql']}"
+                for i, query in enumerate(context.captured_queries, start=1)
+            )
+            self.fail(f"{executed} queries executed, budget is {limit}:\n{queries}")
+
+    def assertQueriesIndependentOf(self, make_request, grow):
+        """Assert ``make_request`` issues the same number of queries before and after ``grow()``."""
+        with CaptureQueriesContext(connections["default"]) as before:
+            make_request()
+        grow()
+        with CaptureQueriesContext(connections["default"]) as after:
+            make_request()
+        self.assertEqual(
+            len(before.captured_queries),
+            len(after.captured_queries),
+            "query count grew with the amount of data on the page",
+        )
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count, Sum
+from django.test import TestCase
+from django.utils import timezone
+from customer import benchmarks
+from customer.models import DailyItemPopularity, FoodItem, Order, OrderItem, Restaurant, Review
+from customer.synthetic import IN_PROGRESS_WINDOW, Scale, generate
+from system.models import DailySalesRollup, OrderInsights
+
+
+TINY = Scale(restaurants=3, items_per_restaurant=5, users=6, orders=30, reviews=10, feedback=4)
+
+
+def report(**stats):
+    defaults = {'p50_ms': 10.0, 'p95_ms': 20.0, 'queries': 5, 'peak_kib': 100.0}
+    return {'meta': {'scale': 'small', 'seed': 0}, 'results': {'client': {'menu': {**defaults, **stats}}}}
+
+
+class SyntheticDataTests(TestCase):
+    def fingerprint(self):
+        return (
+            list(Restaurant.objects.order_by('id').values_list('name', 'cuisine', 'avg_price')),
+            list(FoodItem.objects.order_by('id').values_list('name', 'price', 'is_veg')),
+            list(Order.objects.order_by('id').values_list('customer__username', 'total_price', 'status')),
+            list(Review.objects.order_by('id').values_list('rating', flat=True)),
+        )
+
+    def test_generate_creates_requested_rows(self):
+        """Test the generator honours the scale and rebuilds derived data"""
+        counts = generate(TINY, seed=1)
+        self.assertEqual(counts['users'], 9)
+        self.assertEqual(Restaurant.objects.filter(owner__username__startswith='owner').count(), 3)
+        self.assertEqual(FoodItem.objects.count(), 15)
+        self.assertEqual(Order.objects.count(), 30)
+        self.assertTrue(OrderItem.objects.exists())
+        self.assertTrue(DailyItemPopularity.objects.exists())
+        reviewed = Restaurant.objects.filter(review_count__gt=0)
+        self.assertTrue(reviewed.exists())
+        self.assertFalse(reviewed.filter(avg_rating=0).exists())
+        self.assertTrue(User.objects.get(username='customer0').check_password('benchmark-pass'))
+        completed = Order.objects.filter(status='Completed')
+        self.assertTrue(completed.exists())
+        self.assertEqual(
+            DailySalesRollup.objects.aggregate(total=Sum('order_count'))['total'], completed.count()
+        )
+        restaurant = completed.first().restaurant
+        self.assertGreater(OrderInsights.total_revenue(restaurant), 0)
+
+    def clear(self):
+        User.objects.filter(username__regex=r'^(owner|customer)\d+$').delete()
+        Restaurant.objects.filter(owner__isnull=True, name__contains=' House ').delete()
+
+    def test_same_seed_same_data(self):
+        """Test two runs with one seed produce identical rows"""
+        generate(TINY, seed=7)
+        first = self.fingerprint()
+        self.clear()
+        generate(TINY, seed=7)
+        self.assertEqual(self.fingerprint(), first)
+
+    def test_seeding_twice_adds_new_accounts(self):
+        """Test a second run numbers its accounts after the first run's"""
+        generate(TINY, seed=3, rebuild=False)
+        generate(TINY, seed=3, rebuild=False)
+        self.assertTrue(User.objects.filter(username='owner5').exists())
+        self.assertTrue(User.objects.filter(username='customer11').exists())
+        self.assertEqual(Restaurant.objects.get(owner__username='owner4').name.rsplit(' ', 1)[1], '4')
+        self.assertEqual(Order.objects.count(), 60)
+
+    def test_raw_writer_matches_orm_writer(self):
+        """Test the executemany path writes the same rows as bulk_create"""
+        generate(TINY, seed=5, method='raw', chunk_size=7)
+        raw = self.fingerprint()
+        stamps = list(Order.objects.order_by('id').values_list('created_at', flat=True))
+        self.clear()
+        generate(TINY, seed=5, method='orm', chunk_size=7)
+        self.assertEqual(self.fingerprint(), raw)
+        # Same offsets from "now"; a timezone slip would show as hours.
+        orm_stamps = Order.objects.order_by('id').values_list('created_at', flat=True)
+        self.assertEqual(len(stamps), 30)
+        for raw_stamp, orm_stamp in zip(stamps, orm_stamps):
+            self.assertLess(abs(raw_stamp - orm_stamp), timedelta(minutes=1))
+
+    def test_orders_follow_distributions(self):
+        """Test orders spread over past days, in-progress ones are recent and dishes are skewed"""
+        generate(Scale(restaurants=2, items_per_restaurant=20, users=30, orders=600, reviews=0, feedback=0, days=10), seed=2)
+        now = timezone.now()
+        stamps = Order.objects.values_list('created_at', flat=True)
+        self.assertFalse([stamp for stamp in stamps if stamp > now])
+        self.assertGreater(len({timezone.localdate(stamp) for stamp in stamps}), 5)
+        recent = now - timedelta(seconds=IN_PROGRESS_WINDOW + 60)
+        self.assertFalse(Order.objects.filter(status__in=['Pending', 'Preparing'], created_at__lt=recent).exists())
+
+        sold = list(
+            OrderItem.objects.values('food_item').annotate(n=Count('id')).order_by('-n').values_list('n', flat=True)
+        )
+        self.assertGreater(sold[0], 5 * sold[-1])
+        self.assertEqual(
+            DailyItemPopularity.objects.aggregate(total=Sum('quantity'))['total'],
+            OrderItem.objects.aggregate(total=Sum('quantity'))['total'],
+        )
+
+    def test_seed_data_command(self):
+        """Test the command applies scale overrides and reports what it wrote"""
+        out = StringIO()
+        call_command('seed_data', '--scale', 'small', '--orders', '40', '--method', 'raw', '--chunk-size', '15', stdout=out)
+        self.assertEqual(Order.objects.count(), 40)
+        self.assertEqual(Restaurant.objects.filter(owner__username__startswith='owner').count(), 5)
+        self.assertIn('40 orders', out.getvalue())
+        self.assertTrue(Restaurant.objects.filter(review_count__gt=0).exists())
+        self.assertTrue(DailySalesRollup.objects.exists())
+
+
+class BenchmarkTests(TestCase):
+    def test_run_reports_every_scenario(self):
+        """Test a client run reports latency percentiles, queries and memory per scenario"""
+        generate(TINY, seed=0)
+        results = benchmarks.run(transports=['client'], iterations=3, warmup=1, memory_samples=1)
+        self.assertEqual(set(results['client']), {s.name for s in benchmarks.SCENARIOS})
+        menu = results['client']['menu']
+        self.assertEqual(menu['requests'], 3)
+        self.assertLessEqual(menu['p50_ms'], menu['p95_ms'])
+        self.assertLessEqual(menu['p95_ms'], menu['p99_ms'])
+        self.assertGreater(menu['queries'], 0)
+        self.assertGreater(menu['peak_kib'], 0)
+        self.assertEqual(results['client']['restaurant_list_anonymous']['queries'], 0)
+
+    def test_unknown_scenario_is_refused(self):
+        """Test asking for a scenario that does not exist fails early"""
+        with self.assertRaises(benchmarks.BenchmarkError):
+            benchmarks.run(scenarios=['nope'])
+
+    def test_compare_flags_regressions(self):
+        """Test latency, query and memory regressions beyond the threshold are reported"""
+        self.assertEqual(benchmarks.compare(report(), report(p95_ms=22.0, p50_ms=10.5)), [])
+        problems = benchmarks.compare(report(), report(p95_ms=30.0, queries=6, peak_kib=400.0))
+        self.assertEqual(len(problems), 3)
+        self.assertIn('client/menu: p95_ms 20.0 -> 30.0', problems)
+
+    def test_compare_refuses_other_datasets(self):
+        """Test reports from a different scale or seed are not compared"""
+        other = report()
+        other['meta']['seed'] = 1
+        with self.assertRaises(benchmarks.BenchmarkError):
+            benchmarks.compare(report(), other)
@@ -0,0 +1,213 @@
+from unittest import mock
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from decimal import Decimal
+from customer.cart import CacheCartStore, DatabaseCartStore
+from customer.models import Restaurant, FoodItem
+
+
+class CartStoreTestsMixin:
+    store_class = None
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.pizza = FoodItem.objects.create(restaurant=self.restaurant, name='Pizza', price=Decimal('10.00'))
+        self.pasta = FoodItem.objects.create(restaurant=self.restaurant, name='Pasta', price=Decimal('8.00'))
+        self.store = self.store_class(self.customer.id, self.restaurant.id)
+
+    def test_add_increments_lines(self):
+        """Test add creates a line and then increments it"""
+        self.store.add(self.pizza.id)
+        self.store.add(self.pasta.id, 2)
+        self.store.add(self.pizza.id, 3)
+        self.assertEqual(self.store.snapshot(), {self.pizza.id: 4, self.pasta.id: 2})
+
+    def test_negative_add_removes_empty_line(self):
+        """Test decrementing a line to zero removes it"""
+        self.store.add(self.pizza.id, 2)
+        self.store.add(self.pizza.id, -1)
+        self.assertEqual(self.store.snapshot(), {self.pizza.id: 1})
+        self.store.add(self.pizza.id, -1)
+        self.assertEqual(self.store.snapshot(), {})
+        self.store.add(self.pasta.id, -1)
+        self.assertEqual(self.store.snapshot(), {})
+
+    def test_set_qty_remove_and_clear(self):
+        """Test set_qty, remove and clear"""
+        self.store.set_qty(self.pizza.id, 5)
+        self.store.set_qty(self.pasta.id, 1)
+        self.assertEqual(self.store.snapshot(), {self.pizza.id: 5, self.pasta.id: 1})
+        self.store.set_qty(self.pizza.id, 0)
+        self.assertEqual(self.store.snapshot(), {self.pasta.id: 1})
+        self.store.remove(self.pasta.id)
+        self.assertEqual(self.store.snapshot(), {})
+        self.store.add(self.pizza.id)
+        self.store.clear()
+        self.assertEqual(self.store.snapshot(), {})
+
+    def test_carts_are_per_user_and_restaurant(self):
+        """Test carts don't leak between users or restaurants"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.store.add(self.pizza.id)
+        self.assertEqual(self.store_class(other.id, self.restaurant.id).snapshot(), {})
+        self.assertEqual(self.store_class(self.customer.id, self.restaurant.id + 1).snapshot(), {})
+
+
+class InterleavingCache:
+    """Cache proxy that runs ``callback`` once, right after the ``after``-th call."""
+
+    def __init__(self, after, callback):
+        self.after, self.callback, self.calls = after, callback, 0
+
+    def __getattr__(self, name):
+        method = getattr(cache, name)
+
+        def call(*args, **kwargs):
+            result = method(*args, **kwargs)
+            self.calls += 1
+            if self.calls == self.after:
+                self.callback()
+            return result
+        return call
+
+
+class CacheCartStoreTests(CartStoreTestsMixin, TestCase):
+    store_class = CacheCartStore
+
+    def test_concurrent_adds_keep_both_lines(self):
+        """Test a second store adding a line at any point during another add loses neither line"""
+        other = CacheCartStore(self.customer.id, self.restaurant.id)
+        for after in range(1, 8):
+            with self.subTest(after=after):
+                cache.clear()
+                self.store.add(self.pizza.id)
+                proxy = InterleavingCache(after, lambda: other.add(self.pasta.id, 2))
+                with mock.patch('customer.cart.cache', proxy):
+                    self.store.add(self.pizza.id + self.pasta.id + 1)
+                if proxy.calls < after:
+                    other.add(self.pasta.id, 2)
+                self.assertEqual(self.store.snapshot(), {
+                    self.pizza.id: 1, self.pasta.id: 2, self.pizza.id + self.pasta.id + 1: 1,
+                })
+
+    def test_readded_line_is_listed_once(self):
+        """Test removing and re-adding a line leaves one entry for it"""
+        self.store.add(self.pizza.id)
+        self.store.add(self.pasta.id)
+        self.store.remove(self.pizza.id)
+        self.store.add(self.pizza.id, 3)
+        self.assertEqual(self.store.snapshot(), {self.pizza.id: 3, self.pasta.id: 1})
+        self.assertEqual(sorted(self.store._index()), sorted([self.pizza.id, self.pasta.id]))
+
+
+class DatabaseCartStoreTests(CartStoreTestsMixin, TestCase):
+    store_class = DatabaseCartStore
+
+
+class CartViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.pizza = FoodItem.objects.create(restaurant=self.restaurant, name='Pizza', price=Decimal('10.00'))
+        self.client.login(username='customer', password='testpass123')
+
+    def test_cart_changes_do_not_write_session(self):
+        """Test cart mutations never rewrite the session row"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('add_to_cart', args=[self.restaurant.id, self.pizza.id]), {'quantity': 2})
+            self.client.post(reverse('update_cart', args=[self.restaurant.id, self.pizza.id, 'increase']))
+            self.client.post(reverse('update_cart', args=[self.restaurant.id, self.pizza.id, 'decrease']))
+        session_writes = [
+            q for q in ctx.captured_queries
+            if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(session_writes, [])
+        response = self.client.get(reverse('menu', args=[self.restaurant.id]))
+        self.assertEqual([line['quantity'] for line in response.context['cart_items']], [2])
+
+    @override_settings(CART_STORE='cache')
+    def test_cache_store_checkout(self):
+        """Test checkout reads and clears a cache-backed cart"""
+        self.client.post(reverse('add_to_cart', args=[self.restaurant.id, self.pizza.id]), {'quantity': 3})
+        self.client.post(reverse('place_order', args=[self.restaurant.id]))
+        order = self.customer.orders.get()
+        self.assertEqual(order.total_price, Decimal('30.00'))
+        self.assertEqual(CacheCartStore(self.customer.id, self.restaurant.id).snapshot(), {})
+
+
+class CartApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.pizza = FoodItem.objects.create(
+            restaurant=self.restaurant, name='Pizza', price=Decimal('10.00'),
+            deal_price=Decimal('8.00'), deal_active=True
+        )
+        self.pasta = FoodItem.objects.create(restaurant=self.restaurant, name='Pasta', price=Decimal('6.00'))
+        self.client.login(username='customer', password='testpass123')
+
+    def add(self, food, quantity=1):
+        return self.client.post(
+            reverse('cart_api_add', args=[self.restaurant.id, food.id]), {'quantity': quantity}
+        )
+
+    def update(self, food, action):
+        return self.client.post(reverse('cart_api_update', args=[self.restaurant.id, food.id, action]))
+
+    def test_add_returns_cart_summary(self):
+        """Test adding an item returns the updated cart as JSON"""
+        self.add(self.pizza, 2)
+        data = self.add(self.pasta).json()
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(data['total'], '22.00')
+        self.assertEqual(
+            [(line['name'], line['quantity'], line['subtotal']) for line in data['items']],
+            [('Pizza', 2, '16.00'), ('Pasta', 1, '6.00')],
+        )
+        self.assertIn('Total: ₹22.00', data['html'])
+
+    def test_update_and_clear(self):
+        """Test increase, decrease, remove and clear through the API"""
+        self.add(self.pizza)
+        self.assertEqual(self.update(self.pizza, 'increase').json()['count'], 2)
+        self.assertEqual(self.update(self.pizza, 'decrease').json()['count'], 1)
+        self.assertEqual(self.update(self.pizza, 'remove').json()['items'], [])
+        self.assertEqual(self.update(self.pizza, 'explode').status_code, 400)
+        self.add(self.pasta)
+        data = self.client.post(reverse('cart_api_clear', args=[self.restaurant.id])).json()
+        self.assertEqual(data['count'], 0)
+        self.assertIn('Your cart is empty', data['html'])
+
+    def test_add_is_a_small_request(self):
+        """Test a cart click doesn't run the menu page's queries"""
+        self.add(self.pizza)
+        with CaptureQueriesContext(connection) as ctx:
+            self.add(self.pizza)
+        self.assertLessEqual(len(ctx.captured_queries), 6)
+        self.assertFalse(any('customer_review' in q['sql'] or 'customer_orderitem' in q['sql']
+                             for q in ctx.captured_queries))
+
+    def test_rejects_foreign_items_and_anonymous_users(self):
+        """Test items from other restaurants 404 and anonymous users get 403"""
+        other = Restaurant.objects.create(name='Elsewhere')
+        foreign = FoodItem.objects.create(restaurant=other, name='Soup', price=Decimal('4.00'))
+        self.assertEqual(self.add(foreign).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.add(self.pizza).status_code, 403)
+
+    def test_menu_forms_point_at_api(self):
+        """Test the menu page wires cart forms to the JSON endpoints"""
+        self.add(self.pizza)
+        response = self.client.get(reverse('menu', args=[self.restaurant.id]))
+        self.assertContains(response, f'data-cart-api="{reverse("cart_api_add", args=[self.restaurant.id, self.pasta.id])}"')
+        self.assertContains(response, f'data-cart-api="{reverse("cart_api_update", args=[self.restaurant.id, self.pizza.id, "increase"])}"')
@@ -0,0 +1,97 @@
+import csv
+import io
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+from decimal import Decimal
+from customer import exports
+from customer.models import Restaurant, FoodItem, Order, OrderItem, Feedback
+
+
+def read_csv(response):
+    return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+
+class CsvExportTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.pizza = FoodItem.objects.create(restaurant=self.restaurant, name='Test Pizza', price=Decimal('15.99'))
+        self.formula = FoodItem.objects.create(
+            restaurant=self.restaurant, name='=HYPERLINK("x")', price=Decimal('1.00')
+        )
+
+    def add_order(self, quantity=2):
+        order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_price=Decimal('31.98'))
+        OrderItem.objects.create(order=order, food_item=self.pizza, quantity=quantity, unit_price=Decimal('15.99'))
+        return order
+
+    def test_food_items_stream(self):
+        """Test the food item export streams rows and neutralises formulas"""
+        response = exports.food_items_csv(FoodItem.objects.all())
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="food_items.csv"')
+        rows = read_csv(response)
+        self.assertEqual(rows[0], exports.FOOD_ITEM_HEADER)
+        self.assertEqual(rows[1][1:4], ['Test Pizza', '', '15.99'])
+        self.assertEqual(rows[1][-1], 'Test Restaurant')
+        self.assertEqual(rows[2][1], '\'=HYPERLINK("x")')
+
+    def test_orders_have_one_row_per_line(self):
+        """Test order exports carry each line with its order's details"""
+        order = self.add_order()
+        OrderItem.objects.create(order=order, food_item=self.formula, quantity=1)
+        rows = read_csv(exports.orders_csv(Order.objects.all()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][0], str(order.id))
+        self.assertEqual(rows[1][3:8], ['customer', 'Test Restaurant', '31.98', str(self.pizza.id), 'Test Pizza'])
+        self.assertEqual(rows[1][-3:], ['2', '15.99', '31.98'])
+        self.assertEqual(rows[2][-2:], ['', ''])
+
+    def test_orders_without_lines_are_exported(self):
+        """Test an order with no lines still gets a row, with empty item columns"""
+        order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_price=Decimal('0.00'))
+        rows = read_csv(exports.orders_csv(Order.objects.all()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][0], str(order.id))
+        self.assertEqual(rows[1][3:6], ['customer', 'Test Restaurant', '0.00'])
+        self.assertEqual(rows[1][6:], ['', '', '', '', ''])
+
+    def test_exports_query_once(self):
+        """Test each export reads its rows in a single query however many there are"""
+        for _ in range(5):
+            self.add_order()
+        Feedback.objects.create(user=self.customer, restaurant=self.restaurant, message='Loved it')
+        for response in (
+            exports.food_items_csv(FoodItem.objects.all()),
+            exports.orders_csv(Order.objects.all()),
+            exports.feedback_csv(Feedback.objects.all()),
+        ):
+            with self.assertNumQueries(1):
+                rows = read_csv(response)
+            self.assertGreater(len(rows), 1)
+
+    def test_output_is_flushed_in_blocks(self):
+        """Test large exports are yielded in several blocks rather than one"""
+        FoodItem.objects.bulk_create([
+            FoodItem(restaurant=self.restaurant, name=f'Dish {n}', description='x' * 200, price=Decimal('5.00'))
+            for n in range(600)
+        ])
+        chunks = list(exports.food_items_csv(FoodItem.objects.all()).streaming_content)
+        self.assertGreater(len(chunks), 1)
+
+    def test_admin_actions(self):
+        """Test the admin CSV actions return streamed files"""
+        User.objects.create_superuser(username='admin', password='testpass123')
+        client = Client()
+        client.login(username='admin', password='testpass123')
+        order = self.add_order()
+        response = client.post(reverse('admin:customer_order_changelist'), {
+            'action': 'download_orders_csv', '_selected_action': [order.id],
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(read_csv(response)[1][0], str(order.id))
+        response = client.post(reverse('admin:customer_fooditem_changelist'), {
+            'action': 'download_csv', '_selected_action': [self.pizza.id],
+        })
+        self.assertEqual(len(read_csv(response)), 2)
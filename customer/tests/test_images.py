@@ -0,0 +1,138 @@
+import io
+import shutil
+import tempfile
+from django.test import TestCase, Client, override_settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.urls import reverse
+from decimal import Decimal
+from io import StringIO
+from PIL import Image
+from customer.images import rendition_name
+from customer.models import Restaurant, FoodItem
+
+
+def make_upload(name, size=(1200, 800), fmt='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 80, 40)).save(buffer, format=fmt)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageRenditionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_RENDITION_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+
+    def add_food(self, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            food = FoodItem.objects.create(
+                restaurant=self.restaurant, name='Dal', price=Decimal('5.00'), image=upload
+            )
+        food.refresh_from_db()
+        return food
+
+    def test_upload_creates_webp_and_jpeg_renditions(self):
+        """Test saving an upload writes resized WebP and JPEG copies next to it"""
+        food = self.add_food(make_upload('dal.jpg'))
+        self.assertEqual(food.image_renditions, {'source': food.image.name, 'widths': [160, 480, 960]})
+        for width in (160, 480, 960):
+            for ext, fmt in (('webp', 'WEBP'), ('jpg', 'JPEG')):
+                name = rendition_name(food.image.name, width, ext)
+                self.assertEqual(name.rsplit('/', 1)[0], 'food_images')
+                with default_storage.open(name) as f:
+                    image = Image.open(f)
+                    self.assertEqual((image.format, image.width), (fmt, width))
+
+    def test_small_upload_is_not_upscaled(self):
+        """Test an image narrower than every rendition width gets one copy at its own size"""
+        food = self.add_food(make_upload('tiny.jpg', size=(100, 60)))
+        self.assertEqual(food.image_renditions['widths'], [100])
+
+    def test_replacing_upload_removes_old_renditions(self):
+        """Test a new upload regenerates renditions and deletes the previous ones"""
+        food = self.add_food(make_upload('dal.jpg'))
+        old = rendition_name(food.image.name, 480, 'webp')
+        food.image = make_upload('dal2.jpg')
+        with self.captureOnCommitCallbacks(execute=True):
+            food.save()
+        food.refresh_from_db()
+        self.assertEqual(food.image_renditions['source'], food.image.name)
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(rendition_name(food.image.name, 480, 'webp')))
+
+    def test_replacing_shared_upload_keeps_other_rows_renditions(self):
+        """Test replacing one of two identical uploads leaves the other's renditions in place"""
+        first = self.add_food(make_upload('dal.jpg'))
+        with self.captureOnCommitCallbacks(execute=True):
+            second = FoodItem.objects.create(
+                restaurant=self.restaurant, name='Dal Fry', price=Decimal('5.00'), image=make_upload('dal.jpg')
+            )
+        self.assertEqual(first.image.name, second.image.name)
+        first.image = make_upload('dal2.jpg', size=(1000, 700))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        second.refresh_from_db()
+        self.assertTrue(default_storage.exists(second.image.name))
+        self.assertTrue(default_storage.exists(rendition_name(second.image.name, 480, 'webp')))
+
+    def test_unhashed_source_gets_matching_rendition_names(self):
+        """Test renditions of an upload stored before hashing are found at the derived names"""
+        FileSystemStorage(location=self.media_root).save('food_images/legacy.jpg', make_upload('legacy.jpg'))
+        food = self.add_food('food_images/legacy.jpg')
+        self.assertEqual(food.image_renditions['source'], 'food_images/legacy.jpg')
+        for width in food.image_renditions['widths']:
+            for ext in ('webp', 'jpg'):
+                self.assertTrue(default_storage.exists(rendition_name('food_images/legacy.jpg', width, ext)))
+
+    def test_unrelated_save_does_not_requeue(self):
+        """Test saving an object whose renditions are current schedules no job"""
+        food = self.add_food(make_upload('dal.jpg'))
+        with self.captureOnCommitCallbacks() as callbacks:
+            food.name = 'Dal Tadka'
+            food.save()
+        self.assertEqual(callbacks, [])
+
+    def test_responsive_image_tag(self):
+        """Test the tag emits srcsets once renditions exist and the original before"""
+        template = Template(
+            '{% load custom_filters %}{% responsive_image food.image food.image_renditions sizes="50px" alt=food.name %}'
+        )
+        food = self.add_food(make_upload('dal.jpg'))
+        html = template.render(Context({'food': food}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn(rendition_name(food.image.url, 480, 'webp') + ' 480w', html)
+        self.assertIn('sizes="50px"', html)
+        self.assertIn('alt="Dal"', html)
+
+        food.image_renditions = {}
+        html = template.render(Context({'food': food}))
+        self.assertNotIn('srcset', html)
+        self.assertIn(f'src="{food.image.url}"', html)
+
+    def test_menu_serves_srcset(self):
+        """Test the menu page references renditions instead of only the original"""
+        food = self.add_food(make_upload('dal.jpg'))
+        response = Client().get(reverse('menu', args=[self.restaurant.id]))
+        self.assertContains(response, rendition_name(food.image.url, 960, 'jpg'))
+
+    def test_backfill_command(self):
+        """Test the command creates renditions for existing media without them"""
+        food = FoodItem.objects.create(
+            restaurant=self.restaurant, name='Dal', price=Decimal('5.00'), image=make_upload('dal.jpg')
+        )
+        self.restaurant.photo = make_upload('front.jpg')
+        self.restaurant.save()
+        FoodItem.objects.create(restaurant=self.restaurant, name='Gone', price=Decimal('1.00'), image='food_images/missing.jpg')
+        out = StringIO()
+        call_command('generate_image_renditions', stdout=out)
+        food.refresh_from_db()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(food.image_renditions['widths'], [160, 480, 960])
+        self.assertEqual(self.restaurant.photo_renditions['source'], self.restaurant.photo.name)
+        self.assertIn('Skipped 1 food items', out.getvalue())
@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import queue
+import shutil
+import tempfile
+from unittest import mock
+from django.test import TestCase, Client
+from django.urls import reverse
+from NamanRestaurant.logutils import JsonFormatter, SamplingFilter, SizedTimedRotatingFileHandler, queue_handler
+
+
+def make_record(msg='hello %s', args=('world',), level=logging.INFO, **extra):
+    record = logging.LogRecord('customer.views', level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class LoggingTests(TestCase):
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, ignore_errors=True)
+
+    def test_json_formatter(self):
+        """Test records become one JSON object with extras and exception text"""
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.LogRecord('customer.views', logging.ERROR, __file__, 1, 'failed %s', ('x',), True)
+            record.exc_info = __import__('sys').exc_info()
+        record.event = 'restaurant_list.view'
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['message'], 'failed x')
+        self.assertEqual(entry['level'], 'ERROR')
+        self.assertEqual(entry['logger'], 'customer.views')
+        self.assertEqual(entry['event'], 'restaurant_list.view')
+        self.assertIn('ValueError: boom', entry['exc'])
+
+    def test_sampling_filter(self):
+        """Test only the configured fraction of an event's INFO records is kept"""
+        sampler = SamplingFilter({'restaurant_list.view': 0.25})
+        with mock.patch('NamanRestaurant.logutils.random.random', side_effect=[0.1, 0.9]):
+            kept = make_record(event='restaurant_list.view')
+            self.assertTrue(sampler.filter(kept))
+            self.assertEqual(kept.sample_rate, 0.25)
+            self.assertFalse(sampler.filter(make_record(event='restaurant_list.view')))
+        self.assertTrue(sampler.filter(make_record()))
+        self.assertTrue(sampler.filter(make_record(level=logging.WARNING, event='restaurant_list.view')))
+
+    def test_size_rotation_keeps_newest_files(self):
+        """Test size rollovers within one day don't overwrite each other and prune the oldest"""
+        path = os.path.join(self.log_dir, 'app.log')
+        handler = SizedTimedRotatingFileHandler(path, max_bytes=200, when='midnight', backupCount=12)
+        handler.setFormatter(JsonFormatter())
+        for i in range(30):
+            handler.emit(make_record(args=(i,)))
+        handler.close()
+        files = os.listdir(self.log_dir)
+        self.assertEqual(len(files), 13)
+        kept = []
+        for name in files:
+            with open(os.path.join(self.log_dir, name)) as f:
+                kept.extend(int(json.loads(line)['message'].split()[1]) for line in f)
+        kept.sort()
+        self.assertEqual(kept, list(range(30 - len(kept), 30)))
+
+    def test_size_check_formats_each_record_once(self):
+        """Test deciding on a size rollover doesn't format the record a second time"""
+        handler = SizedTimedRotatingFileHandler(os.path.join(self.log_dir, 'app.log'), max_bytes=200, when='midnight')
+        formatter = JsonFormatter()
+        handler.setFormatter(formatter)
+        with mock.patch.object(formatter, 'format', wraps=formatter.format) as format_:
+            for i in range(5):
+                handler.emit(make_record(args=(i,)))
+        handler.close()
+        self.assertEqual(format_.call_count, 5)
+
+    def test_pid_in_file_name(self):
+        """Test each process can write its own file via {pid}"""
+        handler = SizedTimedRotatingFileHandler(os.path.join(self.log_dir, 'app.{pid}.log'), when='midnight')
+        handler.setFormatter(JsonFormatter())
+        handler.emit(make_record())
+        handler.close()
+        self.assertEqual(os.listdir(self.log_dir), [f'app.{os.getpid()}.log'])
+
+    def test_queue_handler_writes_on_listener_thread(self):
+        """Test records pass through the queue to the target handlers"""
+        seen = queue.SimpleQueue()
+
+        class Collect(logging.Handler):
+            def emit(self, record):
+                seen.put((record.getMessage(), record.args))
+
+        handler = queue_handler([Collect()])
+        handler.handle(make_record(args=({'mutable': 1},)))
+        handler.listener.stop()
+        self.assertEqual(seen.get(timeout=1), ("hello {'mutable': 1}", None))
+
+    def test_restaurant_list_logs_lazily_with_events(self):
+        """Test the list view logs %-style arguments tagged with sampling events"""
+        with self.assertLogs('customer.views', level='INFO') as logs:
+            Client().get(reverse('restaurant_list'), {'q': 'pizza'})
+        records = {r.event: r for r in logs.records if hasattr(r, 'event')}
+        self.assertEqual(set(records), {'restaurant_list.view', 'restaurant_list.search'})
+        self.assertEqual(records['restaurant_list.search'].args[0], 'pizza')
@@ -0,0 +1,158 @@
+import shutil
+import tempfile
+from django.test import TestCase, Client, override_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils.http import http_date
+from decimal import Decimal
+from io import StringIO
+from customer.media import HASHED_NAME, IMMUTABLE_CACHE_CONTROL, MUTABLE_CACHE_CONTROL
+from customer.models import Restaurant, FoodItem
+from customer.tests.test_images import make_upload
+
+
+class MediaTestMixin:
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_RENDITION_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = Client()
+
+
+class HashedMediaStorageTests(MediaTestMixin, TestCase):
+    def test_upload_names_carry_content_hash(self):
+        """Test saved uploads get a content hash in their name"""
+        name = default_storage.save('food_images/dal.jpg', ContentFile(b'dal'))
+        self.assertRegex(name, r'^food_images/dal\.[0-9a-f]{12}\.jpg$')
+
+    def test_same_name_and_content_is_stored_once(self):
+        """Test re-uploading identical bytes reuses the stored file"""
+        first = default_storage.save('food_images/dal.jpg', ContentFile(b'dal'))
+        second = default_storage.save('food_images/dal.jpg', ContentFile(b'dal'))
+        third = default_storage.save('food_images/dal.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+
+    def test_rendition_names_are_kept(self):
+        """Test names that already carry a hash are stored as given"""
+        name = default_storage.save('food_images/dal.0123456789ab.480w.webp', ContentFile(b'x'))
+        self.assertEqual(name, 'food_images/dal.0123456789ab.480w.webp')
+
+    def test_long_names_fit_the_field(self):
+        """Test the hash still fits under the field's max_length"""
+        food = FoodItem.objects.create(
+            restaurant=Restaurant.objects.create(name='Test Restaurant'),
+            name='Dal', price=Decimal('5.00'), image=make_upload('d' * 90 + '.jpg'),
+        )
+        self.assertLessEqual(len(food.image.name), 100)
+        self.assertTrue(HASHED_NAME.search(food.image.name))
+
+
+class MediaServeTests(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save('food_images/dal.jpg', ContentFile(b'0123456789abcdefghij'))
+        self.url = default_storage.url(self.name)
+
+    def test_hashed_file_is_immutable(self):
+        """Test hashed media is served with validators and a year-long immutable cache"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789abcdefghij')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+    def test_unhashed_file_is_revalidated(self):
+        """Test legacy names get a short cache lifetime"""
+        with open(f'{self.media_root}/legacy.jpg', 'wb') as f:
+            f.write(b'old')
+        response = self.client.get('/media/legacy.jpg')
+        self.assertEqual(response['Cache-Control'], MUTABLE_CACHE_CONTROL)
+
+    def test_conditional_requests_return_304(self):
+        """Test If-None-Match and If-Modified-Since short-circuit to 304"""
+        first = self.client.get(self.url)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        """Test single byte ranges, suffix ranges and unsatisfiable ranges"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/20')
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'hij')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=50-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */20')
+
+    def test_stale_if_range_sends_whole_file(self):
+        """Test a range with a stale If-Range validator gets the full file"""
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_accel_redirect(self):
+        """Test the proxy hand-off sends headers only"""
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.name}')
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_missing_and_escaping_paths_are_refused(self):
+        """Test unknown files 404 and paths outside MEDIA_ROOT are rejected"""
+        self.assertEqual(self.client.get('/media/food_images/nope.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/media/../manage.py').status_code, 400)
+
+    def test_only_safe_methods(self):
+        """Test media refuses POST"""
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+
+class HashMediaFilesCommandTests(MediaTestMixin, TestCase):
+    def test_renames_legacy_uploads(self):
+        """Test the command gives legacy uploads hashed names and fresh renditions"""
+        with open(f'{self.media_root}/legacy.jpg', 'wb') as f:
+            f.write(make_upload('legacy.jpg').read())
+        restaurant = Restaurant.objects.create(name='Test Restaurant')
+        Restaurant.objects.filter(pk=restaurant.pk).update(photo='legacy.jpg')
+        out = StringIO()
+        call_command('hash_media_files', stdout=out)
+        restaurant.refresh_from_db()
+        self.assertTrue(HASHED_NAME.search(restaurant.photo.name))
+        self.assertTrue(default_storage.exists(restaurant.photo.name))
+        self.assertFalse(default_storage.exists('legacy.jpg'))
+        self.assertEqual(restaurant.photo_renditions['source'], restaurant.photo.name)
+        self.assertIn('Renamed 1 restaurants', out.getvalue())
+
+    def test_shared_legacy_upload_is_kept_until_unused(self):
+        """Test a legacy file used by a photo and a food image survives until both are renamed"""
+        with open(f'{self.media_root}/legacy.jpg', 'wb') as f:
+            f.write(make_upload('legacy.jpg').read())
+        restaurant = Restaurant.objects.create(name='Test Restaurant')
+        Restaurant.objects.filter(pk=restaurant.pk).update(photo='legacy.jpg')
+        food = FoodItem.objects.create(restaurant=restaurant, name='Dal', price=Decimal('5.00'))
+        FoodItem.objects.filter(pk=food.pk).update(image='legacy.jpg')
+        out = StringIO()
+        call_command('hash_media_files', stdout=out)
+        restaurant.refresh_from_db()
+        food.refresh_from_db()
+        self.assertIn('Renamed 1 food items', out.getvalue())
+        self.assertEqual(food.image.name, restaurant.photo.name)
+        self.assertTrue(default_storage.exists(food.image.name))
+        self.assertFalse(default_storage.exists('legacy.jpg'))
@@ -0,0 +1,265 @@
+import io
+import json
+import pathlib
+import shutil
+import tempfile
+import zipfile
+from unittest import mock
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from decimal import Decimal
+from io import StringIO
+from customer import exports, menu_import, search
+from customer.models import Restaurant, FoodItem
+from customer.tests.test_images import make_upload
+
+
+def csv_file(text):
+    return io.BytesIO(text.encode())
+
+
+def images_zip(*names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(name, make_upload(name, size=(200, 150)).read())
+    buffer.seek(0)
+    return buffer
+
+
+class MenuImportTests(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.pizza = FoodItem.objects.create(
+            restaurant=self.restaurant, name='Test Pizza', description='Cheese', price=Decimal('15.99'), is_veg=True
+        )
+
+    def test_csv_creates_and_updates_by_name(self):
+        """Test rows upsert on name, keeping ids and fields the file leaves out"""
+        report = menu_import.import_menu(self.restaurant, csv_file(
+            'name,price,is_veg\n'
+            'Test Pizza,17.50,no\n'
+            'Garlic Bread,4.25,\n'
+        ), fmt='csv')
+        self.assertEqual((report.created, report.updated, report.errors), (1, 1, []))
+        self.pizza.refresh_from_db()
+        self.assertEqual((self.pizza.price, self.pizza.is_veg, self.pizza.description), (Decimal('17.50'), False, 'Cheese'))
+        bread = FoodItem.objects.get(restaurant=self.restaurant, name='Garlic Bread')
+        self.assertTrue(bread.is_veg)
+        self.assertEqual(self.restaurant.menu_items.count(), 2)
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        """Test invalid and repeated rows come back with their row number while the rest import"""
+        report = menu_import.import_menu(self.restaurant, csv_file(
+            'name,price,deal_active\n'
+            'Soup,abc,\n'
+            'Salad,3.00,maybe\n'
+            'Noodles,6.00,yes\n'
+            'Noodles,7.00,no\n'
+            ',2.00,\n'
+        ), fmt='csv')
+        self.assertEqual(report.created, 1)
+        self.assertEqual([(e['row'], list(e['errors'])) for e in report.errors], [
+            (2, ['price']), (3, ['deal_active']), (5, ['name']), (6, ['name']),
+        ])
+        self.assertIn('Duplicate of row 4.', report.errors[2]['errors']['name'])
+        self.assertEqual(FoodItem.objects.get(name='Noodles').price, Decimal('6.00'))
+
+    def test_json_array_and_lines(self):
+        """Test both JSON arrays and JSON lines stream into items"""
+        rows = [{'name': f'Dish {n}', 'price': n + 1, 'is_special': n == 0} for n in range(3)]
+        report = menu_import.import_menu(self.restaurant, io.BytesIO(json.dumps(rows).encode()), fmt='json')
+        self.assertEqual(report.created, 3)
+        lines = '\n'.join(json.dumps(row) for row in rows) + '\n"oops"\n'
+        report = menu_import.import_menu(self.restaurant, io.BytesIO(lines.encode()), fmt='json')
+        self.assertEqual((report.updated, [e['row'] for e in report.errors]), (3, [4]))
+        self.assertTrue(FoodItem.objects.get(name='Dish 0').is_special)
+
+    def test_json_read_in_small_pieces(self):
+        """Test items split across reads are still decoded"""
+        rows = [{'name': f'Dish {n}', 'description': 'x' * 50, 'price': '2.50'} for n in range(40)]
+        text = io.StringIO(json.dumps(rows, indent=2))
+        with mock.patch.object(menu_import, 'READ_SIZE', 7):
+            values = [value for _, value in menu_import.json_records(text)]
+        self.assertEqual(values, rows)
+
+    def test_unreadable_file_imports_nothing(self):
+        """Test a malformed file raises and rolls back rows read before the fault"""
+        data = b'[{"name": "Soup", "price": 3}, {"name": '
+        with self.assertRaises(menu_import.MenuImportError):
+            menu_import.import_menu(self.restaurant, io.BytesIO(data), fmt='json')
+        self.assertFalse(FoodItem.objects.filter(name='Soup').exists())
+
+    @override_settings(MENU_IMPORT_MAX_ROWS=2)
+    def test_row_limit(self):
+        """Test files over the row limit are refused"""
+        with self.assertRaises(menu_import.MenuImportError):
+            menu_import.import_menu(self.restaurant, csv_file('name,price\na,1\nb,1\nc,1\n'), fmt='csv')
+        self.assertEqual(self.restaurant.menu_items.count(), 1)
+
+    def test_dry_run_saves_nothing(self):
+        """Test a dry run reports what would change without writing"""
+        report = menu_import.import_menu(
+            self.restaurant, csv_file('name,price\nTest Pizza,1.00\nSoup,2.00\n'), fmt='csv', dry_run=True
+        )
+        self.assertEqual((report.created, report.updated), (1, 1))
+        self.pizza.refresh_from_db()
+        self.assertEqual(self.pizza.price, Decimal('15.99'))
+        self.assertFalse(FoodItem.objects.filter(name='Soup').exists())
+
+    def test_export_round_trips(self):
+        """Test a menu export can be imported back unchanged"""
+        FoodItem.objects.create(
+            restaurant=self.restaurant, name='Lassi', description='', price=Decimal('3.00'),
+            deal_price=Decimal('2.50'), deal_active=True,
+        )
+        before = list(self.restaurant.menu_items.order_by('id').values_list(
+            'id', 'name', 'description', 'price', 'deal_price', 'deal_active', 'is_veg', 'is_special'
+        ))
+        exported = b''.join(exports.food_items_csv(self.restaurant.menu_items.all()).streaming_content)
+        report = menu_import.import_menu(self.restaurant, io.BytesIO(exported), fmt='csv')
+        self.assertEqual((report.updated, report.errors), (2, []))
+        after = list(self.restaurant.menu_items.order_by('id').values_list(
+            'id', 'name', 'description', 'price', 'deal_price', 'deal_active', 'is_veg', 'is_special'
+        ))
+        self.assertEqual(after, before)
+
+    def test_imported_items_are_searchable(self):
+        """Test imported items are indexed although bulk_create sends no signals"""
+        menu_import.import_menu(self.restaurant, csv_file('name,price,description\nPaneer Tikka,9.00,Smoky\n'), fmt='csv')
+        item = FoodItem.objects.get(name='Paneer Tikka')
+        self.assertEqual(list(search.filter_food_items(FoodItem.objects.all(), 'smoky', self.restaurant.id)), [item])
+
+    def test_update_without_description_stays_searchable(self):
+        """Test a price-only import keeps the stored description in the search index"""
+        item = FoodItem.objects.create(
+            restaurant=self.restaurant, name='Paneer Tikka', description='smoky charcoal grilled', price=Decimal('9.00')
+        )
+        menu_import.import_menu(self.restaurant, csv_file('name,price\nPaneer Tikka,7\n'), fmt='csv')
+        item.refresh_from_db()
+        self.assertEqual((item.price, item.description), (Decimal('7.00'), 'smoky charcoal grilled'))
+        self.assertEqual(list(search.filter_food_items(FoodItem.objects.all(), 'charcoal', self.restaurant.id)), [item])
+
+    def test_failed_batch_is_reported(self):
+        """Test a batch that fails to save is reported while the other batches are kept"""
+        calls = []
+
+        def index(items):
+            calls.append(items)
+            if len(calls) == 2:
+                raise DatabaseError('locked')
+
+        data = csv_file('name,price\nSoup,2.00\nSalad,3.00\nNoodles,4.00\n')
+        with mock.patch.object(menu_import, 'BATCH_SIZE', 1), \
+                mock.patch.object(menu_import.search, 'index_food_items', side_effect=index), \
+                self.assertLogs('customer.menu_import', 'WARNING'):
+            report = menu_import.import_menu(self.restaurant, data, fmt='csv')
+        self.assertEqual(report.created, 2)
+        self.assertEqual([(e['row'], e['name']) for e in report.errors], [(3, 'Salad')])
+        self.assertEqual(
+            sorted(self.restaurant.menu_items.values_list('name', flat=True)), ['Noodles', 'Soup', 'Test Pizza']
+        )
+
+    def test_large_import_is_batched(self):
+        """Test thousands of rows import with a few queries per batch"""
+        rows = ''.join(f'Dish {n},{n % 50 + 1}.00,Tasty dish {n}\n' for n in range(2000))
+        with CaptureQueriesContext(connection) as queries:
+            report = menu_import.import_menu(self.restaurant, csv_file('name,price,description\n' + rows), fmt='csv')
+        self.assertEqual(report.created, 2000)
+        self.assertLess(len(queries), 2000 // 20)
+        self.assertEqual(self.restaurant.menu_items.count(), 2001)
+
+
+class MenuImportImageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_RENDITION_WORKERS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+
+    def test_images_from_zip_get_renditions(self):
+        """Test zipped images are stored, matched by file name and rendered"""
+        data = csv_file('name,price,image\nDal,5.00,photos/dal.jpg\nRice,3.00,rice.jpg\nTea,1.00,tea.jpg\n')
+        with self.captureOnCommitCallbacks(execute=True):
+            report = menu_import.import_menu(self.restaurant, data, images_zip('photos/dal.jpg', 'rice.jpg'), fmt='csv')
+        self.assertEqual(report.created, 2)
+        self.assertEqual(report.errors[0]['errors'], {'image': ['tea.jpg is not in the images zip.']})
+        dal = FoodItem.objects.get(name='Dal')
+        self.assertRegex(dal.image.name, r'^food_images/dal\.[0-9a-f]{12}\.jpg$')
+        self.assertEqual(dal.image_renditions['source'], dal.image.name)
+
+    def test_same_image_keeps_renditions(self):
+        """Test re-importing identical image bytes leaves the renditions alone"""
+        data = 'name,price,image\nDal,5.00,dal.jpg\n'
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_import.import_menu(self.restaurant, csv_file(data), images_zip('dal.jpg'), fmt='csv')
+        renditions = FoodItem.objects.get(name='Dal').image_renditions
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            menu_import.import_menu(self.restaurant, csv_file(data.replace('5.00', '6.00')), images_zip('dal.jpg'), fmt='csv')
+        self.assertEqual(callbacks, [])
+        dal = FoodItem.objects.get(name='Dal')
+        self.assertEqual((dal.price, dal.image_renditions), (Decimal('6.00'), renditions))
+
+    def test_images_need_a_zip_and_real_images(self):
+        """Test image cells without a zip, or naming a non-image, are rejected"""
+        report = menu_import.import_menu(self.restaurant, csv_file('name,price,image\nDal,5.00,dal.jpg\n'), fmt='csv')
+        self.assertIn('image', report.errors[0]['errors'])
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as z:
+            z.writestr('dal.jpg', b'not an image')
+        archive.seek(0)
+        report = menu_import.import_menu(
+            self.restaurant, csv_file('name,price,image\nDal,5.00,dal.jpg\n'), archive, fmt='csv'
+        )
+        self.assertEqual(report.errors[0]['errors'], {'image': ['dal.jpg is not an image.']})
+        self.assertFalse(FoodItem.objects.exists())
+
+    def stored_images(self):
+        return [path.name for path in pathlib.Path(self.media_root).rglob('*') if path.is_file()]
+
+    def test_unreadable_file_stores_no_images(self):
+        """Test images are only checked while the file is read, so a bad file stores none"""
+        data = b'[{"name": "Dal", "price": 5, "image": "dal.jpg"}, {"name": '
+        with self.assertRaises(menu_import.MenuImportError):
+            menu_import.import_menu(self.restaurant, io.BytesIO(data), images_zip('dal.jpg'), fmt='json')
+        self.assertEqual(self.stored_images(), [])
+
+    def test_failed_batch_deletes_its_images(self):
+        """Test a batch whose write fails leaves no orphaned image files behind"""
+        data = csv_file('name,price,image\nDal,5.00,dal.jpg\n')
+        with mock.patch.object(menu_import.search, 'index_food_items', side_effect=DatabaseError('locked')), \
+                self.assertLogs('customer.menu_import', 'WARNING'):
+            report = menu_import.import_menu(self.restaurant, data, images_zip('dal.jpg'), fmt='csv')
+        self.assertEqual(report.errors[0]['errors'], {'__all__': ['Not saved: locked']})
+        self.assertFalse(FoodItem.objects.exists())
+        self.assertEqual(self.stored_images(), [])
+
+
+class ImportMenuCommandTests(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def test_command_imports_and_reports(self):
+        """Test the command imports a file and prints rejected rows"""
+        path = f'{self.tmp}/menu.json'
+        with open(path, 'w') as f:
+            json.dump([{'name': 'Soup', 'price': '3.00'}, {'name': 'Salad', 'price': '-1'}], f)
+        out, err = StringIO(), StringIO()
+        call_command('import_menu', str(self.restaurant.id), path, stdout=out, stderr=err)
+        self.assertIn('Imported 1 new and 0 existing', out.getvalue())
+        self.assertIn("Row 2 'Salad': price:", err.getvalue())
+        self.assertTrue(FoodItem.objects.filter(name='Soup').exists())
+
+    def test_command_errors(self):
+        """Test unknown restaurants and missing files fail cleanly"""
+        with self.assertRaises(CommandError):
+            call_command('import_menu', '999', f'{self.tmp}/menu.csv')
+        with self.assertRaises(CommandError):
+            call_command('import_menu', str(self.restaurant.id), f'{self.tmp}/missing.csv')
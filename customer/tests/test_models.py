@@ -3,6 +3,7 @@ from django.contrib.auth.models import User # type: ignore
 from django.core.exceptions import ValidationError # type: ignore
 from decimal import Decimal
 from customer.models import Restaurant, FoodItem, Order, OrderItem, Review, Feedback, UserProfile
+from customer.ratings import rebuild_ratings
 
 
 class RestaurantModelTests(TestCase):
@@ -156,6 +157,85 @@ class ReviewModelTests(TestCase):
         self.assertEqual(str(self.review), expected)
 
 
+class RestaurantRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            owner=self.owner,
+            location='Test City'
+        )
+
+    def add_review(self, rating, **kwargs):
+        return Review.objects.create(
+            user=self.customer,
+            restaurant=self.restaurant,
+            rating=rating,
+            **kwargs
+        )
+
+    def test_new_restaurant_has_no_rating(self):
+        """Test restaurant without reviews has empty aggregates"""
+        self.assertIsNone(self.restaurant.avg_rating)
+        self.assertEqual(self.restaurant.review_count, 0)
+        self.assertEqual(self.restaurant.rating_histogram, [0, 0, 0, 0, 0])
+
+    def test_review_updates_aggregates(self):
+        """Test saving reviews updates count, average and histogram"""
+        self.add_review(4)
+        self.add_review(5)
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 2)
+        self.assertEqual(self.restaurant.avg_rating, Decimal('4.50'))
+        self.assertEqual(self.restaurant.rating_histogram, [0, 0, 0, 1, 1])
+
+    def test_rating_edit_and_visibility_toggle(self):
+        """Test editing a rating and hiding a review adjust the aggregates"""
+        review = self.add_review(2)
+        review.rating = 4
+        review.save()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.rating_histogram, [0, 0, 0, 1, 0])
+
+        review.visible = False
+        review.save()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 0)
+        self.assertIsNone(self.restaurant.avg_rating)
+
+        review.visible = True
+        review.save()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 1)
+
+    def test_hidden_review_not_counted(self):
+        """Test reviews created hidden are excluded"""
+        self.add_review(1, visible=False)
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 0)
+
+    def test_review_delete_updates_aggregates(self):
+        """Test deleting a review removes it from the aggregates"""
+        review = self.add_review(3)
+        self.add_review(5)
+        review.delete()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 1)
+        self.assertEqual(self.restaurant.avg_rating, Decimal('5.00'))
+
+    def test_rebuild_ratings(self):
+        """Test rebuild_ratings recovers from bulk updates that bypass signals"""
+        self.add_review(5)
+        self.add_review(3)
+        Review.objects.filter(rating=5).update(visible=False)
+        rebuild_ratings()
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.review_count, 1)
+        self.assertEqual(self.restaurant.avg_rating, Decimal('3.00'))
+        self.assertEqual(self.restaurant.rating_histogram, [0, 0, 1, 0, 0])
+
+
 class FeedbackModelTests(TestCase):
     def setUp(self):
         self.customer = User.objects.create_user(username='customer', password='testpass123')
@@ -0,0 +1,69 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import models
+from decimal import Decimal
+from customer.models import Restaurant, FoodItem
+from customer.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', owner=self.owner)
+        self.items = [
+            FoodItem.objects.create(
+                restaurant=self.restaurant,
+                name=f'Dish {i:02d}',
+                price=Decimal('10.00'),
+                is_special=(i % 4 == 0)
+            )
+            for i in range(10)
+        ]
+
+    def walk(self, paginator, direction='next', cursor=None):
+        pages = []
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append([item.id for item in page])
+            cursor = page.next_cursor if direction == 'next' else page.previous_cursor
+            if cursor is None:
+                return pages
+
+    def test_forward_pages_cover_everything_once(self):
+        """Test walking forward visits every row exactly once in order"""
+        paginator = KeysetPaginator(FoodItem.objects.all(), ('-created_at', '-id'), 3)
+        pages = self.walk(paginator)
+        self.assertEqual([len(p) for p in pages], [3, 3, 3, 1])
+        self.assertEqual(sum(pages, []), [item.id for item in reversed(self.items)])
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Test previous cursors step back to the preceding page"""
+        paginator = KeysetPaginator(FoodItem.objects.all(), ('name', 'id'), 4)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        self.assertTrue(second.has_previous())
+        back = paginator.get_page(second.previous_cursor)
+        self.assertEqual([i.id for i in back], [i.id for i in first])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_annotation_ordering(self):
+        """Test ordering on an annotation such as the menu's special-first rank"""
+        qs = FoodItem.objects.annotate(
+            menu_rank=models.Case(
+                models.When(is_special=True, then=0),
+                default=2,
+                output_field=models.IntegerField(),
+            )
+        )
+        paginator = KeysetPaginator(qs, ('menu_rank', 'id'), 4)
+        ids = sum(self.walk(paginator), [])
+        expected = [i.id for i in self.items if i.is_special] + [i.id for i in self.items if not i.is_special]
+        self.assertEqual(ids, expected)
+
+    def test_garbage_cursor_starts_from_first_page(self):
+        """Test an invalid cursor is treated as the first page"""
+        paginator = KeysetPaginator(FoodItem.objects.all(), ('id',), 3)
+        page = paginator.get_page('not-a-cursor')
+        self.assertEqual([i.id for i in page], [i.id for i in self.items[:3]])
+        self.assertFalse(page.has_previous())
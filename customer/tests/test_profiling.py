@@ -0,0 +1,53 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from customer.models import Restaurant
+from NamanRestaurant.profiling import RequestProfile
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+
+    def test_off_by_default(self):
+        """Test nothing is added when no sample rate is configured"""
+        response = Client().get(reverse('restaurant_list'))
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PROFILE_SAMPLE_RATE=1)
+    def test_server_timing_and_log_line(self):
+        """Test a sampled request reports queries, timings and size"""
+        client = Client()
+        with self.assertLogs('NamanRestaurant.profiling', level='INFO') as logs:
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(reverse('menu', args=[self.restaurant.id]))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'"{len(ctx.captured_queries)} queries"', timing)
+        self.assertIn('tpl;dur=', timing)
+        self.assertIn('total;dur=', timing)
+
+        record = logs.records[0]
+        self.assertEqual(record.event, 'request.profile')
+        self.assertEqual(record.view, 'menu')
+        self.assertEqual(record.status, 200)
+        self.assertEqual(record.queries, len(ctx.captured_queries))
+        self.assertEqual(record.response_bytes, len(response.content))
+        self.assertGreater(record.template_ms, 0)
+
+    def test_repeated_queries_are_reported(self):
+        """Test a per-row query loop shows up as a repeated query shape"""
+        for i in range(3):
+            User.objects.create_user(username=f'user{i}', password='testpass123')
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for user in User.objects.filter(username__startswith='user'):
+                list(Restaurant.objects.filter(owner=user))
+            list(Restaurant.objects.filter(id__in=[1, 2]))
+            list(Restaurant.objects.filter(id__in=[1, 2, 3]))
+        duplicates = dict(profile.duplicates())
+        self.assertEqual(profile.queries, 6)
+        self.assertEqual(sorted(duplicates.values()), [2, 3])
+        self.assertTrue(any('IN (...)' in sql for sql in duplicates))
@@ -0,0 +1,118 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.urls import reverse
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from customer.models import Restaurant, FoodItem, Order, OrderItem, UserProfile
+from customer.tests.query_budget import QueryBudgetMixin
+
+
+class OrderPageQueryTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123', is_staff=True, is_superuser=True)
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            owner=self.owner,
+            location='Test City'
+        )
+        self.food_items = [
+            FoodItem.objects.create(restaurant=self.restaurant, name=f'Dish {i}', price=Decimal('10.00'))
+            for i in range(4)
+        ]
+        self.client.login(username='customer', password='testpass123')
+
+    def add_orders(self, count, lines=3):
+        for _ in range(count):
+            order = Order.objects.create(
+                customer=self.customer,
+                restaurant=self.restaurant,
+                total_price=Decimal('30.00'),
+                status='Completed'
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, food_item=food, quantity=1, unit_price=food.price)
+                for food in self.food_items[:lines]
+            ])
+
+    def test_orders_page_query_budget(self):
+        """Test the orders page stays within its query budget"""
+        self.add_orders(6)
+        with self.assertMaxQueries(8):
+            response = self.client.get(reverse('orders'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_orders_page_no_n_plus_one(self):
+        """Test order lines are prefetched rather than loaded per order"""
+        self.add_orders(1, lines=1)
+        self.assertQueriesIndependentOf(
+            lambda: self.client.get(reverse('orders')),
+            lambda: self.add_orders(5, lines=4),
+        )
+
+    def test_order_admin_changelist_no_n_plus_one(self):
+        """Test the order admin's ordered_items column is prefetched"""
+        self.add_orders(1, lines=1)
+        self.assertQueriesIndependentOf(
+            lambda: self.client.get(reverse('admin:customer_order_changelist')),
+            lambda: self.add_orders(10, lines=4),
+        )
+
+
+class ProfilePageQueryTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.profile = UserProfile.objects.create(user=self.customer)
+        self.client.login(username='customer', password='testpass123')
+
+    def add_history(self, count):
+        for i in range(count):
+            restaurant = Restaurant.objects.create(name=f'Place {i}', location='Test City')
+            self.profile.favorite_restaurants.add(restaurant)
+            Order.objects.create(customer=self.customer, restaurant=restaurant, total_price=Decimal('10.00'))
+
+    def test_profile_page_query_budget(self):
+        """Test the profile page stays within its query budget"""
+        self.add_history(10)
+        with self.assertMaxQueries(10):
+            response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_page_independent_of_restaurants_and_orders(self):
+        """Test profile queries don't grow with restaurants, favourites or orders"""
+        self.add_history(1)
+        self.assertQueriesIndependentOf(
+            lambda: self.client.get(reverse('profile')),
+            lambda: self.add_history(12),
+        )
+
+
+class ExplainQueriesCommandTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', owner=self.owner)
+        food = FoodItem.objects.create(restaurant=self.restaurant, name='Dish', price=Decimal('10.00'))
+        for _ in range(3):
+            order = Order.objects.create(
+                customer=self.customer, restaurant=self.restaurant, total_price=Decimal('10.00')
+            )
+            OrderItem.objects.create(order=order, food_item=food, unit_price=food.price)
+
+    def test_reports_each_page(self):
+        """Test explain_queries walks the customer and owner pages"""
+        out = StringIO()
+        call_command('explain_queries', restaurant=self.restaurant.id, stdout=out)
+        output = out.getvalue()
+        self.assertIn(f"{reverse('orders')} as customer: HTTP 200", output)
+        self.assertIn(f"{reverse('dashboard_orders', args=[self.restaurant.id])} as owner: HTTP 200", output)
+
+    def test_order_and_review_lookups_use_indexes(self):
+        """Test orders, reviews and feedback are never read with a table scan"""
+        out = StringIO()
+        call_command('explain_queries', restaurant=self.restaurant.id, stdout=out)
+        for table in ['customer_order', 'customer_review', 'customer_feedback', 'customer_fooditem']:
+            self.assertNotIn(f'table scan on {table}\n', out.getvalue())
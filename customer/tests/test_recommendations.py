@@ -0,0 +1,169 @@
+from unittest import mock
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from decimal import Decimal
+from io import StringIO
+from customer import recommendations
+from customer.models import Restaurant, FoodItem, Order, Recommendation, UserProfile
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Restaurant.objects.all().delete()
+        self.curry = Restaurant.objects.create(name='Curry House', cuisine='Indian')
+        self.tandoor = Restaurant.objects.create(name='Tandoor', cuisine='Indian')
+        self.pasta = Restaurant.objects.create(name='Pasta Place', cuisine='Italian')
+        self.grill = Restaurant.objects.create(name='Steak Grill', cuisine='American')
+        FoodItem.objects.create(restaurant=self.curry, name='Dal', price=Decimal('5.00'), is_veg=True)
+        FoodItem.objects.create(restaurant=self.tandoor, name='Paneer Tikka', price=Decimal('6.00'), is_veg=True)
+        FoodItem.objects.create(restaurant=self.pasta, name='Penne', price=Decimal('7.00'), is_veg=True)
+        FoodItem.objects.create(restaurant=self.grill, name='Steak', price=Decimal('20.00'), is_veg=False)
+        self.user = User.objects.create_user(username='customer', password='testpass123')
+        self.profile = UserProfile.objects.create(user=self.user)
+
+    def complete(self, user, *restaurants):
+        for restaurant in restaurants:
+            Order.objects.create(customer=user, restaurant=restaurant, total_price=Decimal('10.00'), status='Completed')
+
+    def neighbour(self, name, *restaurants):
+        user = User.objects.create_user(username=name, password='testpass123')
+        self.complete(user, *restaurants)
+        return user
+
+    def recommended(self, user=None):
+        return list(
+            Recommendation.objects.filter(user=user or self.user)
+            .order_by('rank').values_list('restaurant__name', flat=True)
+        )
+
+    def test_cooccurring_restaurants_rank_first(self):
+        """Test restaurants sharing customers with the user's history rank above others"""
+        self.neighbour('a', self.curry, self.tandoor)
+        self.neighbour('b', self.curry, self.tandoor)
+        self.neighbour('c', self.pasta, self.grill)
+        self.complete(self.user, self.curry)
+        recommendations.rebuild_recommendations()
+        ranked = self.recommended()
+        self.assertEqual(ranked[0], 'Tandoor')
+        self.assertNotIn('Curry House', ranked)
+
+    def test_diet_and_cuisine_preferences(self):
+        """Test a vegetarian diet drops non-veg restaurants and cuisine preference boosts matches"""
+        self.neighbour('a', self.grill)
+        self.neighbour('b', self.grill)
+        self.neighbour('c', self.pasta)
+        self.profile.diet_preference = 'veg'
+        self.profile.cuisine_preference = 'italian'
+        self.profile.save()
+        recommendations.rebuild_recommendations()
+        ranked = self.recommended()
+        self.assertEqual(ranked[0], 'Pasta Place')
+        self.assertNotIn('Steak Grill', ranked)
+
+    def test_refresh_user_matches_full_rebuild(self):
+        """Test the incremental per-user refresh agrees with the offline rebuild"""
+        self.neighbour('a', self.curry, self.tandoor, self.pasta)
+        self.neighbour('b', self.tandoor, self.grill)
+        self.complete(self.user, self.curry)
+        self.profile.favorite_restaurants.add(self.grill)
+        recommendations.rebuild_recommendations()
+        rebuilt = list(Recommendation.objects.filter(user=self.user).order_by('rank').values_list('restaurant_id', 'score'))
+        Recommendation.objects.all().delete()
+        recommendations.refresh_user(self.user.id)
+        refreshed = list(Recommendation.objects.filter(user=self.user).order_by('rank').values_list('restaurant_id', 'score'))
+        self.assertEqual([r for r, _ in refreshed], [r for r, _ in rebuilt])
+        for (_, a), (_, b) in zip(refreshed, rebuilt):
+            self.assertAlmostEqual(a, b)
+
+    @override_settings(RECOMMENDATION_REFRESH_ASYNC=False)
+    def test_completing_an_order_refreshes_after_commit(self):
+        """Test a newly completed order refreshes that user's recommendations"""
+        self.neighbour('a', self.curry, self.tandoor)
+        order = Order.objects.create(customer=self.user, restaurant=self.curry, total_price=Decimal('10.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'Completed'
+            order.save()
+        ranked = self.recommended()
+        self.assertEqual(ranked[0], 'Tandoor')
+        self.assertNotIn('Curry House', ranked)
+
+    def test_background_refreshes_are_coalesced(self):
+        """Test changes queued before the worker runs share one job and one set of global inputs"""
+        self.neighbour('a', self.curry, self.tandoor)
+        other = self.neighbour('b', self.pasta)
+        self.complete(self.user, self.curry)
+        executor = mock.Mock()
+        with mock.patch.object(recommendations, '_executor', executor):
+            recommendations._enqueue(self.user.id)
+            recommendations._enqueue(other.id)
+            recommendations._enqueue(self.user.id)
+        executor.submit.assert_called_once_with(recommendations._drain)
+        with mock.patch.object(recommendations, 'close_old_connections'), \
+                mock.patch.object(recommendations, '_global_inputs', wraps=recommendations._global_inputs) as inputs:
+            recommendations._drain()
+        self.assertEqual(inputs.call_count, 1)
+        self.assertEqual(recommendations._pending, set())
+        self.assertEqual(self.recommended()[0], 'Tandoor')
+        self.assertTrue(Recommendation.objects.filter(user=other).exists())
+
+    def test_global_inputs_are_cached(self):
+        """Test refreshes reuse cached inputs and count restaurants the cache hasn't seen"""
+        self.neighbour('a', self.curry)
+        recommendations.refresh_user(self.user.id)
+        self.neighbour('b', self.curry, self.pasta)
+        self.complete(self.user, self.curry)
+        with mock.patch.object(recommendations, '_vegetarian_restaurants') as vegetarian:
+            recommendations.refresh_users([self.user.id])
+        vegetarian.assert_not_called()
+        self.assertEqual(self.recommended()[0], 'Pasta Place')
+
+    def test_drain_logs_early_failures(self):
+        """Test a failure before the queue is read is logged rather than raising"""
+        with mock.patch.object(recommendations, 'close_old_connections', side_effect=[RuntimeError('boom'), None]), \
+                self.assertLogs('customer.recommendations', 'ERROR'):
+            recommendations._drain()
+
+    def test_refresh_replaces_existing_rows(self):
+        """Test a refresh over rows already written for the user overwrites them"""
+        self.neighbour('a', self.curry, self.tandoor)
+        self.complete(self.user, self.curry)
+        Recommendation.objects.create(user=self.user, restaurant=self.tandoor, rank=5, score=0.0)
+        Recommendation.objects.create(user=self.user, restaurant=self.curry, rank=6, score=0.0)
+        recommendations.refresh_user(self.user.id)
+        recommendations.refresh_user(self.user.id)
+        self.assertEqual(self.recommended()[0], 'Tandoor')
+        self.assertNotIn('Curry House', self.recommended())
+
+    def test_neighbours_are_bounded(self):
+        """Test only the most recent customers of each seed restaurant are considered"""
+        users = [self.neighbour(name, self.curry) for name in 'abc']
+        with mock.patch.object(recommendations, 'MAX_NEIGHBOURS', 2):
+            self.assertEqual(recommendations._neighbours({self.curry.id}), {users[1].id, users[2].id})
+
+    def test_restaurant_list_reads_precomputed_rows(self):
+        """Test the list page shows stored recommendations with one query for them"""
+        Recommendation.objects.create(user=self.user, restaurant=self.pasta, rank=1, score=1.0)
+        Recommendation.objects.create(user=self.user, restaurant=self.grill, rank=2, score=0.5)
+        client = Client()
+        client.login(username='customer', password='testpass123')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('restaurant_list'))
+        self.assertEqual([r.name for r in response.context['recommended']], ['Pasta Place', 'Steak Grill'])
+        touching = [q for q in ctx.captured_queries if 'customer_recommendation' in q['sql']]
+        self.assertEqual(len(touching), 1)
+
+    def test_refresh_recommendations_command(self):
+        """Test the command rebuilds recommendations for the requested users"""
+        self.neighbour('a', self.curry, self.tandoor)
+        other = self.neighbour('b', self.curry)
+        out = StringIO()
+        call_command('refresh_recommendations', '--user', 'b', stdout=out)
+        self.assertIn('recommendation(s)', out.getvalue())
+        self.assertTrue(Recommendation.objects.filter(user=other).exists())
+        self.assertFalse(Recommendation.objects.filter(user=self.user).exists())
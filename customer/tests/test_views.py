@@ -1,8 +1,16 @@
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
 from django.urls import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
 from decimal import Decimal
-from customer.models import Restaurant, FoodItem, Order, Review, Feedback, UserProfile
+from customer import popularity
+from customer.cart import get_cart_store, resolve_cart
+from customer.models import Restaurant, FoodItem, Order, OrderItem, Review, Feedback, UserProfile, DailyItemPopularity
+from customer.orders import place_order
 
 
 class RestaurantListViewTests(TestCase):
@@ -37,6 +45,122 @@ class RestaurantListViewTests(TestCase):
         self.assertContains(response, 'Test Restaurant')
 
 
+class RestaurantSearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.thai = Restaurant.objects.create(
+            name='Bangkok Bowl',
+            owner=self.owner,
+            location='Mumbai',
+            cuisine='Thai',
+            description='Green curry and noodles'
+        )
+        self.italian = Restaurant.objects.create(
+            name='Curry Pasta House',
+            owner=self.owner,
+            location='Pune',
+            cuisine='Italian',
+            description='Fusion pasta'
+        )
+        self.food_item = FoodItem.objects.create(
+            restaurant=self.thai,
+            name='Paneer Tikka',
+            description='Smoky cottage cheese',
+            price=Decimal('9.50')
+        )
+
+    def restaurant_names(self, **params):
+        response = self.client.get(reverse('restaurant_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [r.name for r in response.context['restaurants']]
+
+    def test_prefix_search(self):
+        """Test keyword search matches word prefixes"""
+        self.assertEqual(self.restaurant_names(q='bang'), ['Bangkok Bowl'])
+
+    def test_search_matches_description_and_ranks(self):
+        """Test keyword search covers descriptions and ranks results"""
+        names = self.restaurant_names(q='curry')
+        self.assertCountEqual(names, ['Bangkok Bowl', 'Curry Pasta House'])
+
+    def test_cuisine_and_location_filters(self):
+        """Test cuisine and location filters use their own columns"""
+        self.assertEqual(self.restaurant_names(cuisine='thai'), ['Bangkok Bowl'])
+        self.assertEqual(self.restaurant_names(location='pune'), ['Curry Pasta House'])
+        self.assertEqual(self.restaurant_names(q='curry', location='mumbai'), ['Bangkok Bowl'])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test the search index is kept in sync with saves and deletes"""
+        self.thai.name = 'Siam Kitchen'
+        self.thai.save()
+        self.assertEqual(self.restaurant_names(q='bangkok'), [])
+        self.assertEqual(self.restaurant_names(q='siam'), ['Siam Kitchen'])
+        self.thai.delete()
+        self.assertEqual(self.restaurant_names(q='siam'), [])
+
+    def test_menu_search(self):
+        """Test menu search is prefix based and scoped to the restaurant"""
+        FoodItem.objects.create(
+            restaurant=self.italian,
+            name='Paneer Pasta',
+            price=Decimal('8.00')
+        )
+        response = self.client.get(reverse('menu', args=[self.thai.id]), {'search': 'pan'})
+        self.assertEqual([item.name for item in response.context['page_obj']], ['Paneer Tikka'])
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            owner=self.owner,
+            location='Test City'
+        )
+        self.food_item = FoodItem.objects.create(
+            restaurant=self.restaurant,
+            name='Test Pizza',
+            price=Decimal('15.99')
+        )
+
+    def test_restaurant_list_served_from_cache(self):
+        """Test repeated anonymous list views skip the database"""
+        self.client.get(reverse('restaurant_list'), {'q': 'test'})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('restaurant_list'), {'q': 'test'})
+        self.assertContains(response, 'Test Restaurant')
+
+    def test_restaurant_save_invalidates_list_and_menu(self):
+        """Test saving a restaurant invalidates its cached pages"""
+        self.client.get(reverse('restaurant_list'))
+        self.client.get(reverse('menu', args=[self.restaurant.id]))
+        self.restaurant.name = 'Renamed Restaurant'
+        self.restaurant.save()
+        self.assertContains(self.client.get(reverse('restaurant_list')), 'Renamed Restaurant')
+        self.assertContains(self.client.get(reverse('menu', args=[self.restaurant.id])), 'Renamed Restaurant')
+
+    def test_food_item_and_review_invalidate_menu(self):
+        """Test menu changes and new reviews invalidate the cached menu"""
+        url = reverse('menu', args=[self.restaurant.id])
+        self.client.get(url)
+        self.food_item.name = 'Test Calzone'
+        self.food_item.save()
+        self.assertContains(self.client.get(url), 'Test Calzone')
+        Review.objects.create(user=self.customer, restaurant=self.restaurant, rating=5, comment='Lovely crust')
+        self.assertContains(self.client.get(url), 'Lovely crust')
+
+    def test_authenticated_pages_not_cached(self):
+        """Test logged-in users always get a fresh page"""
+        self.client.login(username='customer', password='testpass123')
+        url = reverse('menu', args=[self.restaurant.id])
+        self.client.get(url)
+        FoodItem.objects.filter(id=self.food_item.id).update(name='Test Calzone')
+        self.assertContains(self.client.get(url), 'Test Calzone')
+
+
 class MenuViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -69,6 +193,204 @@ class MenuViewTests(TestCase):
         self.assertContains(response, 'Test Pizza')
 
 
+class PopularTodayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant')
+        self.pizza = FoodItem.objects.create(restaurant=self.restaurant, name='Pizza', price=Decimal('10.00'))
+        self.pasta = FoodItem.objects.create(restaurant=self.restaurant, name='Pasta', price=Decimal('8.00'))
+        self.client.login(username='customer', password='testpass123')
+
+    def order(self, food, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            place_order(self.customer, self.restaurant, resolve_cart({food.id: quantity}, self.restaurant))
+
+    def test_items_become_popular_after_threshold(self):
+        """Test an item is badged once more than 10 units were ordered today"""
+        self.order(self.pizza, 6)
+        self.order(self.pasta, 3)
+        self.assertEqual(self.client.get(reverse('menu', args=[self.restaurant.id])).context['popular_items'], [])
+        self.order(self.pizza, 5)
+        response = self.client.get(reverse('menu', args=[self.restaurant.id]))
+        self.assertEqual(response.context['popular_items'], [self.pizza.id])
+        self.assertContains(response, 'Popular today', count=1)
+        counter = DailyItemPopularity.objects.get(food_item=self.pizza)
+        self.assertEqual((counter.date, counter.quantity), (timezone.localdate(), 11))
+
+    def test_counters_roll_over_by_local_day(self):
+        """Test yesterday's orders don't count towards today"""
+        yesterday = timezone.localdate() - timedelta(days=1)
+        popularity.record_order(self.restaurant.id, [(self.pizza.id, 50)], day=yesterday)
+        self.assertEqual(popularity.popular_item_ids(self.restaurant.id), [])
+
+    def test_menu_reads_cached_counters(self):
+        """Test the menu neither aggregates order lines nor re-reads cached counters"""
+        self.order(self.pizza, 12)
+        self.client.get(reverse('menu', args=[self.restaurant.id]))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('menu', args=[self.restaurant.id]))
+        self.assertEqual(response.context['popular_items'], [self.pizza.id])
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('customer_orderitem', tables)
+        self.assertNotIn('customer_dailyitempopularity', tables)
+
+
+class KeysetPaginationViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.client.login(username='customer', password='testpass123')
+
+    def walk(self, url, key, **params):
+        """Follow next-page cursors and return the object lists and query logs."""
+        pages, queries = [], []
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url, params)
+            page = response.context[key]
+            pages.append(list(page))
+            queries.append([q['sql'] for q in ctx.captured_queries])
+            if not page.has_next():
+                return pages, queries
+            params = {**params, 'cursor': page.next_cursor}
+
+    def test_restaurant_list_walks_by_name(self):
+        """Test the restaurant list pages alphabetically without COUNT or OFFSET"""
+        Restaurant.objects.all().delete()
+        for i in range(14):
+            Restaurant.objects.create(name=f'Place {i:02d}', cuisine='Thai' if i % 2 else 'Indian')
+        pages, queries = self.walk(reverse('restaurant_list'), 'restaurants')
+        self.assertEqual([len(p) for p in pages], [6, 6, 2])
+        self.assertEqual([r.name for p in pages for r in p], [f'Place {i:02d}' for i in range(14)])
+        for sql in sum(queries, []):
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
+
+    def test_restaurant_search_cursor_keeps_filters(self):
+        """Test next links carry the search filters along with the cursor"""
+        for i in range(8):
+            Restaurant.objects.create(name=f'Thai Place {i}', cuisine='Thai')
+        Restaurant.objects.create(name='Burger Barn', cuisine='American')
+        response = self.client.get(reverse('restaurant_list'), {'q': 'thai'})
+        page = response.context['restaurants']
+        self.assertContains(response, f'?q=thai&amp;cursor={page.next_cursor}')
+        pages, _ = self.walk(reverse('restaurant_list'), 'restaurants', q='thai')
+        self.assertEqual(sorted(r.name for p in pages for r in p), [f'Thai Place {i}' for i in range(8)])
+
+    def test_menu_pages_keep_specials_first(self):
+        """Test menu pages follow the special, deal, rest ordering across cursors"""
+        restaurant = Restaurant.objects.create(name='Test Restaurant')
+        items = [
+            FoodItem.objects.create(
+                restaurant=restaurant, name=f'Dish {i}', price=Decimal('5.00'),
+                is_special=(i in (7, 9)), deal_active=(i in (2, 8)), deal_price=Decimal('4.00'),
+            )
+            for i in range(10)
+        ]
+        pages, _ = self.walk(reverse('menu', args=[restaurant.id]), 'page_obj')
+        self.assertEqual([len(p) for p in pages], [4, 4, 2])
+        expected = [7, 9, 2, 8, 0, 1, 3, 4, 5, 6]
+        self.assertEqual([item.id for p in pages for item in p], [items[i].id for i in expected])
+
+    def test_orders_page_walks_newest_first(self):
+        """Test the orders page walks the full history newest first"""
+        restaurant = Restaurant.objects.create(name='Test Restaurant')
+        orders = [
+            Order.objects.create(customer=self.customer, restaurant=restaurant, total_price=Decimal('9.99'))
+            for _ in range(13)
+        ]
+        pages, _ = self.walk(reverse('orders'), 'orders')
+        self.assertEqual([len(p) for p in pages], [6, 6, 1])
+        self.assertEqual([o.id for p in pages for o in p], [o.id for o in reversed(orders)])
+
+
+class CartTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            owner=self.owner,
+            location='Test City'
+        )
+        self.food_items = [
+            FoodItem.objects.create(
+                restaurant=self.restaurant,
+                name=f'Dish {i}',
+                price=Decimal('10.00'),
+                deal_price=Decimal('8.00'),
+                deal_active=(i == 0)
+            )
+            for i in range(15)
+        ]
+        self.client.login(username='customer', password='testpass123')
+
+    def set_cart(self, cart):
+        store = get_cart_store(self.customer, self.restaurant.id)
+        store.clear()
+        for food_id, quantity in cart.items():
+            store.set_qty(food_id, quantity)
+
+    def count_menu_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('menu', args=[self.restaurant.id]))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_menu_cart_totals(self):
+        """Test cart lines and totals use the display price"""
+        self.set_cart({str(self.food_items[0].id): 2, str(self.food_items[1].id): 1})
+        _, response = self.count_menu_queries()
+        self.assertEqual(len(response.context['cart_items']), 2)
+        self.assertEqual(response.context['total_price'], Decimal('26.00'))
+
+    def test_menu_query_count_independent_of_cart_size(self):
+        """Test the menu page issues the same number of queries for any cart size"""
+        self.set_cart({str(self.food_items[0].id): 1})
+        small, _ = self.count_menu_queries()
+        self.set_cart({str(f.id): 1 for f in self.food_items})
+        large, response = self.count_menu_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.context['cart_items']), 15)
+
+    def test_menu_skips_items_no_longer_on_menu(self):
+        """Test deleted items drop out of the cart"""
+        self.set_cart({str(self.food_items[0].id): 1, str(self.food_items[1].id): 3})
+        self.food_items[1].delete()
+        _, response = self.count_menu_queries()
+        self.assertEqual(len(response.context['cart_items']), 1)
+
+    def test_place_order_from_cart(self):
+        """Test placing an order creates one line per cart entry"""
+        self.set_cart({str(self.food_items[1].id): 2, str(self.food_items[2].id): 1})
+        response = self.client.post(reverse('place_order', args=[self.restaurant.id]))
+        self.assertRedirects(response, reverse('orders'))
+        order = Order.objects.get(customer=self.customer)
+        self.assertEqual(order.orderitem_set.count(), 2)
+        self.assertEqual(order.total_price, Decimal('30.00'))
+        self.assertEqual(get_cart_store(self.customer, self.restaurant.id).snapshot(), {})
+
+    def test_place_order_snapshots_prices_in_bulk(self):
+        """Test checkout stores unit prices and inserts lines in one statement"""
+        self.set_cart({str(f.id): 1 for f in self.food_items})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('place_order', args=[self.restaurant.id]))
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "customer_orderitem"')]
+        self.assertEqual(len(inserts), 1)
+        order = Order.objects.get(customer=self.customer)
+        self.assertEqual(order.total_price, Decimal('148.00'))
+        deal_line = order.orderitem_set.get(food_item=self.food_items[0])
+        self.assertEqual(deal_line.unit_price, Decimal('8.00'))
+
+        # Later menu price changes don't rewrite history
+        FoodItem.objects.filter(id=self.food_items[1].id).update(price=Decimal('99.00'))
+        self.assertEqual(order.orderitem_set.get(food_item=self.food_items[1]).unit_price, Decimal('10.00'))
+
+
 class OrderViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -112,6 +434,68 @@ class OrderViewTests(TestCase):
         self.assertEqual(self.order.status, 'Cancelled')
 
 
+class OrderSearchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.thai = Restaurant.objects.create(name='Thai Garden')
+        self.curry = FoodItem.objects.create(restaurant=self.thai, name='Green Curry', price=Decimal('12.00'))
+        self.pizzeria = Restaurant.objects.create(name='Luigi Pizzeria')
+        self.pizza = FoodItem.objects.create(restaurant=self.pizzeria, name='Margherita', price=Decimal('9.00'))
+        self.thai_order = self.order(self.customer, self.thai, self.curry)
+        self.pizza_order = self.order(self.customer, self.pizzeria, self.pizza)
+        self.others_order = self.order(self.other, self.thai, self.curry)
+        self.client.login(username='customer', password='testpass123')
+
+    def order(self, customer, restaurant, food):
+        return place_order(customer, restaurant, resolve_cart({food.id: 1}, restaurant))
+
+    def search(self, q):
+        response = self.client.get(reverse('orders'), {'search': q})
+        return [order.id for order in response.context['orders']]
+
+    def test_search_by_restaurant_and_item_names(self):
+        """Test order search matches restaurant and item name prefixes"""
+        self.assertEqual(self.search('thai'), [self.thai_order.id])
+        self.assertEqual(self.search('marg'), [self.pizza_order.id])
+        self.assertEqual(self.search('green cur'), [self.thai_order.id])
+        self.assertEqual(self.search('sushi'), [])
+
+    def test_numeric_search_is_a_pk_lookup(self):
+        """Test order numbers go straight to the primary key"""
+        self.assertEqual(self.search(str(self.pizza_order.id)), [self.pizza_order.id])
+        self.assertEqual(self.search(f'#{self.thai_order.id}'), [self.thai_order.id])
+        self.assertEqual(self.search(str(self.others_order.id)), [])
+
+    def test_search_avoids_item_joins(self):
+        """Test order search doesn't join through order lines"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.search('curry')
+        main = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "customer_order"')]
+        self.assertTrue(main)
+        for sql in main:
+            self.assertNotIn('customer_orderitem', sql)
+            self.assertNotIn('DISTINCT', sql)
+
+    def test_deleted_orders_leave_the_index(self):
+        """Test deleting an order removes it from search"""
+        self.thai_order.delete()
+        self.assertEqual(self.search('thai'), [])
+
+    def test_orders_saved_outside_checkout_are_searchable(self):
+        """Test orders and lines written through the ORM keep the index in sync"""
+        order = Order.objects.create(customer=self.customer, restaurant=self.pizzeria, total_price=Decimal('9.00'))
+        self.assertEqual(self.search('luigi'), [order.id, self.pizza_order.id])
+        line = OrderItem.objects.create(order=order, food_item=self.pizza, quantity=1, unit_price=Decimal('9.00'))
+        OrderItem.objects.create(order=order, food_item=self.curry, quantity=1, unit_price=Decimal('12.00'))
+        self.assertEqual(self.search('green'), [order.id, self.thai_order.id])
+        line.delete()
+        order.refresh_from_db()
+        self.assertEqual(order.search_document, 'Luigi Pizzeria Green Curry')
+        self.assertEqual(self.search('marg'), [self.pizza_order.id])
+
+
 class AuthenticationViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -135,4 +519,67 @@ class AuthenticationViewTests(TestCase):
         """Test logout view"""
         self.client.login(username='testuser', password='testpass123')
         response = self.client.post(reverse('logout'))
-        self.assertEqual(response.status_code, 302)
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)
+
+class ProfileViewTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='customer', password='testpass123')
+        Restaurant.objects.all().delete()
+        self.favorite = Restaurant.objects.create(name='Curry House', cuisine='Indian', location='Test City')
+        self.other = Restaurant.objects.create(name='Pasta Place', cuisine='Italian', location='Test City')
+        self.profile = UserProfile.objects.create(user=self.user)
+        self.profile.favorite_restaurants.add(self.favorite)
+        self.client.login(username='customer', password='testpass123')
+
+    def test_profile_lists_only_favourites(self):
+        """Test the profile renders the user's favourites, not every restaurant"""
+        response = self.client.get(reverse('profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Curry House')
+        self.assertNotContains(response, 'Pasta Place')
+        self.assertEqual(response.context['favorite_ids'], {self.favorite.id})
+
+    def test_profile_orders_are_paginated(self):
+        """Test the profile's order history is paged with cursors"""
+        for _ in range(8):
+            Order.objects.create(customer=self.user, restaurant=self.other, total_price=Decimal('10.00'))
+        response = self.client.get(reverse('profile'))
+        orders = response.context['orders']
+        self.assertEqual(len(orders), 6)
+        self.assertTrue(orders.has_next())
+        response = self.client.get(reverse('profile'), {'cursor': orders.next_cursor})
+        self.assertEqual(len(response.context['orders']), 2)
+
+    def test_profile_post_updates_favourites(self):
+        """Test posting the picker's checkboxes replaces the favourites"""
+        response = self.client.post(reverse('profile'), {
+            'diet_preference': 'any',
+            'favorite_restaurants': [self.other.id],
+        })
+        self.assertRedirects(response, reverse('profile'))
+        self.assertEqual(list(self.profile.favorite_restaurants.all()), [self.other])
+
+    def test_favourite_search_returns_matches_with_flag(self):
+        """Test the typeahead returns matching restaurants flagged as favourite or not"""
+        response = self.client.get(reverse('favorite_search'), {'q': 'curry'})
+        data = response.json()
+        self.assertEqual([r['name'] for r in data['results']], ['Curry House'])
+        self.assertTrue(data['results'][0]['favorite'])
+        self.assertIsNone(data['next'])
+
+    def test_favourite_search_is_paginated(self):
+        """Test the typeahead pages through restaurants with a cursor"""
+        for i in range(12):
+            Restaurant.objects.create(name=f'Diner {i:02d}', location='Test City')
+        first = self.client.get(reverse('favorite_search')).json()
+        self.assertEqual(len(first['results']), 10)
+        second = self.client.get(reverse('favorite_search'), {'cursor': first['next']}).json()
+        self.assertEqual(len(second['results']), 4)
+        self.assertIsNone(second['next'])
+
+    def test_favourite_search_requires_login(self):
+        """Test the typeahead refuses anonymous users"""
+        self.client.logout()
+        response = self.client.get(reverse('favorite_search'))
+        self.assertEqual(response.status_code, 403)
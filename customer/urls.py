@@ -50,6 +50,26 @@ urlpatterns = [
         views.ClearCartView.as_view(),
         name="clear_cart",
     ),
+    path(
+        "api/cart/<int:restaurant_id>/",
+        views.CartApiView.as_view(),
+        name="cart_api",
+    ),
+    path(
+        "api/cart/<int:restaurant_id>/add/<int:food_id>/",
+        views.CartAddApiView.as_view(),
+        name="cart_api_add",
+    ),
+    path(
+        "api/cart/<int:restaurant_id>/update/<int:food_id>/<str:action>/",
+        views.CartUpdateApiView.as_view(),
+        name="cart_api_update",
+    ),
+    path(
+        "api/cart/<int:restaurant_id>/clear/",
+        views.CartClearApiView.as_view(),
+        name="cart_api_clear",
+    ),
     path(
         "place_order/<int:restaurant_id>/",
         views.PlaceOrderView.as_view(),
@@ -58,6 +78,11 @@ urlpatterns = [
 
     # Profile & account
     path("profile/", views.ProfileView.as_view(), name="profile"),
+    path(
+        "profile/favorites/search/",
+        views.FavoriteRestaurantSearchView.as_view(),
+        name="favorite_search",
+    ),
     path(
         "password_change/",
         views.PasswordChangeView.as_view(),
@@ -11,17 +11,21 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm, Pass
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse
 from django.contrib import messages
-from django.db import transaction, models
-from django.core.paginator import Paginator
-from django.db.models import Q, Sum, Avg, Count
-from django.utils.timezone import now
-from django.http import HttpResponseForbidden
+from django.db import models
+from django.http import Http404, HttpResponseForbidden, JsonResponse
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.utils.safestring import mark_safe
+from django.utils.decorators import method_decorator
 
 # Local imports
-from .models import Restaurant, FoodItem, Order, OrderItem, Review, Feedback, UserProfile
+from .models import Restaurant, FoodItem, Order, Review, Feedback, UserProfile
 from .forms import RegisterRestaurantForm, ReviewForm, FeedbackForm, FeedbackResponseForm, UserProfileForm, FoodItemForm
+from . import popularity, search
+from .caching import CATALOGUE_VERSION_KEY, cache_anonymous_page, menu_version_key
+from .cart import apply_cart_action, get_cart_store, resolve_cart
+from .orders import place_order
+from .pagination import KeysetPaginator
 
 
 logger = logging.getLogger(__name__)
@@ -93,60 +97,45 @@ class LogoutView(View):
         return redirect('login')
 
 # ---------- Restaurant list + search ----------
+@method_decorator(cache_anonymous_page(lambda request: [CATALOGUE_VERSION_KEY]), name='get')
 class RestaurantListView(View):
     def get(self, request):
-        from django.db.models import Avg, Count
+        logger.info("Restaurant list accessed by user: %s", request.user, extra={'event': 'restaurant_list.view'})
         
-        logger.info(f"Restaurant list accessed by user: {request.user}")
-        
-        qs = Restaurant.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).order_by('name')
+        qs = Restaurant.objects.order_by('name')
         q = request.GET.get('q','').strip()
         cuisine = request.GET.get('cuisine','').strip()
         location = request.GET.get('location','').strip()
         max_price = request.GET.get('price','').strip()
-        page = request.GET.get('page', 1)
+        cursor = request.GET.get('cursor')
 
+        qs = search.filter_restaurants(qs, q=q, cuisine=cuisine, location=location)
+        ordering = ('name', 'id')
         if q:
-            qs = qs.filter(Q(name__icontains=q) | Q(description__icontains=q))
-            logger.info(f"Restaurant search performed: '{q}' by user {request.user}")
+            ordering = ('search_rank', 'name', 'id')
+            logger.info("Restaurant search performed: '%s' by user %s", q, request.user, extra={'event': 'restaurant_list.search'})
         if cuisine:
-            qs = qs.filter(cuisine__icontains=cuisine)
-            logger.info(f"Restaurant filtered by cuisine: '{cuisine}'")
+            logger.info("Restaurant filtered by cuisine: '%s'", cuisine, extra={'event': 'restaurant_list.filter'})
         if location:
-            qs = qs.filter(location__icontains=location)
-            logger.info(f"Restaurant filtered by location: '{location}'")
+            logger.info("Restaurant filtered by location: '%s'", location, extra={'event': 'restaurant_list.filter'})
         if max_price:
             try:
                 from decimal import Decimal
                 qs = qs.filter(avg_price__lte=Decimal(max_price))
-                logger.info(f"Restaurant filtered by max price: ₹{max_price}")
+                logger.info("Restaurant filtered by max price: ₹%s", max_price, extra={'event': 'restaurant_list.filter'})
             except Exception as e:
-                logger.warning(f"Invalid price filter provided: '{max_price}' - {str(e)}")
+                logger.warning("Invalid price filter provided: '%s' - %s", max_price, e)
 
-        # pagination (page size 3 so 3x3 grid)
-        paginator = Paginator(qs, 6)
-        restaurants_page = paginator.get_page(page)
+        # keyset pagination on the sort columns, so deep pages cost the same as the first
+        restaurants_page = KeysetPaginator(qs, ordering, 6).get_page(cursor)
 
-        # recommended (simple heuristic)
+        # precomputed by customer.recommendations
         recommended = []
         if request.user.is_authenticated:
-            profile = getattr(request.user, 'profile', None)
-            if profile:
-                if profile.cuisine_preference:
-                    recommended = list(Restaurant.objects.filter(cuisine__icontains=profile.cuisine_preference).annotate(
-                        avg_rating=Avg('reviews__rating'),
-                        review_count=Count('reviews')
-                    )[:6])
-                if profile.favorite_restaurants.exists():
-                    for r in profile.favorite_restaurants.all().annotate(
-                        avg_rating=Avg('reviews__rating'),
-                        review_count=Count('reviews')
-                    )[:6]:
-                        if r not in recommended:
-                            recommended.append(r)
+            recommended = list(
+                Restaurant.objects.filter(recommendations__user=request.user)
+                .order_by('recommendations__rank')
+            )
 
         return render(request, 'restaurant_list.html', {
             'restaurants': restaurants_page,    # page object used by template
@@ -158,6 +147,10 @@ class RestaurantListView(View):
         })
 
 # ---------- Menu ----------
+@method_decorator(
+    cache_anonymous_page(lambda request, restaurant_id: [menu_version_key(restaurant_id)]),
+    name='get',
+)
 class MenuView(View):
     def get(self, request, restaurant_id):
         restaurant = get_object_or_404(Restaurant, id=restaurant_id)
@@ -165,17 +158,14 @@ class MenuView(View):
         max_price = request.GET.get('max_price','')
         veg_filter = request.GET.get('veg','')
 
-        items = restaurant.menu_items.all().order_by(
-            models.Case(
-                models.When(is_special=True, then=0),
-                models.When(deal_active=True, then=1),
-                default=2,
-                output_field=models.IntegerField(),
-            ),
-            'id'
-        )
-        if search_query:
-            items = items.filter(name__icontains=search_query)
+        # Specials first, then deals, then the rest
+        items = restaurant.menu_items.annotate(menu_rank=models.Case(
+            models.When(is_special=True, then=0),
+            models.When(deal_active=True, then=1),
+            default=2,
+            output_field=models.IntegerField(),
+        ))
+        items = search.filter_food_items(items, search_query, restaurant.id)
         if max_price:
             try:
                 max_p = Decimal(max_price)
@@ -187,38 +177,17 @@ class MenuView(View):
         elif veg_filter == 'nonveg':
             items = items.filter(is_veg=False)
 
-        # Popular today (>10)
-        from django.utils.timezone import now
-        today = now().date()
-        popular_qs = OrderItem.objects.filter(
-            food_item__restaurant=restaurant,
-            order__created_at__date=today
-        ).values("food_item__id","food_item__name").annotate(total=Sum("quantity")).filter(total__gt=10)
-        popular_items = [p['food_item__id'] for p in popular_qs]
+        # Popular today (>10 units ordered), from cached per-day counters
+        popular_items = popularity.popular_item_ids(restaurant.id)
 
         # pagination
-        from django.core.paginator import Paginator
-        paginator = Paginator(items, 4)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        page_obj = KeysetPaginator(items, ('menu_rank', 'id'), 4).get_page(request.GET.get('cursor'))
 
         # cart
-        cart_key = f'cart_{restaurant_id}'
-        cart = request.session.get(cart_key, {})
-        cart_items = []
-        total_price = Decimal('0')
-        for fid, qty in cart.items():
-            try:
-                food = FoodItem.objects.get(id=int(fid), restaurant=restaurant)
-                subtotal = food.get_display_price() * qty
-                cart_items.append({
-                    'food': food, 
-                    'quantity': qty, 
-                    'subtotal': subtotal
-                })
-                total_price += subtotal
-            except FoodItem.DoesNotExist:
-                continue
+        cart = {}
+        if request.user.is_authenticated:
+            cart = get_cart_store(request.user, restaurant.id).snapshot()
+        cart_items, total_price, _ = resolve_cart(cart, restaurant)
 
         # reviews
         reviews = restaurant.reviews.filter(visible=True).order_by('-created_at')[:10]
@@ -253,10 +222,7 @@ class AddToCartView(LoginRequiredMixin, View):
         _ = get_object_or_404(Restaurant, id=restaurant_id)
         food = get_object_or_404(FoodItem, id=food_id, restaurant_id=restaurant_id)
         qty = int(request.POST.get('quantity',1))
-        cart_key = f'cart_{restaurant_id}'
-        cart = request.session.get(cart_key, {})
-        cart[str(food.id)] = cart.get(str(food.id), 0) + max(1, qty)
-        request.session[cart_key] = cart
+        get_cart_store(request.user, restaurant_id).add(food.id, max(1, qty))
         messages.success(request, f"Added {food.name} to cart")
         return redirect('menu', restaurant_id=restaurant_id)
 
@@ -264,48 +230,97 @@ class UpdateCartView(LoginRequiredMixin, View):
     def post(self, request, restaurant_id, food_id, action):
         _ = get_object_or_404(Restaurant, id=restaurant_id)
         food = get_object_or_404(FoodItem, id=food_id, restaurant_id=restaurant_id)
-        cart_key = f'cart_{restaurant_id}'
-        cart = request.session.get(cart_key, {})
-        fid = str(food.id)
-        if action == 'increase':
-            cart[fid] = cart.get(fid,0) + 1
-        elif action == 'decrease':
-            if cart.get(fid,0) > 1:
-                cart[fid] -= 1
-            else:
-                cart.pop(fid, None)
-        elif action == 'remove':
-            cart.pop(fid, None)
-        request.session[cart_key] = cart
+        apply_cart_action(get_cart_store(request.user, restaurant_id), food.id, action)
         return redirect('menu', restaurant_id=restaurant_id)
 
 class ClearCartView(LoginRequiredMixin, View):
     def post(self, request, restaurant_id):
-        request.session.pop(f'cart_{restaurant_id}', None)
+        get_cart_store(request.user, restaurant_id).clear()
         messages.success(request, "Cart cleared")
         return redirect('menu', restaurant_id=restaurant_id)
 
+# ---------- Cart JSON API ----------
+class CartApiMixin(LoginRequiredMixin):
+    """Cart endpoints for the menu page's scripts.
+
+    Each response carries only the cart: its lines, total and the rendered
+    cart card, so a click never re-renders the menu.
+    """
+    raise_exception = True
+
+    def cart_response(self, request, restaurant_id, store):
+        cart_items, total_price, _ = resolve_cart(store.snapshot(), restaurant_id)
+        html = render_to_string('customer/partials/cart_summary.html', {
+            'restaurant_id': restaurant_id,
+            'cart_items': cart_items,
+            'total_price': total_price,
+        }, request=request)
+        return JsonResponse({
+            'items': [
+                {
+                    'id': line['food'].id,
+                    'name': line['food'].name,
+                    'quantity': line['quantity'],
+                    'subtotal': str(line['subtotal']),
+                }
+                for line in cart_items
+            ],
+            'count': sum(line['quantity'] for line in cart_items),
+            'total': str(total_price),
+            'html': html,
+        })
+
+    def cart_food(self, restaurant_id, food_id):
+        return get_object_or_404(FoodItem.objects.only('id'), id=food_id, restaurant_id=restaurant_id)
+
+
+class CartApiView(CartApiMixin, View):
+    def get(self, request, restaurant_id):
+        return self.cart_response(request, restaurant_id, get_cart_store(request.user, restaurant_id))
+
+
+class CartAddApiView(CartApiMixin, View):
+    def post(self, request, restaurant_id, food_id):
+        food = self.cart_food(restaurant_id, food_id)
+        try:
+            qty = int(request.POST.get('quantity', 1))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid quantity'}, status=400)
+        store = get_cart_store(request.user, restaurant_id)
+        store.add(food.id, max(1, qty))
+        return self.cart_response(request, restaurant_id, store)
+
+
+class CartUpdateApiView(CartApiMixin, View):
+    def post(self, request, restaurant_id, food_id, action):
+        food = self.cart_food(restaurant_id, food_id)
+        store = get_cart_store(request.user, restaurant_id)
+        if not apply_cart_action(store, food.id, action):
+            return JsonResponse({'error': f'Unknown cart action {action!r}'}, status=400)
+        return self.cart_response(request, restaurant_id, store)
+
+
+class CartClearApiView(CartApiMixin, View):
+    def post(self, request, restaurant_id):
+        store = get_cart_store(request.user, restaurant_id)
+        store.clear()
+        return self.cart_response(request, restaurant_id, store)
+
 class PlaceOrderView(LoginRequiredMixin, View):
-    @transaction.atomic
     def post(self, request, restaurant_id):
         restaurant = get_object_or_404(Restaurant, id=restaurant_id)
-        cart_key = f'cart_{restaurant_id}'
-        cart = request.session.get(cart_key, {})
+        store = get_cart_store(request.user, restaurant.id)
+        cart = store.snapshot()
         if not cart:
             messages.error(request, "Cart empty")
             return redirect('menu', restaurant_id=restaurant_id)
 
-        total = Decimal('0')
-        items_data = []
-        for fid, qty in cart.items():
-            food = get_object_or_404(FoodItem, id=int(fid), restaurant=restaurant)
-            items_data.append((food, qty))
-            total += food.price * qty
-
-        order = Order.objects.create(customer=request.user, restaurant=restaurant, total_price=total)
-        for food, qty in items_data:
-            OrderItem.objects.create(order=order, food_item=food, quantity=qty)
-        request.session.pop(cart_key, None)
+        resolved = resolve_cart(cart, restaurant)
+        if resolved.missing:
+            raise Http404("Cart contains items that are no longer on the menu")
+
+        order = place_order(request.user, restaurant, resolved)
+        store.clear()
         messages.success(request, f"Order placed successfully (#{order.id})")
         
         # redirect to friendly orders
@@ -314,21 +329,18 @@ class PlaceOrderView(LoginRequiredMixin, View):
 # ---------- Orders views ----------
 class OrdersView(LoginRequiredMixin, View):
     def get(self, request, restaurant_id=None):
-        qs = Order.objects.filter(customer=request.user).order_by('-created_at')
+        qs = (
+            Order.objects.filter(customer=request.user)
+            .select_related('restaurant', 'customer')
+            .prefetch_related('orderitem_set__food_item')
+        )
 
-        # 🔍 Search
+        # 🔍 Search: order number or restaurant/item names
         q = request.GET.get('search', '').strip()
-        if q:
-            qs = qs.filter(
-                Q(id__icontains=q) |
-                Q(restaurant__name__icontains=q) |
-                Q(items__name__icontains=q)
-            ).distinct()
+        qs = search.filter_orders(qs, q, request.user.id)
 
         # pagination
-        page = request.GET.get('page', 1)
-        paginator = Paginator(qs, 6)
-        orders_page = paginator.get_page(page)
+        orders_page = KeysetPaginator(qs, ('-created_at', '-id'), 6).get_page(request.GET.get('cursor'))
 
         return render(request, 'orders.html', {
             'orders': orders_page,
@@ -352,19 +364,7 @@ class ProfileView(LoginRequiredMixin, View):
     def get(self, request):
         profile, _ = UserProfile.objects.get_or_create(user=request.user)
         form = UserProfileForm(instance=profile)
-        orders = Order.objects.filter(customer=request.user).order_by('-created_at')
-        feedbacks = Feedback.objects.filter(user=request.user).order_by('-created_at')[:10]
-        all_restaurants = Restaurant.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).order_by('name')
-        return render(request, 'profile.html', {
-            'form': form,
-            'profile': profile,
-            'orders': orders,
-            'feedbacks': feedbacks,
-            'all_restaurants': all_restaurants,
-        })
+        return self.render_profile(request, profile, form)
 
     def post(self, request):
         profile, _ = UserProfile.objects.get_or_create(user=request.user)
@@ -373,18 +373,56 @@ class ProfileView(LoginRequiredMixin, View):
             form.save()
             messages.success(request, "Profile updated")
             return redirect('profile')
-        orders = Order.objects.filter(customer=request.user).order_by('-created_at')
-        feedbacks = Feedback.objects.filter(user=request.user).order_by('-created_at')[:10]
-        all_restaurants = Restaurant.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).order_by('name')
+        return self.render_profile(request, profile, form)
+
+    def render_profile(self, request, profile, form):
+        # Only the user's own favourites are rendered; other restaurants come
+        # from FavoriteRestaurantSearchView as the user types.
+        favorites = list(profile.favorite_restaurants.order_by('name', 'id'))
+        orders = Order.objects.filter(customer=request.user).select_related('restaurant')
+        orders_page = KeysetPaginator(orders, ('-created_at', '-id'), 6).get_page(request.GET.get('cursor'))
+        feedbacks = Feedback.objects.filter(user=request.user).select_related('restaurant').order_by('-created_at')[:10]
         return render(request, 'profile.html', {
             'form': form,
             'profile': profile,
-            'orders': orders,
+            'orders': orders_page,
             'feedbacks': feedbacks,
-            'all_restaurants': all_restaurants,
+            'favorites': favorites,
+            'favorite_ids': {r.id for r in favorites},
+            'owns_restaurant': request.user.restaurants.exists(),
+        })
+
+
+class FavoriteRestaurantSearchView(LoginRequiredMixin, View):
+    """Typeahead for the favourites picker on the profile page."""
+    raise_exception = True
+    per_page = 10
+
+    def get(self, request):
+        q = request.GET.get('q', '').strip()
+        qs = search.filter_restaurants(Restaurant.objects.all(), q=q)
+        ordering = ('search_rank', 'name', 'id') if q else ('name', 'id')
+        page = KeysetPaginator(qs, ordering, self.per_page).get_page(request.GET.get('cursor'))
+        favorite_ids = set(
+            UserProfile.favorite_restaurants.through.objects
+            .filter(userprofile__user=request.user, restaurant__in=[r.id for r in page])
+            .values_list('restaurant_id', flat=True)
+        )
+        return JsonResponse({
+            'results': [
+                {
+                    'id': r.id,
+                    'name': r.name,
+                    'cuisine': r.cuisine,
+                    'location': r.location,
+                    'avg_price': str(r.avg_price) if r.avg_price is not None else None,
+                    'avg_rating': str(r.avg_rating) if r.avg_rating is not None else None,
+                    'review_count': r.review_count,
+                    'favorite': r.id in favorite_ids,
+                }
+                for r in page
+            ],
+            'next': page.next_cursor,
         })
 
 # ---------- Register Restaurant ----------
@@ -1 +1,65 @@
-document.addEventListener( DOMContentLoaded,()=>{document.querySelectorAll([data-autoclose]).forEach(a=>{setTimeout(()=>{a.remove()},+a.dataset.autoclose||5000)})});
+document.addEventListener("DOMContentLoaded", () => {
+  // Elements with data-autoclose="<ms>" remove themselves (default 5s).
+  document.querySelectorAll("[data-autoclose]").forEach((el) => {
+    setTimeout(() => el.remove(), +el.dataset.autoclose || 5000);
+  });
+});
+
+// Cart forms carrying data-cart-api post to the JSON cart API and swap the
+// cart card in place; without JavaScript they submit normally.
+function showCart(cart, data) {
+  cart.innerHTML = data.html;
+  cart.dispatchEvent(new CustomEvent("cart:updated", { detail: data, bubbles: true }));
+}
+
+async function fetchCart(url) {
+  const response = await fetch(url, {
+    headers: { "X-Requested-With": "XMLHttpRequest" },
+    credentials: "same-origin",
+  });
+  if (!response.ok) throw new Error(`Cart request failed (${response.status})`);
+  return response.json();
+}
+
+document.addEventListener("submit", async (event) => {
+  const form = event.target.closest("form[data-cart-api]");
+  const cart = document.querySelector("[data-cart]");
+  if (!form || !cart) return;
+  event.preventDefault();
+
+  const buttons = form.querySelectorAll("button");
+  buttons.forEach((button) => { button.disabled = true; });
+  let response;
+  try {
+    response = await fetch(form.dataset.cartApi, {
+      method: "POST",
+      body: new FormData(form),
+      headers: { "X-Requested-With": "XMLHttpRequest" },
+      credentials: "same-origin",
+    });
+  } catch (error) {
+    // No response at all, so the change was never applied: fall back to
+    // the regular form post and full page render.
+    form.submit();
+    return;
+  }
+  try {
+    if (!response.ok) throw new Error(`Cart update failed (${response.status})`);
+    showCart(cart, await response.json());
+  } catch (error) {
+    // The server may have applied the change already; posting again could
+    // apply it twice, so show the cart as it now is instead.
+    try {
+      showCart(cart, await fetchCart(cart.dataset.cart));
+    } catch (reloadError) {
+      // Leave the card as it is.
+    }
+    const alert = document.createElement("div");
+    alert.className = "alert alert-warning small mt-2 mb-0";
+    alert.setAttribute("role", "alert");
+    alert.textContent = "Your cart could not be updated. Please check it and try again.";
+    cart.prepend(alert);
+  } finally {
+    buttons.forEach((button) => { button.disabled = false; });
+  }
+});
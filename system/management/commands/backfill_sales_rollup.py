@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from customer.models import Restaurant
+from system.rollups import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailySalesRollup table from completed orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--restaurant",
+            type=int,
+            action="append",
+            dest="restaurant_ids",
+            help="Only rebuild the given restaurant id (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.all()
+        if options["restaurant_ids"]:
+            restaurants = restaurants.filter(id__in=options["restaurant_ids"])
+        written = rebuild_sales_rollups(restaurants)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily sales rollup row(s)."))
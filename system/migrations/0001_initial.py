@@ -0,0 +1,65 @@
+# Generated by Django 5.2 on 2026-10-17 13:08
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def backfill_sales_rollups(apps, schema_editor):
+    Order = apps.get_model('customer', 'Order')
+    OrderItem = apps.get_model('customer', 'OrderItem')
+    DailySalesRollup = apps.get_model('system', 'DailySalesRollup')
+    completed = Order.objects.filter(status='Completed').annotate(day=TruncDate('created_at'))
+    rollups = {}
+    for row in completed.values('restaurant_id', 'day').annotate(
+        revenue=models.Sum('total_price'), orders=models.Count('id')
+    ):
+        rollups[row['restaurant_id'], row['day']] = DailySalesRollup(
+            restaurant_id=row['restaurant_id'], date=row['day'],
+            revenue=row['revenue'], order_count=row['orders'],
+            item_quantities={}, customer_totals={},
+        )
+    for row in completed.values('restaurant_id', 'day', 'customer_id').annotate(
+        spent=models.Sum('total_price')
+    ):
+        rollups[row['restaurant_id'], row['day']].customer_totals[str(row['customer_id'])] = str(row['spent'].quantize(Decimal('0.01')))
+    items = (
+        OrderItem.objects.filter(order__status='Completed')
+        .annotate(restaurant_id=models.F('order__restaurant_id'), day=TruncDate('order__created_at'))
+        .values('restaurant_id', 'day', 'food_item_id')
+        .annotate(quantity=models.Sum('quantity'))
+    )
+    for row in items:
+        rollups[row['restaurant_id'], row['day']].item_quantities[str(row['food_item_id'])] = row['quantity']
+    DailySalesRollup.objects.bulk_create(rollups.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('customer', '0019_orderitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('item_quantities', models.JSONField(default=dict)),
+                ('customer_totals', models.JSONField(default=dict)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='customer.restaurant')),
+            ],
+            options={
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('restaurant', 'date'), name='unique_daily_sales_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_sales_rollups, migrations.RunPython.noop),
+    ]
@@ -1,25 +1,89 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
 from django.db import models
-from customer.models import Order, OrderItem, Restaurant
+from django.db.models import Sum
+from customer.models import Restaurant
+
+
+class DailySalesRollup(models.Model):
+    """Completed-order totals for one restaurant on one local day.
+
+    Maintained incrementally by system.rollups as orders move into and out
+    of "Completed"; rebuild with the backfill_sales_rollup command.
+    """
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    date = models.DateField()
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+    # {food_item_id: quantity} and {customer_id: amount spent}
+    item_quantities = models.JSONField(default=dict)
+    customer_totals = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["restaurant", "date"], name="unique_daily_sales_rollup"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant.name} sales on {self.date}"
+
 
 class OrderInsights:
+    """Sales analytics for a restaurant, read from DailySalesRollup.
+
+    Only completed orders count, and every method costs O(days of trading)
+    rather than O(orders).
+    """
+
     @staticmethod
     def total_revenue(restaurant):
-        return Order.objects.filter(restaurant=restaurant).aggregate(models.Sum("total_price"))["total_price__sum"] or 0
+        return restaurant.daily_sales.aggregate(total=Sum("revenue"))["total"] or 0
+
+    @staticmethod
+    def total_orders(restaurant):
+        return restaurant.daily_sales.aggregate(total=Sum("order_count"))["total"] or 0
+
+    @staticmethod
+    def sales_by_day(restaurant):
+        return list(restaurant.daily_sales.values_list("date", "revenue"))
 
     @staticmethod
-    def most_ordered_items(restaurant):
-        return (
-            OrderItem.objects.filter(food_item__restaurant=restaurant)
-            .values("food_item__name")
-            .annotate(total_quantity=models.Sum("quantity"))
-            .order_by("-total_quantity")[:5]
+    def most_ordered_items(restaurant, limit=5):
+        totals = Counter()
+        for quantities in restaurant.daily_sales.values_list("item_quantities", flat=True):
+            totals.update({int(k): v for k, v in quantities.items()})
+        names = dict(
+            restaurant.menu_items.filter(id__in=list(totals)).values_list("id", "name")
         )
+        ranked = [(fid, qty) for fid, qty in totals.most_common() if fid in names and qty > 0]
+        return [
+            {"food_item__name": names[fid], "total_quantity": qty}
+            for fid, qty in ranked[:limit]
+        ]
 
     @staticmethod
-    def top_customers(restaurant):
-        return (
-            Order.objects.filter(restaurant=restaurant)
-            .values("customer__username")
-            .annotate(total_spent=models.Sum("total_price"))
-            .order_by("-total_spent")[:5]
+    def top_customers(restaurant, limit=5):
+        totals = {}
+        for spent in restaurant.daily_sales.values_list("customer_totals", flat=True):
+            for uid, amount in spent.items():
+                totals[int(uid)] = totals.get(int(uid), Decimal("0")) + Decimal(amount)
+        ranked = sorted(
+            ((uid, amount) for uid, amount in totals.items() if amount > 0),
+            key=lambda pair: pair[1],
+            reverse=True,
+        )[:limit]
+        usernames = dict(
+            User.objects.filter(id__in=[uid for uid, _ in ranked]).values_list("id", "username")
         )
+        return [
+            {"customer__username": usernames[uid], "total_spent": amount}
+            for uid, amount in ranked
+            if uid in usernames
+        ]
@@ -0,0 +1,220 @@
+"""Incremental maintenance of ``DailySalesRollup``.
+
+An order contributes to its restaurant's rollup for the local day it was
+placed while its status is "Completed". The receivers at the bottom of this
+module add or remove that contribution as orders move into or out of
+"Completed", and keep item quantities in step when lines of an already
+completed order change. ``bulk_create`` of order lines bypasses them, so
+run the ``backfill_sales_rollup`` command after bulk imports.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from customer.models import Order, OrderItem, Restaurant
+
+from .models import DailySalesRollup
+
+
+COMPLETED = "Completed"
+CENT = Decimal("0.01")
+
+
+def _money(value):
+    """JSON-safe amount with a fixed two decimal places."""
+    return str(Decimal(value).quantize(CENT))
+
+
+def _merge(totals, deltas, sign, cast):
+    """Add ``sign * delta`` into a JSON mapping, dropping keys that reach zero."""
+    for key, delta in deltas.items():
+        key = str(key)
+        value = cast(totals.get(key, 0)) + sign * cast(delta)
+        if value:
+            totals[key] = _money(value) if cast is Decimal else value
+        else:
+            totals.pop(key, None)
+
+
+def _locked_rollup(restaurant_id, day, create):
+    if create:
+        DailySalesRollup.objects.get_or_create(restaurant_id=restaurant_id, date=day)
+    return (
+        DailySalesRollup.objects.select_for_update()
+        .filter(restaurant_id=restaurant_id, date=day)
+        .first()
+    )
+
+
+def apply_order(snapshot, sign, lines=None):
+    """Add (``sign=1``) or remove (``sign=-1``) one completed order.
+
+    ``snapshot`` is ``(restaurant_id, created_at, customer_id, total_price)``
+    and ``lines`` maps food item ids to quantities; pass ``None`` to leave
+    item quantities alone.
+    """
+    restaurant_id, created_at, customer_id, total_price = snapshot
+    with transaction.atomic():
+        rollup = _locked_rollup(restaurant_id, timezone.localdate(created_at), create=sign > 0)
+        if rollup is None:
+            # Nothing to remove from, or the restaurant is being deleted.
+            return
+        rollup.revenue += sign * total_price
+        rollup.order_count = max(rollup.order_count + sign, 0)
+        _merge(rollup.customer_totals, {customer_id: total_price}, sign, Decimal)
+        if lines:
+            _merge(rollup.item_quantities, lines, sign, int)
+        rollup.save()
+
+
+def apply_item_change(order_id, food_item_id, quantity):
+    """Adjust item quantities for a line added to or removed from a completed order."""
+    order = (
+        Order.objects.filter(pk=order_id, status=COMPLETED)
+        .values("restaurant_id", "created_at")
+        .first()
+    )
+    if order is None or not quantity:
+        return
+    with transaction.atomic():
+        rollup = _locked_rollup(
+            order["restaurant_id"], timezone.localdate(order["created_at"]), create=quantity > 0
+        )
+        if rollup is None:
+            return
+        _merge(rollup.item_quantities, {food_item_id: quantity}, 1, int)
+        rollup.save(update_fields=["item_quantities"])
+
+
+def order_lines(order_id):
+    lines = Counter()
+    for food_item_id, quantity in OrderItem.objects.filter(order_id=order_id).values_list(
+        "food_item_id", "quantity"
+    ):
+        lines[food_item_id] += quantity
+    return lines
+
+
+def rebuild_sales_rollups(restaurants=None):
+    """Recompute the rollups from completed orders and return the number of rows written."""
+    if restaurants is None:
+        restaurants = Restaurant.objects.all()
+    restaurant_ids = list(restaurants.values_list("id", flat=True))
+    completed = Order.objects.filter(restaurant_id__in=restaurant_ids, status=COMPLETED)
+
+    rollups = {}
+
+    def rollup_for(restaurant_id, day):
+        key = (restaurant_id, day)
+        if key not in rollups:
+            rollups[key] = DailySalesRollup(restaurant_id=restaurant_id, date=day)
+        return rollups[key]
+
+    by_day = (
+        completed.annotate(day=TruncDate("created_at"))
+        .values("restaurant_id", "day")
+        .annotate(revenue=Sum("total_price"), orders=Count("id"))
+    )
+    for row in by_day:
+        rollup = rollup_for(row["restaurant_id"], row["day"])
+        rollup.revenue = row["revenue"]
+        rollup.order_count = row["orders"]
+
+    by_customer = (
+        completed.annotate(day=TruncDate("created_at"))
+        .values("restaurant_id", "day", "customer_id")
+        .annotate(spent=Sum("total_price"))
+    )
+    for row in by_customer:
+        rollup_for(row["restaurant_id"], row["day"]).customer_totals[str(row["customer_id"])] = _money(row["spent"])
+
+    by_item = (
+        OrderItem.objects.filter(order__in=completed)
+        .annotate(restaurant_id=F("order__restaurant_id"), day=TruncDate("order__created_at"))
+        .values("restaurant_id", "day", "food_item_id")
+        .annotate(quantity=Sum("quantity"))
+    )
+    for row in by_item:
+        rollup_for(row["restaurant_id"], row["day"]).item_quantities[str(row["food_item_id"])] = row["quantity"]
+
+    with transaction.atomic():
+        DailySalesRollup.objects.filter(restaurant_id__in=restaurant_ids).delete()
+        DailySalesRollup.objects.bulk_create(rollups.values(), batch_size=500)
+    return len(rollups)
+
+
+# ---------- Signal receivers ----------
+def _order_snapshot(order):
+    return (order.restaurant_id, order.created_at, order.customer_id, order.total_price)
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_order(sender, instance, raw=False, **kwargs):
+    """Stash the stored contribution so post_save can compute the delta."""
+    instance._rollup_before = None
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Order.objects.filter(pk=instance.pk, status=COMPLETED)
+        .values_list("restaurant_id", "created_at", "customer_id", "total_price")
+        .first()
+    )
+    instance._rollup_before = previous
+
+
+@receiver(post_save, sender=Order)
+def update_rollup_on_order_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_rollup_before", None)
+    after = _order_snapshot(instance) if instance.status == COMPLETED else None
+    if before == after:
+        return
+    lines = order_lines(instance.pk)
+    if before:
+        apply_order(before, -1, lines)
+    if after:
+        apply_order(after, 1, lines)
+
+
+@receiver(pre_delete, sender=Order)
+def update_rollup_on_order_delete(sender, instance, **kwargs):
+    # Item quantities come off as the cascade deletes each line.
+    if instance.status == COMPLETED:
+        apply_order(_order_snapshot(instance), -1)
+
+
+@receiver(pre_save, sender=OrderItem)
+def remember_previous_line(sender, instance, raw=False, **kwargs):
+    instance._rollup_before = None
+    if raw or instance.pk is None:
+        return
+    instance._rollup_before = (
+        OrderItem.objects.filter(pk=instance.pk)
+        .values_list("order_id", "food_item_id", "quantity")
+        .first()
+    )
+
+
+@receiver(post_save, sender=OrderItem)
+def update_rollup_on_line_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, "_rollup_before", None)
+    after = (instance.order_id, instance.food_item_id, instance.quantity)
+    if before == after:
+        return
+    if before:
+        apply_item_change(before[0], before[1], -before[2])
+    apply_item_change(*after)
+
+
+@receiver(post_delete, sender=OrderItem)
+def update_rollup_on_line_delete(sender, instance, **kwargs):
+    apply_item_change(instance.order_id, instance.food_item_id, -instance.quantity)
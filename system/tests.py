@@ -1,8 +1,14 @@
 from django.test import TestCase, Client # type: ignore
 from django.contrib.auth.models import User # type: ignore
 from django.urls import reverse # type: ignore
+from django.core.files.uploadedfile import SimpleUploadedFile
 from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
 from customer.models import Restaurant, FoodItem, Order, OrderItem, Review, Feedback
+from customer.tests.query_budget import QueryBudgetMixin
+from system.models import DailySalesRollup, OrderInsights
 
 
 class OwnerDashboardTests(TestCase):
@@ -88,6 +94,223 @@ class OwnerDashboardTests(TestCase):
         self.assertIn('total_sales', response.context)
 
 
+class OwnerDashboardQueryTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            owner=self.owner,
+            location='Test City'
+        )
+        self.food_items = [
+            FoodItem.objects.create(restaurant=self.restaurant, name=f'Dish {i}', price=Decimal('10.00'))
+            for i in range(4)
+        ]
+        self.client.login(username='owner', password='testpass123')
+
+    def add_orders(self, count):
+        for i in range(count):
+            order = Order.objects.create(
+                customer=self.customer,
+                restaurant=self.restaurant,
+                total_price=Decimal('40.00'),
+                status='Completed' if i % 2 else 'Pending'
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, food_item=food, quantity=1, unit_price=food.price)
+                for food in self.food_items
+            ])
+            Feedback.objects.create(user=self.customer, restaurant=self.restaurant, message=f'Feedback {i}')
+
+    def test_dashboard_query_budget(self):
+        """Test the owner dashboard shell and fragments stay within their query budgets"""
+        self.add_orders(10)
+        for name, budget in [('owner_dashboard', 10), ('dashboard_orders', 8),
+                             ('dashboard_feedback', 6), ('dashboard_menu', 6),
+                             ('dashboard_charts', 8)]:
+            with self.assertMaxQueries(budget):
+                response = self.client.get(reverse(name, args=[self.restaurant.id]))
+            self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_no_n_plus_one(self):
+        """Test dashboard queries don't grow with the number of orders"""
+        self.add_orders(1)
+        for name in ['owner_dashboard', 'dashboard_orders', 'dashboard_feedback']:
+            self.assertQueriesIndependentOf(
+                lambda: self.client.get(reverse(name, args=[self.restaurant.id])),
+                lambda: self.add_orders(5),
+            )
+
+    def test_feedback_management_no_n_plus_one(self):
+        """Test feedback authors are loaded with the feedback"""
+        self.add_orders(1)
+        self.assertQueriesIndependentOf(
+            lambda: self.client.get(reverse('feedback_management', args=[self.restaurant.id])),
+            lambda: self.add_orders(5),
+        )
+
+
+class DashboardFragmentTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(
+            name='Test Restaurant',
+            owner=self.owner,
+            location='Test City'
+        )
+        self.food_item = FoodItem.objects.create(
+            restaurant=self.restaurant,
+            name='Test Pizza',
+            price=Decimal('15.99')
+        )
+        self.client.login(username='owner', password='testpass123')
+
+    def test_shell_does_not_render_orders(self):
+        """Test the dashboard shell defers orders to the fragment endpoint"""
+        Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_price=Decimal('9.99'))
+        response = self.client.get(reverse('owner_dashboard', args=[self.restaurant.id]))
+        self.assertContains(response, reverse('dashboard_orders', args=[self.restaurant.id]))
+        self.assertNotIn('orders', response.context)
+        self.assertNotContains(response, 'Order #')
+
+    def test_orders_fragment_cursor_pagination(self):
+        """Test the orders fragment walks the full history newest first via cursors"""
+        orders = [
+            Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_price=Decimal('9.99'))
+            for _ in range(45)
+        ]
+        url = reverse('dashboard_orders', args=[self.restaurant.id])
+        seen = []
+        while url:
+            response = self.client.get(url)
+            page = response.context['page']
+            seen.extend(order.id for order in page)
+            url = f"{reverse('dashboard_orders', args=[self.restaurant.id])}?cursor={page.next_cursor}" if page.has_next() else None
+        self.assertEqual(seen, [order.id for order in reversed(orders)])
+
+    def test_feedback_and_menu_fragments(self):
+        """Test the feedback and menu fragments render their rows"""
+        Feedback.objects.create(user=self.customer, restaurant=self.restaurant, message='Loved it')
+        self.assertContains(self.client.get(reverse('dashboard_feedback', args=[self.restaurant.id])), 'Loved it')
+        self.assertContains(self.client.get(reverse('dashboard_menu', args=[self.restaurant.id])), 'Test Pizza')
+
+    def test_charts_json(self):
+        """Test the charts endpoint returns sales, items and customers series"""
+        order = Order.objects.create(
+            customer=self.customer, restaurant=self.restaurant,
+            total_price=Decimal('31.98'), status='Completed'
+        )
+        OrderItem.objects.create(order=order, food_item=self.food_item, quantity=2)
+        data = self.client.get(reverse('dashboard_charts', args=[self.restaurant.id])).json()
+        self.assertEqual(data['sales']['values'], [31.98])
+        self.assertEqual(data['items'], {'labels': ['Test Pizza'], 'values': [2]})
+        self.assertEqual(data['customers']['labels'], ['customer'])
+
+    def test_fragments_require_owner(self):
+        """Test fragment endpoints are only available to the owner"""
+        self.client.login(username='customer', password='testpass123')
+        for name in ['dashboard_orders', 'dashboard_feedback', 'dashboard_menu', 'dashboard_charts']:
+            response = self.client.get(reverse(name, args=[self.restaurant.id]))
+            self.assertEqual(response.status_code, 404)
+
+
+class DailySalesRollupTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', owner=self.owner)
+        self.pizza = FoodItem.objects.create(restaurant=self.restaurant, name='Pizza', price=Decimal('10.00'))
+        self.pasta = FoodItem.objects.create(restaurant=self.restaurant, name='Pasta', price=Decimal('8.00'))
+        self.client.login(username='owner', password='testpass123')
+
+    def place(self, lines, status='Pending'):
+        order = Order.objects.create(
+            customer=self.customer, restaurant=self.restaurant,
+            total_price=sum(food.price * qty for food, qty in lines), status=status
+        )
+        for food, qty in lines:
+            OrderItem.objects.create(order=order, food_item=food, quantity=qty)
+        return order
+
+    def set_status(self, order, status):
+        self.client.post(
+            reverse('update_order_status', args=[order.id]), {'status': status},
+            HTTP_REFERER=reverse('owner_dashboard', args=[self.restaurant.id]),
+        )
+
+    def rollup(self):
+        return DailySalesRollup.objects.get(restaurant=self.restaurant)
+
+    def test_completing_and_reopening_an_order(self):
+        """Test status changes into and out of Completed update the rollup"""
+        order = self.place([(self.pizza, 2), (self.pasta, 1)])
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+        self.set_status(order, 'Completed')
+        rollup = self.rollup()
+        self.assertEqual(rollup.date, timezone.localdate(order.created_at))
+        self.assertEqual(rollup.revenue, Decimal('28.00'))
+        self.assertEqual(rollup.order_count, 1)
+        self.assertEqual(rollup.item_quantities, {str(self.pizza.id): 2, str(self.pasta.id): 1})
+        self.assertEqual(rollup.customer_totals, {str(self.customer.id): '28.00'})
+
+        self.set_status(order, 'Cancelled')
+        rollup = self.rollup()
+        self.assertEqual(rollup.revenue, Decimal('0'))
+        self.assertEqual(rollup.order_count, 0)
+        self.assertEqual(rollup.item_quantities, {})
+
+    def test_deleting_completed_order(self):
+        """Test deleting a completed order removes its contribution"""
+        keep = self.place([(self.pizza, 1)], status='Completed')
+        drop = self.place([(self.pasta, 3)], status='Completed')
+        self.client.get(reverse('delete_order', args=[drop.id]))
+        rollup = self.rollup()
+        self.assertEqual(rollup.revenue, keep.total_price)
+        self.assertEqual(rollup.order_count, 1)
+        self.assertEqual(rollup.item_quantities, {str(self.pizza.id): 1})
+
+    def test_backfill_matches_incremental(self):
+        """Test the backfill command rebuilds the same rollup"""
+        self.place([(self.pizza, 2)], status='Completed')
+        self.set_status(self.place([(self.pasta, 1), (self.pizza, 1)]), 'Completed')
+        self.place([(self.pasta, 5)])
+        expected = DailySalesRollup.objects.values(
+            'date', 'revenue', 'order_count', 'item_quantities', 'customer_totals'
+        ).get()
+        DailySalesRollup.objects.all().delete()
+        call_command('backfill_sales_rollup', stdout=StringIO())
+        self.assertEqual(
+            DailySalesRollup.objects.values(
+                'date', 'revenue', 'order_count', 'item_quantities', 'customer_totals'
+            ).get(),
+            expected,
+        )
+
+    def test_insights_read_rollup(self):
+        """Test OrderInsights answers from the rollup without scanning orders"""
+        self.place([(self.pizza, 2)], status='Completed')
+        self.place([(self.pasta, 3)], status='Completed')
+        self.place([(self.pasta, 9)])
+        with self.assertNumQueries(6):
+            self.assertEqual(OrderInsights.total_revenue(self.restaurant), Decimal('44.00'))
+            self.assertEqual(OrderInsights.total_orders(self.restaurant), 2)
+            self.assertEqual(
+                OrderInsights.most_ordered_items(self.restaurant),
+                [{'food_item__name': 'Pasta', 'total_quantity': 3},
+                 {'food_item__name': 'Pizza', 'total_quantity': 2}],
+            )
+            self.assertEqual(
+                OrderInsights.top_customers(self.restaurant),
+                [{'customer__username': 'customer', 'total_spent': Decimal('44.00')}],
+            )
+
+
 class MenuManagementTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -237,4 +460,104 @@ class FeedbackManagementTests(TestCase):
         response = self.client.post(reverse('mark_feedback_seen', args=[self.feedback.id]))
         self.assertEqual(response.status_code, 302)  # Redirect after successful update
         self.feedback.refresh_from_db()
-        self.assertTrue(self.feedback.seen)
\ No newline at end of file
+        self.assertTrue(self.feedback.seen)
+
+class ExportCsvTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', owner=self.owner)
+        self.food_item = FoodItem.objects.create(restaurant=self.restaurant, name='Test Pizza', price=Decimal('15.99'))
+        self.client.login(username='owner', password='testpass123')
+
+    def add_order(self, days_ago):
+        order = Order.objects.create(customer=self.customer, restaurant=self.restaurant, total_price=Decimal('15.99'))
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timezone.timedelta(days=days_ago))
+        OrderItem.objects.create(order=order, food_item=self.food_item, quantity=1, unit_price=Decimal('15.99'))
+        return order
+
+    def export(self, kind, **params):
+        return self.client.get(reverse('export_csv', args=[self.restaurant.id, kind]), params)
+
+    def test_owner_downloads_each_export(self):
+        """Test the owner can download menu, orders and feedback as CSV"""
+        self.add_order(0)
+        Feedback.objects.create(user=self.customer, restaurant=self.restaurant, message='Loved it')
+        for kind, text in [('menu', 'Test Pizza'), ('orders', 'customer'), ('feedback', 'Loved it')]:
+            response = self.export(kind)
+            self.assertEqual(response['Content-Disposition'], f'attachment; filename="test-restaurant-{kind}.csv"')
+            self.assertIn(text, b''.join(response.streaming_content).decode())
+
+    def test_orders_date_range(self):
+        """Test orders can be limited to an inclusive date range"""
+        old, recent = self.add_order(40), self.add_order(1)
+        since = (timezone.localdate() - timezone.timedelta(days=7)).isoformat()
+        lines = b''.join(self.export('orders', **{'from': since}).streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(recent.id)])
+        until = (timezone.localdate() - timezone.timedelta(days=40)).isoformat()
+        lines = b''.join(self.export('orders', to=until).streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], [str(old.id)])
+        self.assertEqual(self.export('orders', to='yesterday').status_code, 400)
+
+    def test_export_requires_owner(self):
+        """Test other users and unknown exports get 404"""
+        self.assertEqual(self.export('reviews').status_code, 404)
+        self.client.login(username='customer', password='testpass123')
+        self.assertEqual(self.export('orders').status_code, 404)
+
+
+class ImportMenuViewTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.restaurant = Restaurant.objects.create(name='Test Restaurant', owner=self.owner)
+        self.food_item = FoodItem.objects.create(restaurant=self.restaurant, name='Test Pizza', price=Decimal('15.99'))
+        self.client.login(username='owner', password='testpass123')
+        self.url = reverse('import_menu', args=[self.restaurant.id])
+
+    def upload(self, text, name='menu.csv', **extra):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(name, text.encode())}, **extra)
+
+    def test_clean_import_redirects_to_dashboard(self):
+        """Test a file without problems is imported and the owner sent back to the dashboard"""
+        response = self.upload('Name,Price,Veg\nTest Pizza,12.00,False\nSoup,3.00,True\n')
+        self.assertRedirects(response, reverse('owner_dashboard', args=[self.restaurant.id]), fetch_redirect_response=False)
+        self.food_item.refresh_from_db()
+        self.assertEqual((self.food_item.price, self.food_item.is_veg), (Decimal('12.00'), False))
+        self.assertTrue(self.restaurant.menu_items.filter(name='Soup').exists())
+
+    def test_problems_are_listed(self):
+        """Test rejected rows are shown with their row numbers"""
+        response = self.upload('name,price\nSoup,3.00\nSalad,free\n')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'rejected 1 row')
+        self.assertContains(response, '<td>3</td>', html=True)
+
+    def test_json_report(self):
+        """Test API clients get the per-row report as JSON"""
+        response = self.upload(
+            '[{"name": "Soup", "price": "3.00"}, {"name": "Soup", "price": "4.00"}]', name='menu.json',
+            HTTP_ACCEPT='application/json',
+        )
+        data = response.json()
+        self.assertEqual((data['created'], data['updated']), (1, 0))
+        self.assertEqual(data['errors'], [{'row': 2, 'name': 'Soup', 'errors': {'name': ['Duplicate of row 1.']}}])
+        bad = self.upload('[{"name": ', name='menu.json', HTTP_ACCEPT='application/json')
+        self.assertEqual(bad.status_code, 400)
+        self.assertIn('file', bad.json()['errors'])
+
+    def test_import_requires_owner(self):
+        """Test other users cannot import into the restaurant"""
+        self.client.login(username='customer', password='testpass123')
+        self.assertEqual(self.upload('name,price\nSoup,3.00\n').status_code, 404)
+        self.assertFalse(FoodItem.objects.filter(name='Soup').exists())
+
+    def test_add_food_item_rejects_duplicate_names(self):
+        """Test the single-item form reports a name already on the menu"""
+        response = self.client.post(reverse('add_food_item', args=[self.restaurant.id]), {
+            'name': 'Test Pizza', 'price': '9.00', 'is_veg': 'on',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.restaurant.menu_items.count(), 1)
@@ -3,6 +3,12 @@ from . import views
 
 urlpatterns = [
     path("dashboard/<int:restaurant_id>/", views.owner_dashboard, name="owner_dashboard"),
+    path("dashboard/<int:restaurant_id>/orders/", views.dashboard_orders, name="dashboard_orders"),
+    path("dashboard/<int:restaurant_id>/feedback/", views.dashboard_feedback, name="dashboard_feedback"),
+    path("dashboard/<int:restaurant_id>/menu/", views.dashboard_menu, name="dashboard_menu"),
+    path("dashboard/<int:restaurant_id>/charts/", views.dashboard_charts, name="dashboard_charts"),
+    path("dashboard/<int:restaurant_id>/export/<str:kind>.csv", views.export_csv, name="export_csv"),
+    path("dashboard/<int:restaurant_id>/import/", views.import_menu, name="import_menu"),
     path("food/add/<int:restaurant_id>/", views.add_food_item, name="add_food_item"),
     path("food/<int:food_id>/edit/", views.edit_food_item, name="edit_food_item"),
     path("food/<int:food_id>/delete/", views.delete_food_item, name="delete_food_item"),
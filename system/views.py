@@ -1,58 +1,38 @@
 # Standard library
-import json
 import logging
+from datetime import datetime, time, timedelta
 
 # Django imports
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden
+from django.http import Http404, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Count, Sum
-from django.utils.safestring import mark_safe
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.text import slugify
 
 # Local imports
-from customer.forms import FeedbackResponseForm, FoodItemForm
-from customer.models import Feedback, FoodItem, Order, OrderItem, Restaurant
+from customer import exports, menu_import
+from customer.forms import FeedbackResponseForm, FoodItemForm, MenuImportForm
+from customer.models import Feedback, FoodItem, Order, Restaurant
+from customer.pagination import KeysetPaginator
+from system.models import OrderInsights
 
 
 logger = logging.getLogger(__name__)
 
+DASHBOARD_PAGE_SIZE = 20
+
+
+def _owned_restaurant(request, restaurant_id):
+    return get_object_or_404(Restaurant, id=restaurant_id, owner=request.user)
+
+
 @login_required
 def owner_dashboard(request, restaurant_id):
-    restaurant = get_object_or_404(Restaurant, id=restaurant_id, owner=request.user)
-    menu_items = restaurant.menu_items.all()
-    orders = restaurant.orders.all().order_by('-created_at')
-    feedbacks = restaurant.feedbacks.all().order_by('-created_at')
-
-    # Insights: only completed orders
-    completed_orders = restaurant.orders.filter(status='Completed')
-    total_sales = completed_orders.aggregate(total=Sum('total_price'))['total'] or 0
-    total_orders = completed_orders.count()
-    total_items = menu_items.count()
-    pending_orders = restaurant.orders.filter(status='Pending').count()
-
-    # Sales over time
-    sales_data = completed_orders.values('created_at__date').annotate(
-        total=Sum('total_price')
-    ).order_by('created_at__date')
-    sales_labels = [str(s['created_at__date']) for s in sales_data]
-    sales_values = [float(s['total'] or 0) for s in sales_data]
-
-    # Top ordered items
-    top_items_qs = OrderItem.objects.filter(
-        order__in=completed_orders
-    ).values('food_item__name').annotate(
-        total_qty=Sum('quantity')
-    ).order_by('-total_qty')[:6]
-    items_labels = [i['food_item__name'] for i in top_items_qs]
-    items_values = [i['total_qty'] for i in top_items_qs]
-
-    # Top customers
-    top_customers_qs = completed_orders.values('customer__username').annotate(
-        total_spent=Sum('total_price')
-    ).order_by('-total_spent')[:6]
-    customers_labels = [c['customer__username'] for c in top_customers_qs]
-    customers_values = [float(c['total_spent']) for c in top_customers_qs]
+    """Dashboard shell; orders, feedback, menu and charts load as fragments."""
+    restaurant = _owned_restaurant(request, restaurant_id)
 
     # Handle profile update
     if request.method == "POST" and 'update_profile' in request.POST:
@@ -68,29 +48,167 @@ def owner_dashboard(request, restaurant_id):
         messages.success(request, "Profile updated successfully.")
         return redirect('owner_dashboard', restaurant_id=restaurant.id)
 
+    # Headline numbers: only completed orders count as sales
+    total_sales = OrderInsights.total_revenue(restaurant)
+    total_orders = OrderInsights.total_orders(restaurant)
+    total_items = restaurant.menu_items.count()
+    pending_orders = restaurant.orders.filter(status='Pending').count()
+
     return render(request, 'system/owner_dashboard.html', {
         'restaurant': restaurant,
-        'menu_items': menu_items,
-        'orders': orders,
-        'feedbacks': feedbacks,
         'total_sales': total_sales,
         'total_orders': total_orders,
         'total_items': total_items,
         'pending_orders': pending_orders,
-        'sales_labels': sales_labels,
-        'sales_values': sales_values,
-        'items_labels': items_labels,
-        'items_values': items_values,
-        'customers_labels': customers_labels,
-        'customers_values': customers_values,
     })
 
 
+@login_required
+def dashboard_orders(request, restaurant_id):
+    restaurant = _owned_restaurant(request, restaurant_id)
+    orders = (
+        restaurant.orders.select_related('restaurant', 'customer')
+        .prefetch_related('orderitem_set__food_item')
+    )
+    page = KeysetPaginator(orders, ('-created_at', '-id'), DASHBOARD_PAGE_SIZE).get_page(
+        request.GET.get('cursor')
+    )
+    return render(request, 'system/partials/dashboard_orders.html', {
+        'restaurant': restaurant,
+        'page': page,
+    })
+
+
+@login_required
+def dashboard_feedback(request, restaurant_id):
+    restaurant = _owned_restaurant(request, restaurant_id)
+    feedbacks = restaurant.feedbacks.select_related('user')
+    page = KeysetPaginator(feedbacks, ('-created_at', '-id'), DASHBOARD_PAGE_SIZE).get_page(
+        request.GET.get('cursor')
+    )
+    return render(request, 'system/partials/dashboard_feedback.html', {
+        'restaurant': restaurant,
+        'page': page,
+    })
+
+
+@login_required
+def dashboard_menu(request, restaurant_id):
+    restaurant = _owned_restaurant(request, restaurant_id)
+    page = KeysetPaginator(restaurant.menu_items.all(), ('id',), DASHBOARD_PAGE_SIZE).get_page(
+        request.GET.get('cursor')
+    )
+    return render(request, 'system/partials/dashboard_menu.html', {
+        'restaurant': restaurant,
+        'page': page,
+    })
+
+
+@login_required
+def dashboard_charts(request, restaurant_id):
+    restaurant = _owned_restaurant(request, restaurant_id)
+    sales_data = OrderInsights.sales_by_day(restaurant)
+    top_items = OrderInsights.most_ordered_items(restaurant, limit=6)
+    top_customers = OrderInsights.top_customers(restaurant, limit=6)
+
+    return JsonResponse({
+        'sales': {
+            'labels': [str(day) for day, _ in sales_data],
+            'values': [float(revenue) for _, revenue in sales_data],
+        },
+        'items': {
+            'labels': [i['food_item__name'] for i in top_items],
+            'values': [i['total_quantity'] for i in top_items],
+        },
+        'customers': {
+            'labels': [c['customer__username'] for c in top_customers],
+            'values': [float(c['total_spent']) for c in top_customers],
+        },
+    })
+
+
+def _date_bound(request, name, days=0):
+    """Local midnight of the ``name`` GET date plus ``days``; None when absent, False when invalid."""
+    value = request.GET.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        return False
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min))
+
+
+@login_required
+def export_csv(request, restaurant_id, kind):
+    """Stream the restaurant's menu, orders or feedback as CSV.
+
+    Orders can be limited to ``?from=YYYY-MM-DD&to=YYYY-MM-DD`` (both inclusive).
+    """
+    restaurant = _owned_restaurant(request, restaurant_id)
+    filename = f"{slugify(restaurant.name) or 'restaurant'}-{kind}.csv"
+    if kind == 'menu':
+        return exports.food_items_csv(restaurant.menu_items.all(), filename)
+    if kind == 'feedback':
+        return exports.feedback_csv(restaurant.feedbacks.all(), filename)
+    if kind != 'orders':
+        raise Http404("Unknown export")
+
+    orders = restaurant.orders.all()
+    start, end = _date_bound(request, 'from'), _date_bound(request, 'to', days=1)
+    if start is False or end is False:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD")
+    if start:
+        orders = orders.filter(created_at__gte=start)
+    if end:
+        orders = orders.filter(created_at__lt=end)
+    return exports.orders_csv(orders, filename)
+
+
+@login_required
+def import_menu(request, restaurant_id):
+    """Create or update many menu items from a CSV/JSON file and an optional zip of images.
+
+    Replies with the per-row report as JSON when the client accepts JSON.
+    """
+    restaurant = _owned_restaurant(request, restaurant_id)
+    report = None
+    if request.method == "POST":
+        form = MenuImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                report = menu_import.import_menu(
+                    restaurant,
+                    form.cleaned_data['file'],
+                    form.cleaned_data['images'],
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except menu_import.MenuImportError as exc:
+                form.add_error('file', str(exc))
+        if 'application/json' in request.headers.get('Accept', ''):
+            if report is None:
+                return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+            return JsonResponse(report.as_dict())
+        if report is not None and not report.dry_run:
+            logger.info(
+                "Menu import for restaurant %s by %s: %s created, %s updated, %s rejected",
+                restaurant.id, request.user.username, report.created, report.updated, len(report.errors),
+            )
+            if not report.errors:
+                messages.success(request, f"Imported {report.imported} menu items.")
+                return redirect('owner_dashboard', restaurant_id=restaurant.id)
+    else:
+        form = MenuImportForm()
+    return render(request, 'system/import_menu.html', {'form': form, 'restaurant': restaurant, 'report': report})
+
+
 @login_required
 def add_food_item(request, restaurant_id):
     restaurant = get_object_or_404(Restaurant, id=restaurant_id, owner=request.user)
     if request.method == "POST":
-        form = FoodItemForm(request.POST, request.FILES)
+        form = FoodItemForm(request.POST, request.FILES, instance=FoodItem(restaurant=restaurant))
         if form.is_valid():
             food_item = form.save(commit=False)
             food_item.restaurant = restaurant
@@ -145,7 +263,8 @@ def update_order_status(request, order_id):
         new_status = request.POST.get('status')
         if new_status in ["Pending", "Completed", "Cancelled"]:
             order.status = new_status
-            order.save()
+            with transaction.atomic():
+                order.save()
             if old_status != new_status:
                 messages.success(request, f"Order #{order.id} status changed from {old_status} to {new_status}")
                 logger.info("Order %s status changed to %s by %s", order.id, new_status, request.user.username)
@@ -156,7 +275,8 @@ def update_order_status(request, order_id):
             order.status = 'Completed'
         else:
             order.status = 'Cancelled'
-        order.save()
+        with transaction.atomic():
+            order.save()
         messages.success(request, f"Order #{order.id} status changed from {old_status} to {order.status}")
     return redirect(request.META.get("HTTP_REFERER", "owner_dashboard"))
 
@@ -167,35 +287,19 @@ def delete_order(request, order_id):
         return HttpResponseForbidden()
     rest_id = order.restaurant.id
     order_id = order.id
-    order.delete()
+    with transaction.atomic():
+        order.delete()
     messages.success(request, f"Order #{order_id} deleted successfully!")
     return redirect('owner_dashboard', restaurant_id=rest_id)
 
 @login_required
 def insights_view(request, restaurant_id):
     restaurant = get_object_or_404(Restaurant, id=restaurant_id, owner=request.user)
-    completed_orders = restaurant.orders.filter(status="Completed")
-
-    total_sales = completed_orders.aggregate(total=Sum("total_price"))["total"] or 0
-    total_orders = completed_orders.count()
+    total_sales = OrderInsights.total_revenue(restaurant)
+    total_orders = OrderInsights.total_orders(restaurant)
     menu_items = restaurant.menu_items.count()
-
-    # Sales over time (only completed)
-    sales_data = (
-        completed_orders
-        .values("created_at__date")
-        .annotate(total=Sum("total_price"))
-        .order_by("created_at__date")
-    )
-
-    # Top items (only completed)
-    top_items = (
-        OrderItem.objects
-        .filter(order__in=completed_orders)
-        .values("food_item__name")
-        .annotate(total=Count("id"))
-        .order_by("-total")[:5]
-    )
+    sales_data = OrderInsights.sales_by_day(restaurant)
+    top_items = OrderInsights.most_ordered_items(restaurant)
 
     return render(request, "system/insights.html", {
         "total_sales": total_sales,
@@ -208,7 +312,7 @@ def insights_view(request, restaurant_id):
 @login_required
 def feedback_management(request, restaurant_id):
     restaurant = get_object_or_404(Restaurant, id=restaurant_id, owner=request.user)
-    feedbacks = restaurant.feedbacks.all().order_by('-created_at')
+    feedbacks = restaurant.feedbacks.select_related('user').order_by('-created_at')
     
     # Filter by status
     status_filter = request.GET.get('status', 'all')
@@ -277,27 +381,9 @@ def insights(request, restaurant_id):
     restaurant = get_object_or_404(Restaurant, id=restaurant_id)
 
     # Only completed orders count as revenue
-    completed_orders = restaurant.orders.filter(status="Completed")
-
-    # Total revenue
-    revenue = completed_orders.aggregate(total=Sum('total_price'))['total'] or 0
-
-    # Top ordered items
-    top_items = OrderItem.objects.filter(
-        order__status="Completed", 
-        food_item__restaurant=restaurant
-    ).values(
-        "food_item__name"
-    ).annotate(
-        total_quantity=Sum("quantity")
-    ).order_by("-total_quantity")[:5]
-
-    # Top customers
-    top_customers = completed_orders.values(
-        "customer__username"
-    ).annotate(
-        total_spent=Sum("total_price")
-    ).order_by("-total_spent")[:5]
+    revenue = OrderInsights.total_revenue(restaurant)
+    top_items = OrderInsights.most_ordered_items(restaurant)
+    top_customers = OrderInsights.top_customers(restaurant)
 
     return render(request, "system/insights.html", {
         "restaurant": restaurant,